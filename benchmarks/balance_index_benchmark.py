@@ -0,0 +1,101 @@
+import argparse
+import random
+import sys
+import time
+from src.core.constants import ACCOUNT_NUMBER_FORMAT
+from src.core.data_structures import BalanceIndex
+from src.core.models import BankAccount
+
+class LegacyBalanceBST:
+    def __init__(self):
+        self.root = None
+    
+    def insert(self, account):
+        self.root = self._insert(self.root, account)
+    
+    def _insert(self, node, account):
+        if node is None:
+            return {'account': account, 'left': None, 'right': None}
+        if account.balance < node['account'].balance:
+            node['left'] = self._insert(node['left'], account)
+        else:
+            node['right'] = self._insert(node['right'], account)
+        return node
+    
+    def search_range(self, low, high):
+        result = []
+        self._search_range(self.root, low, high, result)
+        return result
+    
+    def _search_range(self, node, low, high, result):
+        if node is None:
+            return
+        if low <= node['account'].balance <= high:
+            result.append(node['account'])
+        if node['account'].balance >= low:
+            self._search_range(node['left'], low, high, result)
+        if node['account'].balance <= high:
+            self._search_range(node['right'], low, high, result)
+
+def make_accounts(count, ordered):
+    rng = random.Random(count)
+    balances = [round(rng.uniform(0, 1_000_000), 2) for _ in range(count)]
+    if ordered:
+        balances.sort()
+    accounts = []
+    for i, balance in enumerate(balances, 1):
+        account = BankAccount(ACCOUNT_NUMBER_FORMAT.format(i), "CUST0001")
+        account.balance = balance
+        accounts.append(account)
+    return accounts
+
+def timed(func):
+    start = time.perf_counter()
+    try:
+        func()
+    except RecursionError:
+        return None
+    return time.perf_counter() - start
+
+def fmt(seconds):
+    return f"{seconds:.3f}" if seconds is not None else "recursion"
+
+def main():
+    parser = argparse.ArgumentParser(description="BalanceIndex vs the legacy recursive BST")
+    parser.add_argument("--accounts", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=1_000)
+    parser.add_argument("--updates", type=int, default=100_000)
+    args = parser.parse_args()
+    
+    print(f"{'accounts':>10} {'order':>8} {'structure':>10} {'insert s':>10} {'range q/s':>12} "
+          f"{'update/s':>10}")
+    for count in args.accounts:
+        for ordered in (False, True):
+            accounts = make_accounts(count, ordered)
+            rng = random.Random(1)
+            ranges = []
+            for _ in range(args.queries):
+                low = rng.uniform(0, 1_000_000)
+                ranges.append((low, low + 1_000))
+            
+            for name, structure in (("bst", LegacyBalanceBST()), ("index", BalanceIndex())):
+                insert_time = timed(lambda: [structure.insert(account) for account in accounts])
+                query_time = None
+                if insert_time is not None:
+                    query_time = timed(lambda: [structure.search_range(low, high) for low, high in ranges])
+                update_rate = "n/a"
+                if name == "index":
+                    sample = [rng.choice(accounts) for _ in range(args.updates)]
+                    
+                    def run_updates():
+                        for account in sample:
+                            account.balance += 1.0
+                            structure.update(account)
+                    update_rate = f"{args.updates / timed(run_updates):,.0f}"
+                query_rate = f"{args.queries / query_time:,.0f}" if query_time else "n/a"
+                print(f"{count:>10} {'sorted' if ordered else 'random':>8} {name:>10} "
+                      f"{fmt(insert_time):>10} {query_rate:>12} {update_rate:>10}")
+
+if __name__ == "__main__":
+    sys.setrecursionlimit(10_000)
+    main()
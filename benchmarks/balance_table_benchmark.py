@@ -0,0 +1,69 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+from src.core.constants import *
+from src.services.balance_table import BalanceTable, balance_path
+from src.services.history_store import history_path
+from src.services.banking_system import BankingSystem
+from src.services.storage import JsonStorage, MappedStorage
+from benchmarks.journal_benchmark import write_dataset, deposits_per_second
+
+def cold_start(make_storage):
+    start = time.perf_counter()
+    bank = BankingSystem(make_storage())
+    elapsed = time.perf_counter() - start
+    bank.close()
+    return elapsed
+
+def reader_lookups_per_second(path, account_count, lookups):
+    # What another process mapping the table read-only would see.
+    table = BalanceTable(path, readonly=True)
+    rng = random.Random(0)
+    numbers = [ACCOUNT_NUMBER_FORMAT.format(rng.randint(1, account_count)) for _ in range(lookups)]
+    start = time.perf_counter()
+    for number in numbers:
+        table.read(number)
+    elapsed = time.perf_counter() - start
+    table.close()
+    return lookups / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Snapshot accounts vs a memory-mapped balance table")
+    parser.add_argument("--accounts", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--min-seconds", type=float, default=3.0)
+    parser.add_argument("--max-ops", type=int, default=50_000)
+    parser.add_argument("--lookups", type=int, default=100_000)
+    args = parser.parse_args()
+    
+    print(f"{'accounts':>10} {'storage':>8} {'cold start s':>13} {'dep/s':>10} {'bytes/dep':>10} {'reader lookups/s':>17}")
+    for account_count in args.accounts:
+        with tempfile.TemporaryDirectory() as tmp:
+            data_file = os.path.join(tmp, "bank_data.json")
+            journal_file = os.path.join(tmp, "bank_data.journal")
+            modes = [
+                ("json", lambda: JsonStorage(data_file, journal_file, fsync_every=0, compact_every=0)),
+                ("mapped", lambda: MappedStorage(data_file, journal_file, fsync_every=0, compact_every=0))
+            ]
+            for name, make_storage in modes:
+                customer_id = write_dataset(data_file, account_count)
+                # The first mapped load moves the accounts out of the snapshot.
+                BankingSystem(make_storage()).close()
+                startup = cold_start(make_storage)
+                bank = BankingSystem(make_storage())
+                written = bank.storage.bytes_written
+                rate = deposits_per_second(bank, customer_id, account_count, args.min_seconds, args.max_ops)
+                operations = max(1, bank.storage.journal.records)
+                per_deposit = (bank.storage.bytes_written - written) / operations
+                bank.close()
+                lookups = "-"
+                if name == "mapped":
+                    lookups = f"{reader_lookups_per_second(balance_path(data_file), account_count, args.lookups):,.0f}"
+                print(f"{account_count:>10} {name:>8} {startup:>13.3f} {rate:>10,.1f} {per_deposit:>10.1f} {lookups:>17}")
+                for path in (journal_file, balance_path(data_file), history_path(data_file)):
+                    if os.path.exists(path):
+                        os.remove(path)
+
+if __name__ == "__main__":
+    main()
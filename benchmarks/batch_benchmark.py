@@ -0,0 +1,49 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+from src.core.constants import ACCOUNT_NUMBER_FORMAT
+from src.services.banking_system import BankingSystem
+from src.services.storage import JsonStorage
+from benchmarks.journal_benchmark import write_dataset
+
+def make_transfers(count, account_count, seed):
+    # Payments go around a shuffled ring of accounts, so every account pays
+    # and receives once per lap and no batch is rejected for lack of funds.
+    ring = [ACCOUNT_NUMBER_FORMAT.format(i) for i in range(1, account_count + 1)]
+    random.Random(seed).shuffle(ring)
+    return [(ring[i % account_count], ring[(i + 1) % account_count], 0.5)
+            for i in range(count)]
+
+def main():
+    parser = argparse.ArgumentParser(description="submit_batch throughput vs one transfer() per payment")
+    parser.add_argument("--accounts", type=int, default=10_000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+",
+                        default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--sequential-limit", type=int, default=200,
+                        help="transfer() rewrites the data file each time, so only this many are timed")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = os.path.join(tmp, "bank_data.json")
+        write_dataset(data_file, args.accounts)
+        bank = BankingSystem(JsonStorage(data_file))
+        
+        transfers = make_transfers(args.sequential_limit, args.accounts, 0)
+        start = time.perf_counter()
+        for from_account, to_account, amount in transfers:
+            bank.transfer(from_account, to_account, amount)
+        sequential_rate = len(transfers) / (time.perf_counter() - start)
+        print(f"transfer() one at a time: {sequential_rate:,.1f} transfers/s")
+        
+        print(f"{'batch size':>12} {'seconds':>10} {'transfers/s':>14} {'committed':>10}")
+        for size in args.batch_sizes:
+            transfers = make_transfers(size, args.accounts, size)
+            start = time.perf_counter()
+            result = bank.submit_batch(transfers)
+            elapsed = time.perf_counter() - start
+            print(f"{size:>12,} {elapsed:>10.2f} {size / elapsed:>14,.0f} {str(result.committed):>10}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from src.core.constants import *
+from src.services.banking_system import BankingSystem
+from src.services.concurrent_executor import ConcurrentExecutor
+from src.services.storage import JsonStorage, MappedStorage, SQLiteStorage
+from benchmarks.journal_benchmark import write_dataset, PASSWORD
+
+def total_balance(bank):
+    return round(sum(account.balance for account in bank.accounts.values()), 2)
+
+def open_storage(kind, tmp):
+    data_file = os.path.join(tmp, "bank_data.json")
+    journal_file = os.path.join(tmp, "bank_data.journal")
+    if kind == "sqlite":
+        return SQLiteStorage(os.path.join(tmp, "bank.db"))
+    if kind == "mapped":
+        return MappedStorage(data_file, journal_file, fsync_every=0, compact_every=5_000)
+    return JsonStorage(data_file, journal_file, fsync_every=0, compact_every=5_000)
+
+def stress(kind, accounts, operations, workers, seed=0, cache_capacity=ACCOUNT_CACHE_SIZE, durable=True):
+    # Returns (expected total, total in memory, total after a reload,
+    # negative balances, seconds); money is conserved when the three totals
+    # agree and no balance went negative. Fewer accounts than operations
+    # keeps contention high, which is what would expose a double spend.
+    rng = random.Random(seed)
+    numbers = [ACCOUNT_NUMBER_FORMAT.format(i) for i in range(1, accounts + 1)]
+    with tempfile.TemporaryDirectory() as tmp:
+        write_dataset(os.path.join(tmp, "bank_data.json"), accounts)
+        if kind == "sqlite":
+            source = BankingSystem(JsonStorage(os.path.join(tmp, "bank_data.json")))
+            storage = open_storage(kind, tmp)
+            storage.save(source)
+            storage.close()
+            source.close()
+        bank = BankingSystem(open_storage(kind, tmp))
+        if bank.storage.lazy_accounts:
+            bank.accounts.capacity = cache_capacity
+        bank.login(CUSTOMER_ID_FORMAT.format(1), PASSWORD)
+        customer = bank.current_customer
+        expected = total_balance(bank)
+        
+        executor = ConcurrentExecutor(bank, workers=workers, durable=durable)
+        futures = []
+        external = 0.0
+        start = time.perf_counter()
+        for _ in range(operations):
+            roll = rng.random()
+            amount = float(rng.randint(1, 500_000))
+            if roll < 0.8:
+                futures.append((None, executor.transfer(rng.choice(numbers), rng.choice(numbers), amount)))
+            elif roll < 0.9:
+                futures.append((amount, executor.deposit(rng.choice(numbers), amount, customer)))
+            else:
+                futures.append((-amount, executor.withdraw(rng.choice(numbers), amount, customer)))
+        for delta, future in futures:
+            result = future.result()
+            if delta is not None and result != INSUFFICIENT_BALANCE:
+                external += delta
+        executor.shutdown()
+        elapsed = time.perf_counter() - start
+        # Lazy backends read these from storage, so before it is closed.
+        in_memory = total_balance(bank)
+        negative = sum(1 for account in bank.accounts.values() if account.balance < 0)
+        bank.close()
+        
+        reloaded = BankingSystem(open_storage(kind, tmp))
+        on_disk = total_balance(reloaded)
+        reloaded.close()
+    return round(expected + external, 2), in_memory, on_disk, negative, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Money conservation under concurrent transfers")
+    parser.add_argument("--accounts", type=int, default=200)
+    parser.add_argument("--operations", type=int, default=50_000)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--storage", choices=["json", "mapped", "sqlite"], default="json")
+    parser.add_argument("--cache-capacity", type=int, default=ACCOUNT_CACHE_SIZE,
+                        help="account cache size for mapped/sqlite; small values force evictions")
+    parser.add_argument("--non-durable", action="store_true", help="do not wait for each commit")
+    args = parser.parse_args()
+    
+    expected, in_memory, on_disk, negative, elapsed = stress(
+        args.storage, args.accounts, args.operations, args.workers, args.seed,
+        args.cache_capacity, not args.non_durable)
+    print(f"{args.storage} storage, {args.operations:,} operations on {args.workers} workers in {elapsed:.2f}s "
+          f"({args.operations / elapsed:,.0f} ops/s)")
+    print(f"expected total {expected:,.2f}, in memory {in_memory:,.2f}, "
+          f"reloaded {on_disk:,.2f}, negative balances {negative}")
+    if not (expected == in_memory == on_disk) or negative:
+        print("FAILED: money was not conserved")
+        sys.exit(1)
+    print("OK")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import argparse
+import json
+import random
+from datetime import datetime, timedelta
+from src.core.constants import *
+from src.core.models import Customer
+from src.services.history_store import HistoryStore, history_path
+
+PASSWORD = "benchmark1"
+START_TIME = datetime(2024, 1, 1)
+
+def customer_id(index):
+    return CUSTOMER_ID_FORMAT.format(index)
+
+def account_number(index):
+    return ACCOUNT_NUMBER_FORMAT.format(index)
+
+def owner_index(rng, customers):
+    return rng.randint(1, customers)
+
+def account_history(rng, accounts, transaction_count, clock):
+    # An opening deposit followed by random deposits, withdrawals and
+    # transfers; the balance is the sum of the amounts, so histories and
+    # balances agree the way they do in a real data file.
+    balance = round(rng.uniform(1_000, 1_000_000), 2)
+    history = [{
+        'type': TRANSACTION_TYPES['DEPOSIT'],
+        'amount': balance,
+        'description': CASH_DEPOSIT,
+        'timestamp': clock().isoformat()
+    }]
+    for _ in range(transaction_count - 1):
+        amount = round(rng.uniform(1, 10_000), 2)
+        roll = rng.random()
+        counterparty = account_number(rng.randint(1, accounts))
+        if roll < 0.4:
+            entry = (TRANSACTION_TYPES['DEPOSIT'], amount, CASH_DEPOSIT)
+        elif roll < 0.6:
+            entry = (TRANSACTION_TYPES['TRANSFER_IN'], amount, TRANSFER_FROM_FORMAT.format(counterparty))
+        elif amount > balance:
+            continue
+        elif roll < 0.8:
+            entry = (TRANSACTION_TYPES['WITHDRAW'], -amount, CASH_WITHDRAWAL)
+        else:
+            entry = (TRANSACTION_TYPES['TRANSFER_OUT'], -amount, TRANSFER_TO_FORMAT.format(counterparty))
+        balance = round(balance + entry[1], 2)
+        history.append({
+            'type': entry[0],
+            'amount': entry[1],
+            'description': entry[2],
+            'timestamp': clock().isoformat()
+        })
+    return balance, history
+
+def write_bank_data(path, customers, accounts, transactions, seed=0):
+    # Streams records straight to disk, so 10M accounts need no more memory
+    # than one account's history. Histories go to the segment file next to
+    # the snapshot, as JsonStorage writes them. Every customer's password is
+    # PASSWORD.
+    rng = random.Random(seed)
+    password_hash = Customer(customer_id(1), "", PASSWORD).password_hash
+    per_account, extra = divmod(max(transactions, accounts), accounts) if accounts else (0, 0)
+    moments = iter(range(transactions + accounts + 1))
+    clock = lambda: START_TIME + timedelta(seconds=next(moments))
+    open(history_path(path), 'wb').close()
+    history = HistoryStore(history_path(path))
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{"%s": [' % DATA_CUSTOMERS_KEY)
+        for index in range(1, customers + 1):
+            if index > 1:
+                f.write(',')
+            f.write(json.dumps({
+                DATA_CUSTOMER_ID_KEY: customer_id(index),
+                DATA_NAME_KEY: "customer %d" % index,
+                DATA_PASSWORD_HASH_KEY: password_hash
+            }))
+        f.write('], "%s": [' % DATA_ACCOUNTS_KEY)
+        for index in range(1, accounts + 1):
+            if index > 1:
+                f.write(',')
+            count = per_account + (1 if index <= extra else 0)
+            balance, records = account_history(rng, accounts, count, clock)
+            history.append(account_number(index), records)
+            offset, count = history.entry(account_number(index))
+            f.write(json.dumps({
+                DATA_ACCOUNT_NUMBER_KEY: account_number(index),
+                DATA_CUSTOMER_ID_KEY: customer_id(owner_index(rng, customers)),
+                DATA_BALANCE_KEY: balance,
+                DATA_HISTORY_OFFSET_KEY: offset,
+                DATA_HISTORY_COUNT_KEY: count
+            }))
+        f.write(']}')
+    history.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic bank_data.json and its history file")
+    parser.add_argument("--customers", type=int, default=1_000)
+    parser.add_argument("--accounts", type=int, default=2_000)
+    parser.add_argument("--transactions", type=int, default=10_000,
+                        help="total history entries; every account gets at least its opening deposit")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=DATA_FILE_PATH)
+    args = parser.parse_args()
+    write_bank_data(args.output, args.customers, args.accounts, args.transactions, args.seed)
+
+if __name__ == "__main__":
+    main()
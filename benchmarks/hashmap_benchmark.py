@@ -0,0 +1,76 @@
+import argparse
+import random
+import time
+from src.core.data_structures import HashMap
+
+class LegacyHashMap:
+    def __init__(self, size=10):
+        self.size = size
+        self.table = [[] for _ in range(size)]
+    
+    def _hash(self, key):
+        return hash(key) % self.size
+    
+    def add(self, key, value):
+        index = self._hash(key)
+        for item in self.table[index]:
+            if item[0] == key:
+                item[1] = value
+                return
+        self.table[index].append([key, value])
+    
+    def get(self, key):
+        index = self._hash(key)
+        for item in self.table[index]:
+            if item[0] == key:
+                return item[1]
+        return None
+
+def fill_legacy(hash_map, keys):
+    # add() scans the whole chain before appending, which makes filling the
+    # legacy map quadratic; the keys are unique so append directly.
+    for key in keys:
+        hash_map.table[hash_map._hash(key)].append([key, key])
+
+def fill_resizable(hash_map, keys):
+    for key in keys:
+        hash_map.add(key, key)
+
+def lookup_throughput(hash_map, keys, lookups, min_seconds):
+    rng = random.Random(0)
+    sample = [rng.choice(keys) for _ in range(lookups)]
+    done = 0
+    start = time.perf_counter()
+    while True:
+        for key in sample:
+            hash_map.get(key)
+        done += len(sample)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return done / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="HashMap lookup throughput")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--min-seconds", type=float, default=1.0)
+    args = parser.parse_args()
+    
+    print(f"{'keys':>10} {'legacy get/s':>16} {'resizable get/s':>16} {'speedup':>10}")
+    for size in args.sizes:
+        keys = ["ACC{:06d}".format(i) for i in range(1, size + 1)]
+        
+        legacy = LegacyHashMap()
+        fill_legacy(legacy, keys)
+        # Every legacy lookup walks a chain of ~size/10 entries, so a small
+        # sample is enough to get a stable rate.
+        legacy_rate = lookup_throughput(legacy, keys, 200, args.min_seconds)
+        
+        resizable = HashMap()
+        fill_resizable(resizable, keys)
+        resizable_rate = lookup_throughput(resizable, keys, 100_000, args.min_seconds)
+        
+        print(f"{size:>10} {legacy_rate:>16,.0f} {resizable_rate:>16,.0f} "
+              f"{resizable_rate / legacy_rate:>9,.0f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import argparse
+import random
+import tracemalloc
+from datetime import datetime
+from src.core.constants import *
+from src.core.data_structures import LinkedQueue, TransactionHistory
+import src.core.models  # registers the description templates
+
+def workload(count, seed=0):
+    rng = random.Random(seed)
+    counterparties = [ACCOUNT_NUMBER_FORMAT.format(i) for i in range(1, 1001)]
+    for _ in range(count):
+        roll = rng.random()
+        amount = float(rng.randint(1, 100_000))
+        if roll < 0.5:
+            yield TRANSACTION_TYPES['DEPOSIT'], amount, CASH_DEPOSIT, None
+        elif roll < 0.75:
+            yield TRANSACTION_TYPES['WITHDRAW'], -amount, CASH_WITHDRAWAL, None
+        else:
+            yield TRANSACTION_TYPES['TRANSFER_OUT'], -amount, TRANSFER_TO_FORMAT, rng.choice(counterparties)
+
+def legacy_history(count):
+    history = LinkedQueue()
+    for transaction_type, amount, template, ref in workload(count):
+        history.enqueue({
+            'type': transaction_type,
+            'amount': amount,
+            'description': template.format(ref) if ref else template,
+            'timestamp': datetime.now().isoformat()
+        })
+    return history
+
+def compact_history(count):
+    history = TransactionHistory()
+    for transaction_type, amount, template, ref in workload(count):
+        history.append(transaction_type, amount, template, ref)
+    return history
+
+def bytes_per_transaction(build, count):
+    tracemalloc.start()
+    history = build(count)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del history
+    return current / count
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory per stored transaction, LinkedQueue vs TransactionHistory")
+    parser.add_argument("--count", type=int, default=10_000_000)
+    parser.add_argument("--legacy-count", type=int, default=1_000_000,
+                        help="the legacy store is measured on fewer transactions and reported per transaction")
+    args = parser.parse_args()
+    
+    legacy = bytes_per_transaction(legacy_history, min(args.count, args.legacy_count))
+    compact = bytes_per_transaction(compact_history, args.count)
+    print(f"{'store':>20} {'bytes/tx':>10} {'total for ' + format(args.count, ','):>24}")
+    print(f"{'LinkedQueue of dict':>20} {legacy:>10.1f} {legacy * args.count / (1 << 20):>20,.1f} MiB")
+    print(f"{'TransactionHistory':>20} {compact:>10.1f} {compact * args.count / (1 << 20):>20,.1f} MiB")
+
+if __name__ == "__main__":
+    main()
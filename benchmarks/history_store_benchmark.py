@@ -0,0 +1,67 @@
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from src.services.banking_system import BankingSystem
+from src.services.storage import JsonStorage
+from benchmarks.data_generator import write_bank_data, account_number
+
+MODES = ["lazy", "eager"]
+
+def run_child(mode, data_file, accounts, pages):
+    start = time.perf_counter()
+    bank = BankingSystem(JsonStorage(data_file))
+    if mode == "eager":
+        # What startup cost when every history was loaded with its account.
+        for account in bank.accounts.values():
+            account.transaction_history
+    startup = time.perf_counter() - start
+    rng = random.Random(0)
+    numbers = [account_number(rng.randint(1, accounts)) for _ in range(pages)]
+    latencies = {}
+    for label in ("first_page_ms", "warm_page_ms"):
+        start = time.perf_counter()
+        for number in numbers:
+            account = bank.accounts.get(number)
+            bank.get_transaction_page(number, customer=bank.customers.get(account.customer_id))
+        latencies[label] = (time.perf_counter() - start) / pages * 1000
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps(dict(latencies, startup=startup, peak_mb=peak_mb)))
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup and first-touch cost of lazily loaded histories")
+    parser.add_argument("--accounts", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--per-account", type=int, default=20, help="history entries per account")
+    parser.add_argument("--pages", type=int, default=1_000, help="random accounts paged after startup")
+    parser.add_argument("--child", nargs=4, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.child:
+        mode, data_file, accounts, pages = args.child
+        run_child(mode, data_file, int(accounts), int(pages))
+        return
+    
+    print(f"{'accounts':>10} {'mode':>6} {'startup s':>10} {'first page ms':>14} "
+          f"{'warm page ms':>13} {'peak MB':>8}")
+    for accounts in args.accounts:
+        with tempfile.TemporaryDirectory() as tmp:
+            data_file = os.path.join(tmp, "bank_data.json")
+            write_bank_data(data_file, max(1, accounts // 2), accounts, accounts * args.per_account)
+            for mode in MODES:
+                # A fresh interpreter per run keeps peak RSS comparable.
+                output = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.history_store_benchmark", "--child",
+                     mode, data_file, str(accounts), str(args.pages)],
+                    check=True, capture_output=True, text=True
+                ).stdout
+                result = json.loads(output)
+                print(f"{accounts:>10} {mode:>6} {result['startup']:>10.3f} {result['first_page_ms']:>14.3f} "
+                      f"{result['warm_page_ms']:>13.3f} {result['peak_mb']:>8.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from src.core.constants import *
+from src.core.models import Customer
+from src.services.banking_system import BankingSystem
+from src.services.storage import JsonStorage
+
+PASSWORD = "benchmark1"
+
+def write_dataset(path, account_count):
+    customer = Customer(CUSTOMER_ID_FORMAT.format(1), "benchmark", PASSWORD)
+    rng = random.Random(account_count)
+    data = {
+        DATA_CUSTOMERS_KEY: [{
+            DATA_CUSTOMER_ID_KEY: customer.customer_id,
+            DATA_NAME_KEY: customer.name,
+            DATA_PASSWORD_HASH_KEY: customer.password_hash
+        }],
+        DATA_ACCOUNTS_KEY: [{
+            DATA_ACCOUNT_NUMBER_KEY: ACCOUNT_NUMBER_FORMAT.format(i),
+            DATA_CUSTOMER_ID_KEY: customer.customer_id,
+            DATA_BALANCE_KEY: round(rng.uniform(0, 1_000_000), 2),
+            DATA_TRANSACTION_HISTORY_KEY: []
+        } for i in range(1, account_count + 1)]
+    }
+    with open(path, 'w') as f:
+        json.dump(data, f)
+    return customer.customer_id
+
+def deposits_per_second(bank, customer_id, account_count, min_seconds, max_ops):
+    bank.login(customer_id, PASSWORD)
+    rng = random.Random(0)
+    done = 0
+    start = time.perf_counter()
+    while done < max_ops:
+        account_number = ACCOUNT_NUMBER_FORMAT.format(rng.randint(1, account_count))
+        bank.deposit(account_number, 10.0)
+        done += 1
+        if time.perf_counter() - start >= min_seconds:
+            break
+    return done / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description="Sustained deposit throughput, snapshot vs journal")
+    parser.add_argument("--accounts", type=int, nargs="+", default=[10_000, 1_000_000])
+    parser.add_argument("--min-seconds", type=float, default=5.0)
+    parser.add_argument("--max-ops", type=int, default=100_000)
+    parser.add_argument("--fsync-every", type=int, default=JOURNAL_FSYNC_EVERY)
+    args = parser.parse_args()
+    
+    print(f"{'accounts':>10} {'snapshot dep/s':>16} {'journal dep/s':>16}")
+    for account_count in args.accounts:
+        with tempfile.TemporaryDirectory() as tmp:
+            data_file = os.path.join(tmp, "bank_data.json")
+            customer_id = write_dataset(data_file, account_count)
+            bank = BankingSystem(JsonStorage(data_file))
+            # Snapshot-mode deposits queue a background snapshot of the chunks
+            # they changed.
+            snapshot_rate = deposits_per_second(bank, customer_id, account_count,
+                                                args.min_seconds, args.max_ops)
+            bank.close()
+            
+            customer_id = write_dataset(data_file, account_count)
+            bank = BankingSystem(JsonStorage(data_file, os.path.join(tmp, "bank_data.journal"),
+                                             fsync_every=args.fsync_every, compact_every=0))
+            journal_rate = deposits_per_second(bank, customer_id, account_count,
+                                               args.min_seconds, args.max_ops)
+            bank.close()
+        print(f"{account_count:>10} {snapshot_rate:>16,.1f} {journal_rate:>16,.1f}")
+
+if __name__ == "__main__":
+    main()
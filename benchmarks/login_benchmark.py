@@ -0,0 +1,46 @@
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from src.services.auth import PasswordService
+from src.services.banking_system import BankingSystem
+from src.services.storage import JsonStorage
+from benchmarks.data_generator import write_bank_data, customer_id, PASSWORD
+
+def logins_per_second(bank, customers, threads):
+    ids = [customer_id(index) for index in range(1, customers + 1)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        results = list(pool.map(lambda cid: bank.authenticate(cid, PASSWORD), ids))
+    elapsed = time.perf_counter() - start
+    assert all(results)
+    return customers / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Login storm throughput with a slow KDF")
+    parser.add_argument("--customers", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=16, help="concurrent callers, as a server would have")
+    parser.add_argument("--workers", type=int, default=0, help="KDF processes; 0 means one per core")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = os.path.join(tmp, "bank_data.json")
+        write_bank_data(data_file, args.customers, args.customers, args.customers)
+        
+        print(f"{'mode':>24} {'logins/s':>10}")
+        # Every login misses the cache, and the KDF runs on the callers'
+        # threads in the same interpreter as everything else.
+        bank = BankingSystem(JsonStorage(data_file), passwords=PasswordService(use_processes=False))
+        print(f"{'threads, cold cache':>24} {logins_per_second(bank, args.customers, args.threads):>10,.1f}")
+        bank.close()
+        
+        bank = BankingSystem(JsonStorage(data_file), passwords=PasswordService(args.workers, use_processes=True))
+        # Starts the pool so process start-up is not billed to the storm.
+        bank.passwords.hash(PASSWORD)
+        print(f"{'processes, cold cache':>24} {logins_per_second(bank, args.customers, args.threads):>10,.1f}")
+        print(f"{'processes, warm cache':>24} {logins_per_second(bank, args.customers, args.threads):>10,.1f}")
+        bank.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+from src.core.constants import *
+from src.services.banking_system import BankingSystem
+from src.services.storage import JsonStorage
+from benchmarks.journal_benchmark import write_dataset, PASSWORD
+
+def operations_per_second(bank, account_count, operations):
+    rng = random.Random(0)
+    numbers = [ACCOUNT_NUMBER_FORMAT.format(rng.randint(1, account_count)) for _ in range(operations)]
+    start = time.perf_counter()
+    for account_number in numbers:
+        bank.deposit(account_number, 10.0)
+        bank.get_account_balance(account_number)
+    return operations / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description="Deposit throughput with metrics off and on")
+    parser.add_argument("--accounts", type=int, default=100_000)
+    parser.add_argument("--operations", type=int, default=100_000)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--output", default=None, help="also write the Prometheus dump here")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = os.path.join(tmp, "bank_data.json")
+        write_dataset(data_file, args.accounts)
+        # fsync is off so the comparison measures the instrumented Python
+        # code rather than the disk.
+        bank = BankingSystem(JsonStorage(data_file, os.path.join(tmp, "bank_data.journal"),
+                                         fsync_every=0, compact_every=0))
+        bank.login(CUSTOMER_ID_FORMAT.format(1), PASSWORD)
+        
+        print(f"{'round':>6} {'off ops/s':>12} {'on ops/s':>12} {'overhead':>9}")
+        for round_number in range(1, args.rounds + 1):
+            bank.disable_metrics()
+            off = operations_per_second(bank, args.accounts, args.operations)
+            metrics = bank.enable_metrics()
+            on = operations_per_second(bank, args.accounts, args.operations)
+            print(f"{round_number:>6} {off:>12,.0f} {on:>12,.0f} {(off / on - 1) * 100:>8.1f}%")
+        
+        if args.output:
+            metrics.write_prometheus(args.output)
+        deposit = metrics.snapshot()['operations']['deposit']
+        print(f"deposit p50 <= {deposit['p50'] * 1e6:.1f} us, p99 <= {deposit['p99'] * 1e6:.1f} us")
+        bank.close()
+
+if __name__ == "__main__":
+    main()
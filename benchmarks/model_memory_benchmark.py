@@ -0,0 +1,55 @@
+import argparse
+import tracemalloc
+from src.core.constants import *
+from src.core.data_structures import CustomerAccountIndex
+from src.core.models import Customer, BankAccount
+
+def measure(build):
+    tracemalloc.start()
+    kept = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, kept
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory per Customer and per BankAccount object")
+    parser.add_argument("--customers", type=int, default=1_000_000)
+    parser.add_argument("--accounts-per-customer", type=int, default=2)
+    parser.add_argument("--transacting", type=float, default=0.5,
+                        help="share of accounts with at least one transaction")
+    args = parser.parse_args()
+    
+    # The id, name and hash strings exist either way (they come from the
+    # snapshot), so they are created before measuring.
+    customer_ids = [CUSTOMER_ID_FORMAT.format(i) for i in range(1, args.customers + 1)]
+    names = ["customer%d" % i for i in range(args.customers)]
+    password_hash = "scrypt$" + "0" * 120
+    account_count = args.customers * args.accounts_per_customer
+    numbers = [ACCOUNT_NUMBER_FORMAT.format(i) for i in range(1, account_count + 1)]
+    owners = [customer_ids[i // args.accounts_per_customer] for i in range(account_count)]
+    
+    customer_bytes, customers = measure(lambda: [Customer(customer_id, name, password_hash, is_hashed=True)
+                                                 for customer_id, name in zip(customer_ids, names)])
+    index = CustomerAccountIndex()
+    
+    def build_accounts():
+        accounts = []
+        for number, owner in zip(numbers, owners):
+            accounts.append(BankAccount(number, owner))
+            index.add(owner, number)
+        return accounts
+    
+    account_bytes, accounts = measure(build_accounts)
+    
+    def first_transactions():
+        for account in accounts[:int(account_count * args.transacting)]:
+            account.add_transaction(TRANSACTION_TYPES['DEPOSIT'], 1.0, CASH_DEPOSIT)
+    
+    history_bytes, _ = measure(first_transactions)
+    print(f"{'object':>34} {'bytes':>8}")
+    print(f"{'Customer':>34} {customer_bytes / args.customers:>8.1f}")
+    print(f"{'BankAccount + index entry':>34} {account_bytes / account_count:>8.1f}")
+    print(f"{'first transaction of an account':>34} {history_bytes / max(1, int(account_count * args.transacting)):>8.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import argparse
+import random
+import time
+from src.core.constants import *
+from src.core.data_structures import TransactionScheduler
+
+# Strict priority, as when the priority heap was drained before the queue.
+STRICT_WEIGHTS = {SCHEDULER_PRIORITY: 1 << 30, SCHEDULER_NORMAL: 1}
+
+def percentile(values, fraction):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def simulate(weights, max_wait, ticks, capacity, load, priority_share, seed):
+    # Discrete time: every tick transfers arrive at `load` times the service
+    # rate and `capacity` of them are served with pop_batch. Latency is in
+    # ticks between push and pop.
+    now = [0]
+    scheduler = TransactionScheduler(weights, max_wait, clock=lambda: now[0])
+    rng = random.Random(seed)
+    latencies = {SCHEDULER_PRIORITY: [], SCHEDULER_NORMAL: []}
+    for tick in range(ticks):
+        now[0] = tick
+        arrivals = capacity * load
+        arrivals = int(arrivals) + (rng.random() < arrivals - int(arrivals))
+        for _ in range(arrivals):
+            priority = rng.random() < priority_share
+            amount = float(rng.randint(PRIORITY_TRANSFER_AMOUNT + 1, 10 * PRIORITY_TRANSFER_AMOUNT)
+                           if priority else rng.randint(1, PRIORITY_TRANSFER_AMOUNT))
+            scheduler.push({'amount': amount, 'priority': priority, 'enqueued': tick})
+        for transaction in scheduler.pop_batch(capacity):
+            name = TransactionScheduler.class_of(transaction)
+            latencies[name].append(tick - transaction['enqueued'])
+    return latencies, {name: scheduler.depth(name) for name in latencies}
+
+def operations_per_second(count):
+    scheduler = TransactionScheduler()
+    rng = random.Random(0)
+    transactions = [{'amount': float(rng.randint(1, 2 * PRIORITY_TRANSFER_AMOUNT)), 'priority': rng.random() < 0.5}
+                    for _ in range(count)]
+    start = time.perf_counter()
+    for transaction in transactions:
+        scheduler.push(transaction)
+    while scheduler.pop_batch(64):
+        pass
+    return count / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description="Queueing latency per class under mixed transfer load")
+    parser.add_argument("--ticks", type=int, default=20_000)
+    parser.add_argument("--capacity", type=int, default=10, help="transfers served per tick")
+    parser.add_argument("--load", type=float, default=1.05, help="arrivals per tick / capacity")
+    parser.add_argument("--priority-share", type=float, default=0.8)
+    parser.add_argument("--max-wait", type=float, default=200, help="ticks before a transfer is aged")
+    parser.add_argument("--operations", type=int, default=1_000_000)
+    args = parser.parse_args()
+    
+    policies = [
+        ("strict", STRICT_WEIGHTS, 0),
+        ("weighted", SCHEDULER_WEIGHTS, 0),
+        ("weighted+aging", SCHEDULER_WEIGHTS, args.max_wait)
+    ]
+    print(f"{'policy':>15} {'class':>9} {'served':>9} {'queued':>8} {'p50':>8} {'p99':>8} {'max':>8}  (ticks)")
+    for label, weights, max_wait in policies:
+        latencies, queued = simulate(weights, max_wait, args.ticks, args.capacity, args.load,
+                                     args.priority_share, seed=1)
+        for name, values in latencies.items():
+            print(f"{label:>15} {name:>9} {len(values):>9,} {queued[name]:>8,} {percentile(values, 0.5):>8.0f} "
+                  f"{percentile(values, 0.99):>8.0f} {max(values, default=0):>8.0f}")
+    print(f"push + pop_batch: {operations_per_second(args.operations):,.0f} transfers/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from src.core.constants import *
+from benchmarks.journal_benchmark import write_dataset, PASSWORD
+
+# Weighted mix of what a client sends once logged in.
+MIX = [("balance", 0.5), ("deposit", 0.2), ("withdraw", 0.1), ("transfer", 0.2)]
+
+def make_request(rng, request_id, account_count):
+    roll = rng.random()
+    for op, weight in MIX:
+        if roll < weight:
+            break
+        roll -= weight
+    account_number = ACCOUNT_NUMBER_FORMAT.format(rng.randint(1, account_count))
+    if op == "balance":
+        args = {"account_number": account_number}
+    elif op == "transfer":
+        args = {"from_account": account_number,
+                "to_account": ACCOUNT_NUMBER_FORMAT.format(rng.randint(1, account_count)),
+                "amount": rng.randint(1, 1_000)}
+    else:
+        args = {"account_number": account_number, "amount": rng.randint(1, 1_000)}
+    return (json.dumps({"id": request_id, "op": op, "args": args}) + "\n").encode()
+
+async def run_client(connect, client_id, args, latencies, counts):
+    rng = random.Random(args.seed * 1_000_003 + client_id)
+    reader, writer = await connect()
+    writer.write((json.dumps({"id": 0, "op": "login", "args": {
+        "customer_id": CUSTOMER_ID_FORMAT.format(1), "password": PASSWORD}}) + "\n").encode())
+    await writer.drain()
+    json.loads(await reader.readline())
+    
+    # Keep up to --pipeline requests in flight; responses come back in order.
+    sent_at = []
+    next_id = 1
+    received = 0
+    while received < args.requests:
+        while next_id <= args.requests and len(sent_at) - received < args.pipeline:
+            sent_at.append(time.perf_counter())
+            writer.write(make_request(rng, next_id, args.accounts))
+            next_id += 1
+        await writer.drain()
+        response = json.loads(await reader.readline())
+        latencies.append(time.perf_counter() - sent_at[received])
+        counts["error" if "error" in response else "ok"] += 1
+        received += 1
+    writer.close()
+
+async def run_load(connect, args):
+    latencies = []
+    counts = {"ok": 0, "error": 0}
+    start = time.perf_counter()
+    await asyncio.gather(*(run_client(connect, i, args, latencies, counts) for i in range(args.clients)))
+    return time.perf_counter() - start, sorted(latencies), counts
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency and throughput of the socket server")
+    parser.add_argument("--clients", type=int, default=1_000)
+    parser.add_argument("--requests", type=int, default=50, help="requests per client")
+    parser.add_argument("--pipeline", type=int, default=4, help="requests in flight per client")
+    parser.add_argument("--accounts", type=int, default=10_000)
+    parser.add_argument("--workers", type=int, default=SERVER_WORKERS)
+    parser.add_argument("--unix", action="store_true", help="use a Unix socket instead of TCP")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = os.path.join(tmp, "bank_data.json")
+        write_dataset(data_file, args.accounts)
+        command = [sys.executable, "-m", "src.services.server", "--data", data_file,
+                   "--journal", os.path.join(tmp, "bank_data.journal"),
+                   "--workers", str(args.workers)]
+        if args.unix:
+            command += ["--unix", os.path.join(tmp, "bank.sock")]
+        else:
+            command += ["--port", "0"]
+        server = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+        try:
+            address = server.stdout.readline().strip()
+            if args.unix:
+                connect = lambda: asyncio.open_unix_connection(address, limit=SERVER_MAX_LINE)
+            else:
+                host, port = address.rsplit(":", 1)
+                connect = lambda: asyncio.open_connection(host, int(port), limit=SERVER_MAX_LINE)
+            elapsed, latencies, counts = asyncio.run(run_load(connect, args))
+        finally:
+            server.terminate()
+            server.wait()
+    
+    total = len(latencies)
+    print(f"clients {args.clients}, pipeline {args.pipeline}, {total} requests in {elapsed:.2f}s "
+          f"({counts['error']} rejected by the bank)")
+    print(f"{'req/s':>10} {'p50 ms':>8} {'p99 ms':>8}")
+    print(f"{total / elapsed:>10.0f} {percentile(latencies, 0.5) * 1000:>8.2f} "
+          f"{percentile(latencies, 0.99) * 1000:>8.2f}")
+
+if __name__ == "__main__":
+    main()
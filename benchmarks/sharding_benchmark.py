@@ -0,0 +1,85 @@
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from src.core.constants import *
+from src.services.sharding import ShardedBank
+
+PASSWORD = "benchmark1"
+OPENING_BALANCE = 1_000_000.0
+
+def balance_of(bank, account_number, customer_id):
+    return float(bank.get_account_balance(account_number, customer_id).rsplit(' ', 1)[1])
+
+def run_clients(bank, owners, clients, min_seconds, transfer_ratio, seed):
+    numbers = list(owners)
+    counts = []
+    deposited = []
+    
+    def client(index):
+        rng = random.Random(seed + index)
+        done = cross = 0
+        total = 0.0
+        start = time.perf_counter()
+        while time.perf_counter() - start < min_seconds:
+            account_number = rng.choice(numbers)
+            if rng.random() < transfer_ratio:
+                to_account = rng.choice(numbers)
+                cross += bank.shard_for(account_number) is not bank.shard_for(to_account)
+                bank.transfer(account_number, to_account, 1.0)
+            else:
+                bank.deposit(account_number, 1.0, owners[account_number])
+                total += 1.0
+            done += 1
+        counts.append((done, cross))
+        deposited.append(total)
+    
+    threads = [threading.Thread(target=client, args=(index,)) for index in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    operations = sum(done for done, _ in counts)
+    return operations / elapsed, sum(cross for _, cross in counts) / max(1, operations), sum(deposited)
+
+def main():
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Throughput of a ShardedBank from 1 to N shard processes")
+    parser.add_argument("--shards", type=int, nargs="+",
+                        default=sorted({1, 2, 4, cores} - {0}))
+    parser.add_argument("--customers", type=int, default=16)
+    parser.add_argument("--accounts-per-customer", type=int, default=64)
+    parser.add_argument("--clients", type=int, default=32, help="router threads issuing operations")
+    parser.add_argument("--transfer-ratio", type=float, default=0.2)
+    parser.add_argument("--min-seconds", type=float, default=5.0)
+    args = parser.parse_args()
+    
+    print(f"{os.cpu_count()} cores")
+    print(f"{'shards':>7} {'ops/s':>10} {'speedup':>8} {'cross-shard':>12} {'conserved':>10}")
+    baseline = None
+    for shard_count in args.shards:
+        with tempfile.TemporaryDirectory() as tmp:
+            bank = ShardedBank(shard_count, os.path.join(tmp, "bank_data.json"),
+                               os.path.join(tmp, "bank_data.journal"), fsync_every=0, compact_every=0)
+            owners = {}
+            for index in range(args.customers):
+                customer_id = bank.register_customer("customer%d" % index, PASSWORD).rsplit(' ', 1)[1]
+                for _ in range(args.accounts_per_customer):
+                    owners[bank.create_account(customer_id).rsplit(' ', 1)[1]] = customer_id
+            for account_number, customer_id in owners.items():
+                bank.deposit(account_number, OPENING_BALANCE, customer_id)
+            
+            rate, cross, deposited = run_clients(bank, owners, args.clients, args.min_seconds,
+                                                 args.transfer_ratio, shard_count)
+            total = sum(balance_of(bank, number, owner) for number, owner in owners.items())
+            conserved = abs(total - (OPENING_BALANCE * len(owners) + deposited)) < 1e-6
+            bank.close()
+        baseline = baseline or rate
+        print(f"{shard_count:>7} {rate:>10,.1f} {rate / baseline:>7.2f}x {cross:>11.1%} {str(conserved):>10}")
+
+if __name__ == "__main__":
+    main()
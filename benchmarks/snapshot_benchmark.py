@@ -0,0 +1,57 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+from src.core.constants import *
+from src.services.banking_system import BankingSystem
+from src.services.storage import JsonStorage
+from benchmarks.journal_benchmark import write_dataset
+
+def timed_snapshot(storage, write):
+    written = storage.bytes_written
+    start = time.perf_counter()
+    write()
+    return time.perf_counter() - start, storage.bytes_written - written
+
+def main():
+    parser = argparse.ArgumentParser(description="Full vs incremental snapshots, and deposits while one is written")
+    parser.add_argument("--accounts", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--changed", type=int, default=100, help="accounts deposited to between snapshots")
+    parser.add_argument("--min-seconds", type=float, default=3.0)
+    args = parser.parse_args()
+    
+    print(f"{'accounts':>10} {'full s':>8} {'full MB':>8} {'incr s':>8} {'incr MB':>8} "
+          f"{'dep/s idle':>11} {'dep/s snapshotting':>19}")
+    for account_count in args.accounts:
+        with tempfile.TemporaryDirectory() as tmp:
+            data_file = os.path.join(tmp, "bank_data.json")
+            customer_id = write_dataset(data_file, account_count)
+            # compact_every=0: snapshots only when asked for below.
+            bank = BankingSystem(JsonStorage(data_file, os.path.join(tmp, "bank_data.journal"),
+                                             fsync_every=0, compact_every=0))
+            customer = bank.customers.get(customer_id)
+            storage = bank.storage
+            full_time, full_bytes = timed_snapshot(storage, bank.save_data)
+            
+            rng = random.Random(0)
+            for _ in range(args.changed):
+                bank.deposit(ACCOUNT_NUMBER_FORMAT.format(rng.randint(1, account_count)), 10.0, customer)
+            incr_time, incr_bytes = timed_snapshot(storage, storage.snapshots.write)
+            
+            rates = []
+            for background in (False, True):
+                done = 0
+                start = time.perf_counter()
+                while time.perf_counter() - start < args.min_seconds:
+                    if background and done % args.changed == 0:
+                        storage.snapshots.request()
+                    bank.deposit(ACCOUNT_NUMBER_FORMAT.format(rng.randint(1, account_count)), 10.0, customer)
+                    done += 1
+                rates.append(done / (time.perf_counter() - start))
+            bank.close()
+        print(f"{account_count:>10} {full_time:>8.3f} {full_bytes / 1e6:>8.2f} {incr_time:>8.3f} "
+              f"{incr_bytes / 1e6:>8.2f} {rates[0]:>11,.1f} {rates[1]:>19,.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from src.core.constants import *
+from src.services.banking_system import BankingSystem
+from src.services.storage import JsonStorage
+from benchmarks.journal_benchmark import write_dataset, PASSWORD
+
+MODES = ["legacy", "streaming", "background"]
+
+class LegacyJsonStorage(JsonStorage):
+    def load(self, progress=None):
+        with open(self.data_file, 'r') as f:
+            data = json.load(f)
+        for customer_data in data.get(DATA_CUSTOMERS_KEY, []):
+            customer_data[CHANGE_OP_KEY] = CHANGE_CUSTOMER
+            yield customer_data
+        for account_data in data.get(DATA_ACCOUNTS_KEY, []):
+            account_data[CHANGE_OP_KEY] = CHANGE_ACCOUNT
+            yield account_data
+
+def run_child(mode, data_file):
+    start = time.perf_counter()
+    if mode == "legacy":
+        bank = BankingSystem(LegacyJsonStorage(data_file))
+    else:
+        bank = BankingSystem(JsonStorage(data_file), background_load=(mode == "background"))
+    bank.login(CUSTOMER_ID_FORMAT.format(1), PASSWORD)
+    first_lookup = time.perf_counter() - start
+    bank.wait_loaded()
+    full_load = time.perf_counter() - start
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"first_lookup": first_lookup, "full_load": full_load, "peak_mb": peak_mb}))
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold start time and peak memory of load_data")
+    parser.add_argument("--accounts", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "FILE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.child:
+        run_child(*args.child)
+        return
+    
+    print(f"{'accounts':>10} {'file MB':>8} {'mode':>11} {'first lookup s':>15} "
+          f"{'full load s':>12} {'peak MB':>8}")
+    for account_count in args.accounts:
+        with tempfile.TemporaryDirectory() as tmp:
+            data_file = os.path.join(tmp, "bank_data.json")
+            write_dataset(data_file, account_count)
+            size_mb = os.path.getsize(data_file) / (1 << 20)
+            for mode in MODES:
+                # A fresh interpreter per run keeps peak RSS comparable.
+                output = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.startup_benchmark", "--child", mode, data_file],
+                    check=True, capture_output=True, text=True
+                ).stdout
+                result = json.loads(output)
+                print(f"{account_count:>10} {size_mb:>8.1f} {mode:>11} {result['first_lookup']:>15.3f} "
+                      f"{result['full_load']:>12.3f} {result['peak_mb']:>8.1f}")
+
+if __name__ == "__main__":
+    main()
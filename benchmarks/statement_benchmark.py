@@ -0,0 +1,77 @@
+import argparse
+import os
+import random
+import resource
+import tempfile
+import time
+from datetime import datetime, timedelta
+from src.core.constants import *
+from src.core.data_structures import TransactionHistory
+from src.core.models import BankAccount
+from src.services.statements import StatementExporter
+
+START = datetime(2024, 1, 1)
+
+# Stands in for BankingSystem.iter_accounts over a synthetic dataset without
+# holding it: accounts are made as they are read and share a small set of
+# generated histories, so the export pipeline, not the dataset, is measured.
+class SyntheticBank:
+    def __init__(self, accounts, transactions_per_account, seed, variants=256):
+        rng = random.Random(seed)
+        self.accounts = accounts
+        self.histories = []
+        for _ in range(variants):
+            history = TransactionHistory()
+            balance = 0.0
+            for second in range(transactions_per_account):
+                amount = float(rng.randint(1, 10_000))
+                if balance >= amount and rng.random() < 0.4:
+                    history.append(TRANSACTION_TYPES['WITHDRAW'], -amount, CASH_WITHDRAWAL, None,
+                                   START + timedelta(days=second))
+                    balance -= amount
+                else:
+                    history.append(TRANSACTION_TYPES['TRANSFER_IN'], amount, TRANSFER_FROM_FORMAT,
+                                   ACCOUNT_NUMBER_FORMAT.format(rng.randint(1, accounts)),
+                                   START + timedelta(days=second))
+                    balance += amount
+            self.histories.append((history, balance))
+    
+    def iter_accounts(self, start=0):
+        for position in range(start, self.accounts):
+            account = BankAccount(ACCOUNT_NUMBER_FORMAT.format(position + 1),
+                                  CUSTOMER_ID_FORMAT.format(position // 2 + 1))
+            account.resident_history, account.balance = self.histories[position % len(self.histories)]
+            yield position, account
+
+def main():
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Statements per second of the bulk statement export")
+    parser.add_argument("--accounts", type=int, default=1_000_000)
+    parser.add_argument("--transactions", type=int, default=10, help="transactions per account")
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, cores}))
+    parser.add_argument("--formats", nargs="+", default=[STATEMENT_CSV, STATEMENT_JSONL])
+    parser.add_argument("--chunk-size", type=int, default=STATEMENT_CHUNK_SIZE)
+    args = parser.parse_args()
+    
+    bank = SyntheticBank(args.accounts, args.transactions, seed=1)
+    # A statement period covering the middle of every history.
+    low = START + timedelta(days=args.transactions // 4)
+    high = START + timedelta(days=3 * args.transactions // 4)
+    print(f"{args.accounts:,} accounts, {args.transactions} transactions each, {cores} cores")
+    print(f"{'format':>7} {'mode':>10} {'workers':>8} {'statements/s':>13} {'MB':>8} {'MB/s':>7} {'max RSS MB':>11}")
+    runs = [("in-process", 1, False)] + [("pool", workers, True) for workers in args.workers]
+    for fmt in args.formats:
+        for mode, workers, use_processes in runs:
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, "statements." + fmt)
+                exporter = StatementExporter(path, fmt, low, high, workers, args.chunk_size, use_processes)
+                start = time.perf_counter()
+                count = exporter.export(bank)
+                elapsed = time.perf_counter() - start
+                size = os.path.getsize(path) / 1e6
+            rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+            print(f"{fmt:>7} {mode:>10} {workers:>8} {count / elapsed:>13,.0f} {size:>8,.1f} "
+                  f"{size / elapsed:>7.1f} {rss:>11,.0f}")
+
+if __name__ == "__main__":
+    main()
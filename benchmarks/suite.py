@@ -0,0 +1,158 @@
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from src.core.constants import *
+from src.services.banking_system import BankingSystem
+from src.services.snapshots import chunks_path
+from src.services.storage import JsonStorage
+from benchmarks.data_generator import write_bank_data, customer_id, account_number, PASSWORD
+
+SCENARIOS = ["cold_start", "login", "deposit", "withdraw", "transfer", "bulk_transfer",
+             "transaction_history", "search_by_balance", "save_data"]
+
+def summarize(latencies, elapsed=None):
+    latencies = sorted(latencies)
+    elapsed = sum(latencies) if elapsed is None else elapsed
+    count = len(latencies)
+    return {
+        "operations": count,
+        "seconds": elapsed,
+        "ops_per_sec": count / elapsed if elapsed else None,
+        "p50_ms": latencies[count // 2] * 1000 if count else None,
+        "p99_ms": latencies[min(count - 1, int(count * 0.99))] * 1000 if count else None
+    }
+
+def timed(calls):
+    latencies = []
+    clock = time.perf_counter
+    for call, args in calls:
+        start = clock()
+        call(*args)
+        latencies.append(clock() - start)
+    return summarize(latencies)
+
+def owner(bank, number):
+    return bank.customers.get(bank.accounts.get(number).customer_id)
+
+def snapshot_bytes(data_file):
+    # The manifest plus every chunk it points to.
+    directory = chunks_path(data_file)
+    chunks = os.listdir(directory) if os.path.isdir(directory) else []
+    return os.path.getsize(data_file) + sum(os.path.getsize(os.path.join(directory, name)) for name in chunks)
+
+def run_scenario(name, bank, data_file, rng, args, counts):
+    customers, accounts = counts
+    operations = args.operations
+    random_account = lambda: account_number(rng.randint(1, accounts))
+    if name == "cold_start":
+        # Loads a copy of the data and journal, so the bank under test keeps
+        # sole use of its files.
+        bank.storage.snapshots.wait()
+        with tempfile.TemporaryDirectory() as copy:
+            shutil.copytree(os.path.dirname(data_file), copy, dirs_exist_ok=True)
+            journal_file = os.path.join(copy, os.path.basename(bank.storage.journal.path))
+            start = time.perf_counter()
+            cold = BankingSystem(JsonStorage(os.path.join(copy, os.path.basename(data_file)), journal_file,
+                                             compact_every=0))
+            elapsed = time.perf_counter() - start
+            cold.close()
+        return summarize([elapsed])
+    if name == "login":
+        return timed((bank.login, (customer_id(rng.randint(1, customers)), PASSWORD))
+                     for _ in range(operations))
+    if name in ("deposit", "withdraw"):
+        operation = getattr(bank, name)
+        numbers = [random_account() for _ in range(operations)]
+        return timed((operation, (number, 1.0, owner(bank, number))) for number in numbers)
+    if name == "transfer":
+        return timed((bank.transfer, (random_account(), random_account(), 1.0))
+                     for _ in range(operations))
+    if name == "bulk_transfer":
+        batches = max(1, operations // args.batch_size)
+        result = timed((bank.submit_batch, ([(random_account(), random_account(), 1.0)
+                                             for _ in range(args.batch_size)],))
+                       for _ in range(batches))
+        result["transfers_per_sec"] = result["ops_per_sec"] * args.batch_size
+        return result
+    if name == "transaction_history":
+        numbers = [random_account() for _ in range(operations)]
+        return timed((bank.get_transaction_history, (number, owner(bank, number))) for number in numbers)
+    if name == "search_by_balance":
+        ranges = []
+        for _ in range(operations):
+            low = rng.uniform(0, 1_000_000)
+            ranges.append((low, low + 1_000))
+        return timed((bank.search_accounts_by_balance, bounds) for bounds in ranges)
+    if name == "save_data":
+        written = bank.storage.bytes_written
+        result = timed([(bank.save_data, ())])
+        result["bytes"] = bank.storage.bytes_written - written
+        return result
+    raise ValueError(name)
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Reproducible benchmark suite with JSON output")
+    parser.add_argument("--accounts", type=int, nargs="+", default=[1_000, 10_000, 100_000],
+                        help="dataset sizes; 1M and 10M work but need minutes and gigabytes")
+    parser.add_argument("--accounts-per-customer", type=float, default=2.0)
+    parser.add_argument("--transactions-per-account", type=float, default=5.0)
+    parser.add_argument("--operations", type=int, default=2_000, help="operations per scenario")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="write results here instead of stdout")
+    args = parser.parse_args()
+    
+    report = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "operations": args.operations,
+        "results": []
+    }
+    for accounts in args.accounts:
+        customers = max(1, int(accounts / args.accounts_per_customer))
+        transactions = int(accounts * args.transactions_per_account)
+        with tempfile.TemporaryDirectory() as tmp:
+            data_file = os.path.join(tmp, "bank_data.json")
+            start = time.perf_counter()
+            write_bank_data(data_file, customers, accounts, transactions, args.seed)
+            print(f"{accounts} accounts generated in {time.perf_counter() - start:.1f}s",
+                  file=sys.stderr)
+            # Mutating scenarios go through the journal so each operation
+            # costs what it costs in production, not a full snapshot rewrite.
+            bank = BankingSystem(JsonStorage(data_file, os.path.join(tmp, "bank_data.journal"),
+                                             compact_every=0))
+            rng = random.Random(args.seed)
+            for name in args.scenarios:
+                result = run_scenario(name, bank, data_file, rng, args, (customers, accounts))
+                result.update({"scenario": name, "accounts": accounts, "customers": customers,
+                               "transactions": transactions, "file_bytes": snapshot_bytes(data_file)})
+                report["results"].append(result)
+                print(f"  {name}: {result['ops_per_sec']:,.1f} ops/s", file=sys.stderr)
+            bank.close()
+    
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
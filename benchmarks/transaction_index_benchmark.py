@@ -0,0 +1,92 @@
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from src.core.constants import *
+from src.core.data_structures import TransactionHistory
+from src.services.transaction_index import TransactionIndex
+
+START = datetime(2024, 1, 1)
+TYPES = [TRANSACTION_TYPES['DEPOSIT'], TRANSACTION_TYPES['WITHDRAW'],
+         TRANSACTION_TYPES['TRANSFER_IN'], TRANSACTION_TYPES['TRANSFER_OUT']]
+
+class SyntheticAccount:
+    def __init__(self, account_number):
+        self.account_number = account_number
+        self.transaction_history = TransactionHistory()
+
+def make_accounts(transactions, accounts, seed):
+    # One transaction a second, spread over random accounts.
+    rng = random.Random(seed)
+    result = [SyntheticAccount("ACC%06d" % (index + 1)) for index in range(accounts)]
+    for second in range(transactions):
+        transaction_type = rng.choice(TYPES)
+        amount = float(rng.randint(1, 10_000))
+        if transaction_type in (TRANSACTION_TYPES['WITHDRAW'], TRANSACTION_TYPES['TRANSFER_OUT']):
+            amount = -amount
+        rng.choice(result).transaction_history.append(transaction_type, amount, CASH_DEPOSIT, None,
+                                                      START + timedelta(seconds=second))
+    return result
+
+def scan(accounts, start, end, transaction_type, min_amount):
+    # What answering the query takes without the index.
+    start, end = start.isoformat(), end.isoformat()
+    return [(account.account_number, record) for account in accounts
+            for record in account.transaction_history
+            if start <= record.timestamp <= end and record.type == transaction_type
+            and abs(record.amount) >= min_amount]
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def main():
+    parser = argparse.ArgumentParser(description="Cross-account transaction search latency by history size")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--accounts", type=int, default=10_000)
+    parser.add_argument("--window", type=int, default=600, help="seconds of history searched")
+    parser.add_argument("--min-amount", type=float, default=5_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--scan-limit", type=int, default=100_000, help="largest size also timed without the index")
+    args = parser.parse_args()
+    
+    print(f"withdrawals of at least {args.min_amount:,.0f} in a {args.window}s window")
+    print(f"{'transactions':>13} {'build s':>8} {'add/s':>10} {'matches':>8} {'p50 ms':>8} {'p99 ms':>8} {'scan ms':>9}")
+    for size in args.sizes:
+        accounts = make_accounts(size, args.accounts, seed=size)
+        start = time.perf_counter()
+        index = TransactionIndex()
+        index.build(accounts)
+        build = time.perf_counter() - start
+        
+        extra = SyntheticAccount("ACC999999")
+        history = extra.transaction_history
+        added = 10_000
+        start = time.perf_counter()
+        for second in range(added):
+            history.append(TRANSACTION_TYPES['DEPOSIT'], 1.0, CASH_DEPOSIT, None,
+                           START + timedelta(seconds=size + second))
+            index.add(extra.account_number, history)
+        add_rate = added / (time.perf_counter() - start)
+        
+        rng = random.Random(1)
+        latencies = []
+        matches = 0
+        for _ in range(args.queries):
+            low = START + timedelta(seconds=rng.randint(0, max(0, size - args.window)))
+            high = low + timedelta(seconds=args.window)
+            start = time.perf_counter()
+            matches += sum(1 for _ in index.search(low, high, [TRANSACTION_TYPES['WITHDRAW']],
+                                                   min_amount=args.min_amount))
+            latencies.append((time.perf_counter() - start) * 1000)
+        
+        scan_ms = "-"
+        if size <= args.scan_limit:
+            start = time.perf_counter()
+            scan(accounts, low, high, TRANSACTION_TYPES['WITHDRAW'], args.min_amount)
+            scan_ms = f"{(time.perf_counter() - start) * 1000:,.1f}"
+        print(f"{size:>13,} {build:>8.2f} {add_rate:>10,.0f} {matches / args.queries:>8.1f} "
+              f"{percentile(latencies, 0.5):>8.3f} {percentile(latencies, 0.99):>8.3f} {scan_ms:>9}")
+
+if __name__ == "__main__":
+    main()
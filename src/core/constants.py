@@ -13,6 +13,7 @@ UNAUTHORIZED_ACCESS = "دسترسی غیرمجاز"
 INSUFFICIENT_BALANCE = "موجودی کافی نیست"
 INVALID_AMOUNT = "مبلغ باید مثبت باشد"
 LOGIN_REQUIRED = "لطفا ابتدا وارد شوید"
+NUMPY_REQUIRED = "دفتر ستونی به بسته numpy نیاز دارد"
 
 # پیام‌های موفقیت
 REGISTER_SUCCESS = "ثبت نام با موفقیت انجام شد. شناسه مشتری شما: {}"
@@ -20,6 +21,7 @@ ACCOUNT_CREATED = "حساب با موفقیت ایجاد شد. شماره حسا
 DEPOSIT_SUCCESS = "واریز با موفقیت انجام شد. موجودی جدید: {}"
 WITHDRAW_SUCCESS = "برداشت با موفقیت انجام شد. موجودی جدید: {}"
 TRANSFER_SUCCESS = "انتقال با موفقیت انجام شد. مبلغ {} منتقل شد"
+BATCH_ABORTED = "به دلیل خطا در سایر انتقال‌های این دسته انجام نشد"
 
 # برچسب‌های فرم
 CUSTOMER_ID_LABEL = "شناسه مشتری:"
@@ -53,18 +55,31 @@ BALANCE_FORMAT = "موجودی حساب: {}"
 ACCOUNT_INFO_FORMAT = "حساب: {}"
 BALANCE_INFO_FORMAT = "موجودی: {:.2f} ریال"
 WELCOME_USER_FORMAT = "Welcome {}!"
+LOADING_FORMAT = "در حال بارگذاری داده‌ها... {:.0%}"
+BALANCE_CELL_FORMAT = "{:,.2f}"
+ACCOUNT_COLUMN = "حساب"
+BALANCE_COLUMN = "موجودی (ریال)"
 
 # انواع تراکنش‌ها
 TRANSACTION_TYPES = {
     'DEPOSIT': 'واریز',
     'WITHDRAW': 'برداشت',
     'TRANSFER_OUT': 'انتقال خروج',
-    'TRANSFER_IN': 'انتقال ورود'
+    'TRANSFER_IN': 'انتقال ورود',
+    'INTEREST': 'سود',
+    'FEE': 'کارمزد'
 }
 
 # تنظیمات برنامه
 MIN_PASSWORD_LENGTH = 8
 PRIORITY_TRANSFER_AMOUNT = 1000000  # مبلغ تراکنش‌های با اولویت بالا
+TRANSACTION_PAGE_SIZE = 50  # تعداد تراکنش‌های هر صفحه از تاریخچه
+
+# زمان‌بندی انتقال‌های در انتظار
+SCHEDULER_PRIORITY = 'priority'
+SCHEDULER_NORMAL = 'normal'
+SCHEDULER_WEIGHTS = {SCHEDULER_PRIORITY: 4, SCHEDULER_NORMAL: 1}  # سهم هر دسته از نوبت‌های اجرا
+SCHEDULER_MAX_WAIT = 0  # ثانیه؛ انتقالی که این مدت منتظر مانده زودتر اجرا می‌شود؛ صفر یعنی غیرفعال
 
 # پیام‌های تراکنش
 TRANSACTION_FORMAT = "{} - {}: {} - {}"
@@ -74,6 +89,8 @@ CASH_DEPOSIT = "واریز نقدی"
 CASH_WITHDRAWAL = "برداشت نقدی"
 TRANSFER_TO_FORMAT = "انتقال به {}"
 TRANSFER_FROM_FORMAT = "انتقال از {}"
+MONTHLY_INTEREST = "سود ماهانه"
+MONTHLY_FEE = "کارمزد ماهانه"
 
 # فرمت‌های شناسه
 CUSTOMER_ID_FORMAT = "CUST{:04d}"
@@ -90,4 +107,109 @@ DATA_NAME_KEY = 'name'
 DATA_PASSWORD_HASH_KEY = 'password_hash'
 DATA_ACCOUNT_NUMBER_KEY = 'account_number'
 DATA_BALANCE_KEY = 'balance'
-DATA_TRANSACTION_HISTORY_KEY = 'transaction_history' 
\ No newline at end of file
+DATA_TRANSACTION_HISTORY_KEY = 'transaction_history' 
+DATA_HISTORY_OFFSET_KEY = 'history_offset'
+DATA_HISTORY_COUNT_KEY = 'history_count'
+
+# تنظیمات ذخیره‌سازی
+JOURNAL_FILE_PATH = 'data/bank_data.journal'
+JOURNAL_FSYNC_EVERY = 1  # تعداد رکورد بین هر fsync؛ صفر یعنی واگذاری به سیستم‌عامل
+JOURNAL_COMPACT_EVERY = 10000  # تعداد رکورد ژورنال پیش از فشرده‌سازی در snapshot
+SQLITE_FILE_PATH = 'data/bank_data.db'
+JSON_STREAM_CHUNK_SIZE = 1 << 20  # اندازه هر تکه هنگام خواندن جریانی فایل داده
+CONCURRENT_WORKERS = 8  # تعداد نخ‌های اجرای همزمان تراکنش‌ها
+COMMIT_COALESCE_INTERVAL = 0.002  # ثانیه؛ بازه تجمیع ذخیره‌سازی‌های همزمان
+LOAD_NOTIFY_EVERY = 1000  # تعداد رکورد بین هر اعلان پیشرفت بارگذاری پس‌زمینه
+ACCOUNT_CACHE_SIZE = 100000  # حداکثر حساب‌های نگه‌داشته‌شده در حافظه برای ذخیره‌سازی تنبل
+HISTORY_FILE_SUFFIX = '.history'  # پسوند فایل تاریخچه تراکنش‌ها در کنار فایل داده
+HISTORY_CACHE_SIZE = 10000  # حداکثر تاریخچه‌های حساب نگه‌داشته‌شده در حافظه
+HISTORY_READ_SIZE = 512  # بایت؛ اندازه هر خواندن از فایل تاریخچه
+BALANCE_FILE_SUFFIX = '.balances'  # پسوند جدول موجودی نگاشت‌شده در حافظه
+BALANCE_MSYNC_EVERY = 0  # تعداد ذخیره‌سازی بین هر msync جدول موجودی؛ صفر یعنی واگذاری به سیستم‌عامل
+BALANCE_TABLE_MAGIC = b'BALTBL01'
+BALANCE_TABLE_MIN_ROWS = 1024  # ظرفیت اولیه جدول موجودی
+BALANCE_SCAN_ROWS = 4096  # تعداد رکوردهای هر تکه هنگام پیمایش جدول موجودی
+SNAPSHOT_CHUNKS_SUFFIX = '.chunks'  # پسوند پوشه تکه‌های snapshot در کنار فایل داده
+SNAPSHOT_CHUNK_SIZE = 1024  # تعداد شناسه‌های پشت‌سرهم در هر تکه snapshot
+JOURNAL_ROTATED_SUFFIX = '.1'  # پسوند ژورنال کنارگذاشته‌شده تا پایان نوشتن snapshot
+SHARD_COUNT = 0  # تعداد فرایندهای shard؛ صفر یعنی به تعداد هسته‌ها
+SHARD_FILE_FORMAT = '.shard{}'  # پسوند فایل‌های داده و ژورنال هر shard
+TRANSFER_LOG_SUFFIX = '.transfers'  # پسوند گزارش تصمیم‌های انتقال بین shardها
+
+# کلیدهای ژورنال
+DATA_JOURNAL_SEQ_KEY = 'journal_seq'
+DATA_CHUNKS_KEY = 'chunks'
+JOURNAL_SEQ_KEY = 'seq'
+JOURNAL_CHANGES_KEY = 'changes'
+CHANGE_OP_KEY = 'op'
+CHANGE_CUSTOMER = 'customer'
+CHANGE_ACCOUNT = 'account'
+CHANGE_TRANSACTION = 'transaction'
+CHANGE_TRANSFER_ID_KEY = 'transfer_id'
+TRANSFER_STATE_KEY = 'state'
+TRANSFER_COMMIT = 'commit'
+TRANSFER_DONE = 'done'
+CHANGE_TRANSFER = 'transfer'  # وضعیت یک طرف انتقال بین shardها در shard صاحب حساب
+TRANSFER_PREPARED = 'prepared'
+TRANSFER_APPLIED = 'applied'
+TRANSFER_ABORTED = 'aborted'
+DATA_TRANSFERS_KEY = 'transfers'
+
+# تنظیمات دفتر ستونی (numpy)
+LEDGER_FLOAT = 'float64'
+LEDGER_INT = 'int64'
+LEDGER_MINOR_UNITS = 100  # موجودی int64 به واحد یک‌صدم ریال نگه‌داری می‌شود
+
+# تنظیمات سرور
+SERVER_HOST = '127.0.0.1'
+SERVER_PORT = 8765
+SERVER_WORKERS = 64  # نخ‌های اجرای عملیات سرور؛ هر نخ تا پایان ذخیره‌سازی منتظر می‌ماند
+SERVER_PIPELINE_DEPTH = 128  # حداکثر درخواست‌های در صف هر اتصال
+SERVER_MAX_LINE = 1 << 16  # حداکثر طول هر درخواست به بایت
+SERVER_BACKLOG = 1024  # صف اتصال‌های در انتظار پذیرش
+UNKNOWN_OPERATION = "عملیات نامعتبر"
+INVALID_REQUEST = "درخواست نامعتبر"
+INTERNAL_ERROR = "خطای داخلی سرور"  # پاسخ به درخواستی که موتور در اجرای آن خطا داد
+
+# تنظیمات سنجه‌ها
+METRICS_FILE_PATH = 'data/metrics.prom'
+# مرز سطل‌های هیستوگرام زمان اجرا به ثانیه
+METRICS_LATENCY_BUCKETS = (0.000001, 0.0000025, 0.000005, 0.00001, 0.000025, 0.00005, 0.0001,
+                           0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                           0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# مرز سطل‌های هیستوگرام حجم نوشتن به بایت
+METRICS_BYTES_BUCKETS = (128, 512, 2048, 8192, 32768, 131072, 524288, 2097152, 8388608,
+                         33554432, 134217728, 536870912)
+
+# تنظیمات رمز عبور
+PASSWORD_HASHER = 'scrypt'  # الگوریتم پیش‌فرض: scrypt یا pbkdf2_sha256
+SCRYPT_N = 1 << 14  # هزینه حافظه و زمان scrypt
+SCRYPT_R = 8
+SCRYPT_P = 1
+PBKDF2_ITERATIONS = 600000
+PASSWORD_SALT_BYTES = 16
+PASSWORD_WORKERS = 0  # فرایندهای محاسبه رمز؛ صفر یعنی به تعداد هسته‌ها
+CREDENTIAL_CACHE_SIZE = 10000  # حداکثر ورودهای تأییدشده در حافظه
+CREDENTIAL_CACHE_TTL = 300  # ثانیه؛ اعتبار هر ورود تأییدشده در حافظه
+
+# تنظیمات رابط کاربری
+GUI_POLL_INTERVAL = 50  # میلی‌ثانیه؛ فاصله بررسی نتیجه کارهای پس‌زمینه
+BUSY_MESSAGE = "در حال انجام..."
+DASHBOARD_ROWS = 15  # تعداد ردیف‌های قابل مشاهده فهرست حساب‌ها
+
+# رویدادهای تغییر
+EVENT_BUFFER_SIZE = 1024  # ظرفیت صف هر مشترک رویداد
+OVERFLOW_BLOCK = 'block'  # صف پر: ناشر منتظر می‌ماند
+OVERFLOW_DROP_OLDEST = 'drop_oldest'
+OVERFLOW_DROP_NEWEST = 'drop_newest'
+
+# صورت‌حساب‌های گروهی
+STATEMENT_CSV = 'csv'
+STATEMENT_JSONL = 'jsonl'
+STATEMENT_CHUNK_SIZE = 1000  # تعداد حساب‌های هر تکه ارسالی به فرایندهای قالب‌بندی
+STATEMENT_WORKERS = 0  # فرایندهای قالب‌بندی؛ صفر یعنی به تعداد هسته‌ها
+STATEMENT_IN_FLIGHT = 2  # تکه‌های در حال قالب‌بندی به ازای هر فرایند؛ سقف مصرف حافظه
+STATEMENT_CHECKPOINT_SUFFIX = '.checkpoint'
+STATEMENT_OPENING_KEY = 'opening_balance'
+STATEMENT_CLOSING_KEY = 'closing_balance'
+STATEMENT_TRANSACTIONS_KEY = 'transactions'
@@ -1,33 +1,146 @@
+import heapq
+import sys
+import threading
+import time
+from bisect import bisect_left, insort
+from array import array
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, NamedTuple, Optional
+from src.core.constants import SCHEDULER_MAX_WAIT, SCHEDULER_NORMAL, SCHEDULER_PRIORITY, SCHEDULER_WEIGHTS
+
 class HashMap:
-    def __init__(self, size=10):
+    def __init__(self, size=10, load_factor=0.75, rehash_step=4):
         self.size = size
+        self.load_factor = load_factor
+        self.rehash_step = rehash_step
         self.table = [[] for _ in range(size)]
+        self._count = 0
+        self._old_table = None
+        self._old_size = 0
+        self._rehash_index = 0
+        # (table, old table), replaced as a whole whenever either changes.
+        self._tables = (self.table, None)
     
     def _hash(self, key):
         return hash(key) % self.size
     
+    def _bucket(self, key):
+        # During an incremental rehash, keys whose old bucket has not been
+        # migrated yet still live in the old table; migrated buckets are set
+        # to None, after their entries are in the new table. Lookups take no
+        # lock while one writer adds entries: they read both tables as one
+        # pair, so a resize cannot swap the new table in between, and a
+        # bucket found None because a later resize moved it on sends them
+        # back for the current pair.
+        while True:
+            table, old_table = self._tables
+            if old_table is not None:
+                bucket = old_table[hash(key) % len(old_table)]
+                if bucket is not None:
+                    return bucket
+            bucket = table[hash(key) % len(table)]
+            if bucket is not None:
+                return bucket
+    
+    def _start_resize(self):
+        if self._old_table is not None:
+            self._rehash(self._old_size)
+        self._old_table = self.table
+        self._old_size = self.size
+        self._rehash_index = 0
+        self.size *= 2
+        self.table = [[] for _ in range(self.size)]
+        self._tables = (self.table, self._old_table)
+    
+    def _rehash(self, steps):
+        old_table = self._old_table
+        end = min(self._rehash_index + steps, self._old_size)
+        for index in range(self._rehash_index, end):
+            for item in old_table[index]:
+                self.table[self._hash(item[0])].append(item)
+            old_table[index] = None
+        self._rehash_index = end
+        if end == self._old_size:
+            self._old_table = None
+            self._old_size = 0
+            self._rehash_index = 0
+            self._tables = (self.table, None)
+    
     def add(self, key, value):
-        index = self._hash(key)
-        for item in self.table[index]:
+        if self._old_table is not None:
+            self._rehash(self.rehash_step)
+        bucket = self._bucket(key)
+        for item in bucket:
             if item[0] == key:
                 item[1] = value
                 return
-        self.table[index].append([key, value])
+        bucket.append([key, value])
+        self._count += 1
+        if self._count > self.size * self.load_factor:
+            self._start_resize()
     
     def get(self, key):
-        index = self._hash(key)
-        for item in self.table[index]:
+        for item in self._bucket(key):
             if item[0] == key:
                 return item[1]
         return None
+    
+    def remove(self, key):
+        if self._old_table is not None:
+            self._rehash(self.rehash_step)
+        bucket = self._bucket(key)
+        for i, item in enumerate(bucket):
+            if item[0] == key:
+                del bucket[i]
+                self._count -= 1
+                return item[1]
+        return None
+    
+    def items(self):
+        for bucket in self.table:
+            for item in bucket:
+                yield item[0], item[1]
+        if self._old_table is not None:
+            for bucket in self._old_table[self._rehash_index:]:
+                for item in bucket:
+                    yield item[0], item[1]
+    
+    def keys(self):
+        for key, _ in self.items():
+            yield key
+    
+    def values(self):
+        for _, value in self.items():
+            yield value
+    
+    def __contains__(self, key):
+        for item in self._bucket(key):
+            if item[0] == key:
+                return True
+        return False
+    
+    def __iter__(self):
+        return self.keys()
+    
+    def chain_lengths(self):
+        lengths = [len(bucket) for bucket in self.table]
+        if self._old_table is not None:
+            lengths.extend(len(bucket) for bucket in self._old_table[self._rehash_index:]
+                           if bucket is not None)
+        return lengths
+    
+    def __len__(self):
+        return self._count
 
 class LinkedQueue:
     def __init__(self):
         self.front = None
         self.rear = None
+        self.length = 0
     
     def enqueue(self, data):
         new_node = {'data': data, 'next': None}
+        self.length += 1
         if self.rear is None:
             self.front = self.rear = new_node
         else:
@@ -39,75 +152,417 @@ class LinkedQueue:
             return None
         temp = self.front
         self.front = temp['next']
+        self.length -= 1
         if self.front is None:
             self.rear = None
         return temp['data']
     
     def is_empty(self):
         return self.front is None
+    
+    def __len__(self):
+        return self.length
+
+class TransactionRecord(NamedTuple):
+    type: str
+    amount: float
+    description: str
+    timestamp: str
 
-class MaxHeap:
+class TransactionPage(NamedTuple):
+    records: List[TransactionRecord]
+    next_cursor: Optional[int]
+    total: int
+
+class TransactionHistory:
+    # Columnar, append-only store. Types and description templates are
+    # interned into small integer codes shared by every history; the variable
+    # part of a description (e.g. the counterparty account number) is kept as
+    # a reference and only formatted when a record is read back. Timestamps
+    # are microseconds since the (naive) epoch, so ISO strings round-trip
+    # exactly. The known types and templates are registered at import; any
+    # other value is interned under a lock, since histories are appended to
+    # from many threads.
+    __slots__ = ('types', 'amounts', 'timestamps', 'templates', 'refs')
+    
+    EPOCH = datetime(1970, 1, 1)
+    type_names = []
+    type_codes = {}
+    template_names = ['{}']
+    template_codes = {'{}': 0}
+    _intern_lock = threading.Lock()
+    
     def __init__(self):
-        self.heap = []
+        self.types = array('B')
+        self.amounts = array('d')
+        self.timestamps = array('q')
+        self.templates = array('H')
+        self.refs = []
+    
+    @classmethod
+    def _intern(cls, names, codes, value):
+        code = codes.get(value)
+        if code is None:
+            with cls._intern_lock:
+                code = codes.get(value)
+                if code is None:
+                    # The name goes in first, so a reader that finds the
+                    # code can always look it up.
+                    code = len(names)
+                    names.append(value)
+                    codes[value] = code
+        return code
+    
+    @classmethod
+    def register_type(cls, transaction_type):
+        return cls._intern(cls.type_names, cls.type_codes, transaction_type)
+    
+    @classmethod
+    def register_template(cls, template):
+        return cls._intern(cls.template_names, cls.template_codes, template)
+    
+    @classmethod
+    def _split_description(cls, description):
+        code = cls.template_codes.get(description)
+        if code is not None and '{}' not in description:
+            return code, None
+        for code, template in enumerate(cls.template_names):
+            if code == 0 or '{}' not in template:
+                continue
+            prefix, suffix = template.split('{}', 1)
+            if (len(description) > len(prefix) + len(suffix) and description.startswith(prefix)
+                    and description.endswith(suffix)):
+                return code, sys.intern(description[len(prefix):len(description) - len(suffix)])
+        return 0, description
+    
+    def append(self, transaction_type, amount, template, ref=None, timestamp=None):
+        if timestamp is None:
+            timestamp = datetime.now()
+        self.types.append(self.register_type(transaction_type))
+        self.amounts.append(amount)
+        self.timestamps.append((timestamp - self.EPOCH) // timedelta(microseconds=1))
+        self.templates.append(self.register_template(template))
+        self.refs.append(ref)
+        return self[len(self.amounts) - 1]
+    
+    def append_record(self, transaction_type, amount, description, timestamp):
+        template, ref = self._split_description(description)
+        self.types.append(self.register_type(transaction_type))
+        self.amounts.append(amount)
+        self.timestamps.append((datetime.fromisoformat(timestamp) - self.EPOCH) // timedelta(microseconds=1))
+        self.templates.append(template)
+        self.refs.append(ref)
+    
+    def record(self, index):
+        ref = self.refs[index]
+        template = self.template_names[self.templates[index]]
+        return TransactionRecord(
+            self.type_names[self.types[index]],
+            self.amounts[index],
+            template if ref is None else template.format(ref),
+            (self.EPOCH + timedelta(microseconds=self.timestamps[index])).isoformat()
+        )
+    
+    def page(self, offset=0, cursor=None, limit=50, newest_first=True):
+        # A cursor is an absolute record index, so it stays valid while new
+        # transactions are appended; offset counts from the newest (or
+        # oldest) record and is only used for the first page.
+        total = len(self.amounts)
+        if newest_first:
+            end = total - offset if cursor is None else cursor
+            end = max(0, min(end, total))
+            start = max(0, end - limit)
+            view = self[start:end][::-1]
+            next_cursor = start if start > 0 else None
+        else:
+            start = offset if cursor is None else cursor
+            start = max(0, min(start, total))
+            end = min(total, start + limit)
+            view = self[start:end]
+            next_cursor = end if end < total else None
+        return TransactionPage(list(view), next_cursor, total)
+    
+    def is_empty(self):
+        return not self.amounts
+    
+    def __len__(self):
+        return len(self.amounts)
+    
+    def __getitem__(self, index):
+        return HistoryView(self, range(len(self.amounts)))[index]
+    
+    def __iter__(self):
+        for index in range(len(self.amounts)):
+            yield self.record(index)
+    
+    def __reversed__(self):
+        for index in range(len(self.amounts) - 1, -1, -1):
+            yield self.record(index)
+
+class HistoryView:
+    # A window over a TransactionHistory described by a range of indices;
+    # slicing and reversing compose ranges instead of copying records.
+    __slots__ = ('history', 'indices')
+    
+    def __init__(self, history, indices):
+        self.history = history
+        self.indices = indices
+    
+    def __len__(self):
+        return len(self.indices)
     
-    def insert(self, transaction):
-        self.heap.append(transaction)
-        self._heapify_up(len(self.heap) - 1)
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return HistoryView(self.history, self.indices[index])
+        return self.history.record(self.indices[index])
     
-    def extract_max(self):
-        if not self.heap:
+    def __iter__(self):
+        for index in self.indices:
+            yield self.history.record(index)
+    
+    def __reversed__(self):
+        for index in reversed(self.indices):
+            yield self.history.record(index)
+
+class TransactionScheduler:
+    # Pending transfers in priority classes (SCHEDULER_WEIGHTS). Each class is
+    # a heapq array of (key, seq) pairs: the priority class is ordered by
+    # amount, largest first, the others are plain FIFO, and seq breaks ties
+    # in arrival order. Classes are served by smooth weighted round robin,
+    # so with weights 4:1 ordinary transfers still get one slot in five
+    # under sustained priority load. A transfer whose 'deadline' (on the
+    # scheduler's clock) has passed, or that has waited max_wait seconds,
+    # is served first, earliest deadline first. Entries served through one
+    # heap are left in the other and skipped when they surface.
+    def __init__(self, weights: Optional[Dict[str, int]] = None, max_wait: float = SCHEDULER_MAX_WAIT,
+                 clock: Callable[[], float] = time.monotonic):
+        self.weights = dict(weights or SCHEDULER_WEIGHTS)
+        self.max_wait = max_wait
+        self.clock = clock
+        self._queues = {name: [] for name in self.weights}
+        self._depths = {name: 0 for name in self.weights}
+        self._credits = {name: 0 for name in self.weights}
+        self._deadlines = []
+        # seq -> (class name, transaction) for every transfer still queued.
+        self._entries = {}
+        self._seq = 0
+    
+    @staticmethod
+    def class_of(transaction) -> str:
+        return SCHEDULER_PRIORITY if transaction.get('priority', False) else SCHEDULER_NORMAL
+    
+    def push(self, transaction):
+        name = self.class_of(transaction)
+        self._seq += 1
+        seq = self._seq
+        key = -transaction['amount'] if name == SCHEDULER_PRIORITY else 0
+        heapq.heappush(self._queues[name], (key, seq))
+        self._entries[seq] = (name, transaction)
+        self._depths[name] += 1
+        deadline = transaction.get('deadline')
+        if self.max_wait:
+            aged = self.clock() + self.max_wait
+            deadline = aged if deadline is None else min(deadline, aged)
+        if deadline is not None:
+            heapq.heappush(self._deadlines, (deadline, seq))
+    
+    def pop(self):
+        if not self._entries:
             return None
-        max_val = self.heap[0]
-        self.heap[0] = self.heap[-1]
-        self.heap.pop()
-        self._heapify_down(0)
-        return max_val
-    
-    def _heapify_up(self, index):
-        parent = (index - 1) // 2
-        if parent >= 0 and self.heap[index]['amount'] > self.heap[parent]['amount']:
-            self.heap[index], self.heap[parent] = self.heap[parent], self.heap[index]
-            self._heapify_up(parent)
-    
-    def _heapify_down(self, index):
-        largest = index
-        left = 2 * index + 1
-        right = 2 * index + 2
-        if left < len(self.heap) and self.heap[left]['amount'] > self.heap[largest]['amount']:
-            largest = left
-        if right < len(self.heap) and self.heap[right]['amount'] > self.heap[largest]['amount']:
-            largest = right
-        if largest != index:
-            self.heap[index], self.heap[largest] = self.heap[largest], self.heap[index]
-            self._heapify_down(largest)
+        return self._pop(self.clock() if self._deadlines else None)
+    
+    def pop_batch(self, count: int) -> list:
+        batch = []
+        now = self.clock() if self._deadlines else None
+        while self._entries and len(batch) < count:
+            batch.append(self._pop(now))
+        return batch
+    
+    def depth(self, name: str) -> int:
+        return self._depths[name]
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def _pop(self, now):
+        deadlines = self._deadlines
+        while deadlines and deadlines[0][1] not in self._entries:
+            heapq.heappop(deadlines)
+        if deadlines and now is not None and deadlines[0][0] <= now:
+            return self._take(heapq.heappop(deadlines)[1])
+        queue = self._queues[self._pick()]
+        while True:
+            seq = heapq.heappop(queue)[1]
+            if seq in self._entries:
+                return self._take(seq)
+    
+    def _pick(self):
+        best = None
+        total = 0
+        for name, weight in self.weights.items():
+            if self._depths[name]:
+                self._credits[name] += weight
+                total += weight
+                if best is None or self._credits[name] > self._credits[best]:
+                    best = name
+        self._credits[best] -= total
+        return best
+    
+    def _take(self, seq):
+        name, transaction = self._entries.pop(seq)
+        self._depths[name] -= 1
+        return transaction
 
-class BalanceBST:
+class CustomerAccountIndex:
+    # customer id -> account numbers, one index for the whole bank instead of
+    # a HashMap per customer. Most customers hold one or two accounts, so each
+    # entry is a tuple, replaced on the rare append.
+    __slots__ = ('_accounts',)
+    
     def __init__(self):
-        self.root = None
+        self._accounts = {}
+    
+    def add(self, customer_id: str, account_number: str):
+        numbers = self._accounts.get(customer_id, ())
+        if account_number not in numbers:
+            self._accounts[customer_id] = numbers + (account_number,)
+    
+    def get(self, customer_id: str) -> tuple:
+        return self._accounts.get(customer_id, ())
+    
+    def __len__(self):
+        return len(self._accounts)
+
+class BalanceIndex:
+    # Ordered index of accounts keyed on (balance, account_number), kept as a
+    # list of sorted blocks. A Fenwick tree over the block sizes gives the
+    # number of keys before any block, so lookups, rank counts, inserts and
+    # removes cost O(log n + block size) regardless of insertion order. The
+    # tree is rebuilt, in O(n / block size), only when a block splits or
+    # empties, which is at most once per block size inserts or removes.
+    def __init__(self, block_size=1000):
+        self.block_size = block_size
+        self.blocks = []
+        self.maxes = []
+        self.counts = []
+        self.keys = {}
+        self.accounts = {}
+    
+    def build(self, accounts):
+        self.accounts = {account.account_number: account for account in accounts}
+        self.keys = {number: (account.balance, number) for number, account in self.accounts.items()}
+        ordered = sorted(self.keys.values())
+        size = self.block_size
+        self.blocks = [ordered[i:i + size] for i in range(0, len(ordered), size)]
+        self.maxes = [block[-1] for block in self.blocks]
+        self._build_counts()
+    
+    def _build_counts(self):
+        counts = [len(block) for block in self.blocks]
+        for index in range(len(counts)):
+            parent = index | (index + 1)
+            if parent < len(counts):
+                counts[parent] += counts[index]
+        self.counts = counts
+    
+    def _add_count(self, index, delta):
+        counts = self.counts
+        while index < len(counts):
+            counts[index] += delta
+            index |= index + 1
+    
+    def _count_before(self, index):
+        # Keys in blocks[:index].
+        total = 0
+        while index > 0:
+            total += self.counts[index - 1]
+            index &= index - 1
+        return total
     
     def insert(self, account):
-        self.root = self._insert(self.root, account)
+        if account.account_number in self.keys:
+            self.remove(account)
+        key = (account.balance, account.account_number)
+        self.keys[account.account_number] = key
+        self.accounts[account.account_number] = account
+        if not self.blocks:
+            self.blocks.append([key])
+            self.maxes.append(key)
+            self._build_counts()
+            return
+        index = bisect_left(self.maxes, key)
+        if index == len(self.blocks):
+            index -= 1
+            self.blocks[index].append(key)
+            self.maxes[index] = key
+        else:
+            insort(self.blocks[index], key)
+        block = self.blocks[index]
+        if len(block) > 2 * self.block_size:
+            half = len(block) // 2
+            self.blocks[index:index + 1] = [block[:half], block[half:]]
+            self.maxes[index:index + 1] = [block[half - 1], block[-1]]
+            self._build_counts()
+        else:
+            self._add_count(index, 1)
     
-    def _insert(self, node, account):
-        if node is None:
-            return {'account': account, 'left': None, 'right': None}
-        if account.balance < node['account'].balance:
-            node['left'] = self._insert(node['left'], account)
+    def remove(self, account):
+        key = self.keys.pop(account.account_number, None)
+        if key is None:
+            return
+        del self.accounts[account.account_number]
+        index = bisect_left(self.maxes, key)
+        block = self.blocks[index]
+        del block[bisect_left(block, key)]
+        if block:
+            self.maxes[index] = block[-1]
+            self._add_count(index, -1)
         else:
-            node['right'] = self._insert(node['right'], account)
-        return node
+            del self.blocks[index]
+            del self.maxes[index]
+            self._build_counts()
+    
+    def update(self, account):
+        key = self.keys.get(account.account_number)
+        if key is None or key[0] != account.balance:
+            self.insert(account)
+    
+    def _position(self, key):
+        index = bisect_left(self.maxes, key)
+        if index == len(self.blocks):
+            return len(self.keys)
+        return self._count_before(index) + bisect_left(self.blocks[index], key)
+    
+    def _iter_from(self, key):
+        index = bisect_left(self.maxes, key)
+        if index == len(self.blocks):
+            return
+        block = self.blocks[index]
+        for position in range(bisect_left(block, key), len(block)):
+            yield block[position]
+        for block in self.blocks[index + 1:]:
+            yield from block
     
     def search_range(self, low, high):
         result = []
-        self._search_range(self.root, low, high, result)
+        for balance, account_number in self._iter_from((low, '')):
+            if balance > high:
+                break
+            result.append(self.accounts[account_number])
         return result
     
-    def _search_range(self, node, low, high, result):
-        if node is None:
-            return
-        if low <= node['account'].balance <= high:
-            result.append(node['account'])
-        if node['account'].balance >= low:
-            self._search_range(node['left'], low, high, result)
-        if node['account'].balance <= high:
-            self._search_range(node['right'], low, high, result) 
\ No newline at end of file
+    def count_range(self, low, high):
+        # chr(0x10FFFF) sorts after every account number at that balance.
+        return max(0, self._position((high, chr(0x10FFFF))) - self._position((low, '')))
+    
+    def top_k(self, k):
+        result = []
+        for block in reversed(self.blocks):
+            for balance, account_number in reversed(block):
+                if len(result) >= k:
+                    return result
+                result.append(self.accounts[account_number])
+        return result
+    
+    def __len__(self):
+        return len(self.keys)
\ No newline at end of file
@@ -1,8 +1,21 @@
-import hashlib
-from datetime import datetime
-from src.core.data_structures import HashMap, LinkedQueue
+from typing import Optional
+from src.core.constants import (CASH_DEPOSIT, CASH_WITHDRAWAL, TRANSFER_TO_FORMAT, TRANSFER_FROM_FORMAT,
+                                MONTHLY_INTEREST, MONTHLY_FEE, TRANSACTION_TYPES)
+from src.core.data_structures import TransactionHistory, TransactionRecord
+from src.core.passwords import hash_password, verify_password
 
+for _template in (CASH_DEPOSIT, CASH_WITHDRAWAL, TRANSFER_TO_FORMAT, TRANSFER_FROM_FORMAT,
+                  MONTHLY_INTEREST, MONTHLY_FEE):
+    TransactionHistory.register_template(_template)
+for _transaction_type in TRANSACTION_TYPES.values():
+    TransactionHistory.register_type(_transaction_type)
+
+# Both models use __slots__: with millions of instances the per-object
+# __dict__ was most of their size. A customer's accounts are listed in
+# BankingSystem.customer_accounts rather than on the customer.
 class Customer:
+    __slots__ = ('customer_id', 'name', 'password_hash')
+    
     def __init__(self, customer_id: str, name: str, password: str, is_hashed=False):
         self.customer_id = customer_id
         self.name = name
@@ -10,25 +23,40 @@ class Customer:
             self.password_hash = password
         else:
             self.password_hash = self._hash_password(password)
-        self.accounts = HashMap()
     
     def _hash_password(self, password: str) -> str:
-        return hashlib.sha256(password.encode()).hexdigest()
+        return hash_password(password)
     
     def verify_password(self, password: str) -> bool:
-        return self._hash_password(password) == self.password_hash
+        return verify_password(password, self.password_hash)
 
 class BankAccount:
+    __slots__ = ('account_number', 'customer_id', 'balance', 'resident_history', 'history_source')
+    
     def __init__(self, account_number: str, customer_id: str):
         self.account_number = account_number
         self.customer_id = customer_id
         self.balance = 0.0
-        self.transaction_history = LinkedQueue()
+        # Created on first use, so accounts nobody transacts on carry none.
+        self.resident_history: Optional[TransactionHistory] = None
+        # Set by storage backends that keep history out of memory; it loads
+        # resident_history back whenever that has been dropped.
+        self.history_source = None
+    
+    @property
+    def transaction_history(self) -> TransactionHistory:
+        history = self.resident_history
+        if history is None:
+            if self.history_source is None:
+                history = self.resident_history = TransactionHistory()
+                return history
+            return self.history_source.load(self)
+        if self.history_source is not None:
+            self.history_source.touch(self)
+        return history
     
-    def add_transaction(self, transaction_type: str, amount: float, description: str):
-        self.transaction_history.enqueue({
-            'type': transaction_type,
-            'amount': amount,
-            'description': description,
-            'timestamp': datetime.now().isoformat()
-        }) 
\ No newline at end of file
+    def add_transaction(self, transaction_type: str, amount: float, description: str,
+                        counterparty: Optional[str] = None) -> TransactionRecord:
+        # With a counterparty, description is a format template and only a
+        # reference to the counterparty is stored.
+        return self.transaction_history.append(transaction_type, amount, description, counterparty) 
\ No newline at end of file
@@ -0,0 +1,114 @@
+import hashlib
+import hmac
+import os
+from typing import Dict, Optional, Type
+from src.core.constants import (PASSWORD_HASHER, PBKDF2_ITERATIONS, SCRYPT_N, SCRYPT_R, SCRYPT_P,
+                                PASSWORD_SALT_BYTES)
+
+# Encoded hashes carry their own algorithm and cost, "algorithm$param$...$salt$hash",
+# so every customer can be verified with the parameters they were hashed
+# with while new hashes use the current default.
+SEPARATOR = '$'
+
+class PasswordHasher:
+    algorithm = ''
+    # Slow hashers are worth sending to a worker process.
+    slow = True
+    
+    def params(self) -> tuple:
+        return ()
+    
+    def derive(self, password: str, salt: bytes) -> bytes:
+        raise NotImplementedError
+    
+    def encode(self, password: str, salt: Optional[bytes] = None) -> str:
+        salt = os.urandom(PASSWORD_SALT_BYTES) if salt is None else salt
+        fields = (self.algorithm,) + tuple(str(p) for p in self.params())
+        return SEPARATOR.join(fields + (salt.hex(), self.derive(password, salt).hex()))
+    
+    def verify(self, password: str, encoded: str) -> bool:
+        fields = encoded.split(SEPARATOR)
+        salt, expected = bytes.fromhex(fields[-2]), fields[-1]
+        return hmac.compare_digest(self.derive(password, salt).hex(), expected)
+    
+    @classmethod
+    def from_encoded(cls, encoded: str) -> 'PasswordHasher':
+        return cls(*(int(p) for p in encoded.split(SEPARATOR)[1:-2]))
+
+class Sha256Hasher(PasswordHasher):
+    # The original unsalted format: a bare hex digest with no prefix. Kept
+    # only so existing customers can log in and be rehashed.
+    algorithm = 'sha256'
+    slow = False
+    
+    def encode(self, password: str, salt: Optional[bytes] = None) -> str:
+        return hashlib.sha256(password.encode()).hexdigest()
+    
+    def verify(self, password: str, encoded: str) -> bool:
+        return hmac.compare_digest(self.encode(password), encoded)
+    
+    @classmethod
+    def from_encoded(cls, encoded: str) -> 'PasswordHasher':
+        return cls()
+
+class Pbkdf2Hasher(PasswordHasher):
+    algorithm = 'pbkdf2_sha256'
+    
+    def __init__(self, iterations: int = PBKDF2_ITERATIONS):
+        self.iterations = iterations
+    
+    def params(self):
+        return (self.iterations,)
+    
+    def derive(self, password, salt):
+        return hashlib.pbkdf2_hmac('sha256', password.encode(), salt, self.iterations)
+
+class ScryptHasher(PasswordHasher):
+    algorithm = 'scrypt'
+    
+    def __init__(self, n: int = SCRYPT_N, r: int = SCRYPT_R, p: int = SCRYPT_P):
+        self.n = n
+        self.r = r
+        self.p = p
+    
+    def params(self):
+        return (self.n, self.r, self.p)
+    
+    def derive(self, password, salt):
+        # 128 * n * r bytes of working memory, plus headroom.
+        return hashlib.scrypt(password.encode(), salt=salt, n=self.n, r=self.r, p=self.p,
+                              maxmem=256 * self.n * self.r, dklen=32)
+
+HASHERS: Dict[str, Type[PasswordHasher]] = {
+    hasher.algorithm: hasher for hasher in (Sha256Hasher, Pbkdf2Hasher, ScryptHasher)
+}
+
+_default_hasher: PasswordHasher = HASHERS[PASSWORD_HASHER]()
+
+def set_default_hasher(hasher: PasswordHasher):
+    global _default_hasher
+    _default_hasher = hasher
+
+def default_hasher() -> PasswordHasher:
+    return _default_hasher
+
+def identify(encoded: str) -> PasswordHasher:
+    if SEPARATOR not in encoded:
+        return Sha256Hasher()
+    return HASHERS[encoded.split(SEPARATOR, 1)[0]].from_encoded(encoded)
+
+# Module-level functions so they can be sent to a process pool.
+def hash_password(password: str, hasher: Optional[PasswordHasher] = None) -> str:
+    return (hasher or _default_hasher).encode(password)
+
+def verify_password(password: str, encoded: str) -> bool:
+    try:
+        hasher = identify(encoded)
+    except (KeyError, ValueError):
+        return False
+    return hasher.verify(password, encoded)
+
+def needs_rehash(encoded: str, hasher: Optional[PasswordHasher] = None) -> bool:
+    hasher = hasher or _default_hasher
+    current = identify(encoded)
+    return current.algorithm != hasher.algorithm or current.params() != hasher.params()
@@ -0,0 +1,114 @@
+import hmac
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+from src.core.constants import *
+from src.core.models import Customer
+from src.core.passwords import (PasswordHasher, default_hasher, identify, hash_password,
+                                verify_password, needs_rehash)
+
+# Remembers recent successful logins so a login storm pays for the KDF once
+# per customer per TTL. The password itself is never stored: entries hold an
+# HMAC of it under a key that only lives in this process, and are tied to
+# the customer's current hash so a password change invalidates them.
+class CredentialCache:
+    def __init__(self, capacity: int = CREDENTIAL_CACHE_SIZE, ttl: float = CREDENTIAL_CACHE_TTL):
+        self.capacity = capacity
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._key = os.urandom(32)
+    
+    def _digest(self, password: str) -> bytes:
+        return hmac.new(self._key, password.encode(), 'sha256').digest()
+    
+    def check(self, customer_id: str, encoded: str, password: str) -> bool:
+        with self._lock:
+            entry = self._entries.get(customer_id)
+            if entry is None:
+                return False
+            cached_hash, digest, expires = entry
+            if expires <= time.monotonic() or cached_hash != encoded:
+                del self._entries[customer_id]
+                return False
+            self._entries.move_to_end(customer_id)
+        return hmac.compare_digest(digest, self._digest(password))
+    
+    def remember(self, customer_id: str, encoded: str, password: str):
+        if not self.capacity:
+            return
+        entry = (encoded, self._digest(password), time.monotonic() + self.ttl)
+        with self._lock:
+            self._entries[customer_id] = entry
+            self._entries.move_to_end(customer_id)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+    
+    def forget(self, customer_id: str):
+        with self._lock:
+            self._entries.pop(customer_id, None)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self):
+        return len(self._entries)
+
+# Hashes and verifies passwords for BankingSystem. By default the KDF runs
+# on the caller's thread. With use_processes, as the server asks for, slow
+# KDF work goes to a process pool, created on first use, so a login storm
+# uses every core instead of queueing behind the GIL. The pool is spawned,
+# so only programs with an `if __name__ == "__main__":` guard can use it.
+class PasswordService:
+    def __init__(self, workers: int = PASSWORD_WORKERS, cache: Optional[CredentialCache] = None,
+                 hasher: Optional[PasswordHasher] = None, use_processes: bool = False):
+        self.workers = workers or os.cpu_count() or 1
+        self.cache = CredentialCache() if cache is None else cache
+        self.hasher = hasher
+        self.use_processes = use_processes
+        self._pool = None
+        self._pool_lock = threading.Lock()
+    
+    def _call(self, function, *args):
+        if not self.use_processes:
+            return function(*args)
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    # spawn, because forking a process that already runs
+                    # loader, commit and server threads is unsafe.
+                    self._pool = ProcessPoolExecutor(self.workers,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+        return self._pool.submit(function, *args).result()
+    
+    def hash(self, password: str) -> str:
+        hasher = self.hasher or default_hasher()
+        if not hasher.slow:
+            return hash_password(password, hasher)
+        return self._call(hash_password, password, hasher)
+    
+    def verify(self, customer: Customer, password: str) -> bool:
+        encoded = customer.password_hash
+        if self.cache.check(customer.customer_id, encoded, password):
+            return True
+        try:
+            slow = identify(encoded).slow
+        except (KeyError, ValueError):
+            return False
+        valid = self._call(verify_password, password, encoded) if slow else verify_password(password, encoded)
+        if valid:
+            self.cache.remember(customer.customer_id, encoded, password)
+        return valid
+    
+    def needs_rehash(self, encoded: str) -> bool:
+        return needs_rehash(encoded, self.hasher)
+    
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
@@ -0,0 +1,198 @@
+import mmap
+import os
+import struct
+import threading
+from typing import Iterator, List, Optional, Tuple
+from src.core.constants import *
+
+# magic, record size, rows in use, accounts stored; padded to one cache line.
+HEADER = struct.Struct('<8sIQQ')
+HEADER_SIZE = 64
+# account number, customer id, balance in minor units, version, newest
+# history offset, history count. Ids are padded with NULs to ID_SIZE bytes.
+ID_SIZE = 16
+RECORD = struct.Struct('<%ds%dsqQqq' % (ID_SIZE, ID_SIZE))
+VERSION = struct.Struct('<Q')
+VERSION_OFFSET = 40
+ACCOUNT_PREFIX = ACCOUNT_NUMBER_FORMAT.split('{', 1)[0]
+
+def balance_path(data_file: str) -> str:
+    return os.path.splitext(data_file)[0] + BALANCE_FILE_SUFFIX
+
+def account_row(account_number: str) -> Optional[int]:
+    # ACC000042 lives in row 41.
+    digits = account_number[len(ACCOUNT_PREFIX):]
+    if not account_number.startswith(ACCOUNT_PREFIX) or not digits.isdigit() or int(digits) < 1:
+        return None
+    return int(digits) - 1
+
+def to_minor(balance: float) -> int:
+    return round(balance * LEDGER_MINOR_UNITS)
+
+# Fixed-width account records in a memory-mapped file, addressed by the
+# numeric part of the account number, so a lookup is one offset computation
+# and a balance update rewrites a few bytes in place. The version works as a
+# seqlock: it is odd while a record is being written, so readers, including
+# other processes mapping the file read-only, retry instead of seeing a torn
+# record. Only one process may write.
+class BalanceTable:
+    def __init__(self, path: str, readonly: bool = False, msync_every: int = BALANCE_MSYNC_EVERY):
+        self.path = path
+        self.readonly = readonly
+        self.msync_every = msync_every
+        self._unsynced = 0
+        self._lock = threading.Lock()
+        if readonly:
+            self._file = open(path, 'rb')
+            self._map(mmap.ACCESS_READ)
+            return
+        self._file = open(path, 'r+b' if os.path.exists(path) else 'w+b')
+        if os.fstat(self._file.fileno()).st_size < HEADER_SIZE:
+            self._file.truncate(HEADER_SIZE + BALANCE_TABLE_MIN_ROWS * RECORD.size)
+            self._file.write(HEADER.pack(BALANCE_TABLE_MAGIC, RECORD.size, 0, 0))
+            self._file.flush()
+        self._map(mmap.ACCESS_WRITE)
+    
+    def _map(self, access):
+        self.mm = mmap.mmap(self._file.fileno(), 0, access=access)
+        magic, record_size, _, _ = HEADER.unpack_from(self.mm, 0)
+        if magic != BALANCE_TABLE_MAGIC or record_size != RECORD.size:
+            raise ValueError("Not a balance table: %s" % self.path)
+        self.capacity = (len(self.mm) - HEADER_SIZE) // RECORD.size
+    
+    @property
+    def rows(self) -> int:
+        return HEADER.unpack_from(self.mm, 0)[2]
+    
+    @property
+    def accounts(self) -> int:
+        return HEADER.unpack_from(self.mm, 0)[3]
+    
+    def read(self, account_number: str) -> Optional[Tuple[str, float, int, int, int]]:
+        # (customer id, balance, version, history offset, history count)
+        row = account_row(account_number)
+        if row is None:
+            return None
+        if row >= self.capacity and self.readonly and row < self.rows:
+            # The writer grew the file since it was mapped here.
+            self.mm.close()
+            self._map(mmap.ACCESS_READ)
+        if row >= self.capacity:
+            return None
+        number, customer, balance, version, offset, count = self._read_row(row)
+        if not number:
+            return None
+        return customer, balance / LEDGER_MINOR_UNITS, version, offset, count
+    
+    def put(self, account_number: str, customer_id: str, balance: float):
+        row = self._row_for_write(account_number)
+        if len(customer_id.encode()) > ID_SIZE:
+            raise ValueError("Customer id too long for a table row: %s" % customer_id)
+        with self._lock:
+            self._reserve(row)
+            number, _, _, version, offset, count = self._read_row(row)
+            if not number:
+                _, _, rows, accounts = HEADER.unpack_from(self.mm, 0)
+                HEADER.pack_into(self.mm, 0, BALANCE_TABLE_MAGIC, RECORD.size, max(rows, row + 1), accounts + 1)
+            self._write_row(row, version, account_number, customer_id, to_minor(balance), offset, count)
+    
+    def set_balance(self, account_number: str, balance: float):
+        row = self._row_for_write(account_number)
+        with self._lock:
+            self._reserve(row)
+            number, customer, _, version, offset, count = self._read_row(row)
+            self._write_row(row, version, number, customer, to_minor(balance), offset, count)
+    
+    def history(self, account_number: str) -> Optional[Tuple[int, int]]:
+        record = self.read(account_number)
+        if record is None or not record[4]:
+            return None
+        return record[3], record[4]
+    
+    def set_history(self, account_number: str, offset: int, count: int):
+        row = self._row_for_write(account_number)
+        with self._lock:
+            self._reserve(row)
+            number, customer, balance, version, _, _ = self._read_row(row)
+            self._write_row(row, version, number, customer, balance, offset, count)
+    
+    def scan(self) -> Iterator[Tuple[str, str, float]]:
+        # (account number, customer id, balance) of every stored account,
+        # read in chunks rather than record by record.
+        rows = min(self.rows, self.capacity)
+        for start in range(0, rows, BALANCE_SCAN_ROWS):
+            end = min(rows, start + BALANCE_SCAN_ROWS)
+            chunk = self.mm[HEADER_SIZE + start * RECORD.size:HEADER_SIZE + end * RECORD.size]
+            for number, customer, balance, _, _, _ in RECORD.iter_unpack(chunk):
+                if number[0]:
+                    yield (number.rstrip(b'\0').decode(), customer.rstrip(b'\0').decode(),
+                           balance / LEDGER_MINOR_UNITS)
+    
+    def account_numbers(self) -> List[str]:
+        return [number for number, _, _ in self.scan()]
+    
+    def customer_account_numbers(self, customer_id: str) -> List[str]:
+        return [number for number, customer, _ in self.scan() if customer == customer_id]
+    
+    def committed(self):
+        # Called once per storage commit to apply the msync policy.
+        self._unsynced += 1
+        if self.msync_every and self._unsynced >= self.msync_every:
+            self.sync()
+    
+    def sync(self):
+        if not self.readonly:
+            self.mm.flush()
+            self._unsynced = 0
+    
+    def close(self):
+        if self.mm is not None:
+            self.sync()
+            self.mm.close()
+            self._file.close()
+            self.mm = None
+    
+    def _row_for_write(self, account_number):
+        row = account_row(account_number)
+        if row is None:
+            raise ValueError("Account number has no table row: %s" % account_number)
+        if len(account_number.encode()) > ID_SIZE:
+            raise ValueError("Account number too long for a table row: %s" % account_number)
+        return row
+    
+    def _reserve(self, row):
+        if row < self.capacity:
+            return
+        capacity = max(row + 1, self.capacity * 2)
+        self.mm.resize(HEADER_SIZE + capacity * RECORD.size)
+        self.capacity = capacity
+    
+    def _read_row(self, row):
+        position = HEADER_SIZE + row * RECORD.size
+        while True:
+            version = VERSION.unpack_from(self.mm, position + VERSION_OFFSET)[0]
+            number, customer, balance, _, offset, count = RECORD.unpack_from(self.mm, position)
+            if version % 2 == 0 and VERSION.unpack_from(self.mm, position + VERSION_OFFSET)[0] == version:
+                return (number.rstrip(b'\0').decode(), customer.rstrip(b'\0').decode(),
+                        balance, version, offset, count)
+    
+    def _write_row(self, row, version, number, customer, balance, offset, count):
+        position = HEADER_SIZE + row * RECORD.size
+        VERSION.pack_into(self.mm, position + VERSION_OFFSET, version + 1)
+        RECORD.pack_into(self.mm, position, number.encode(), customer.encode(), balance,
+                         version + 1, offset, count)
+        VERSION.pack_into(self.mm, position + VERSION_OFFSET, version + 2)
+
+# Lets HistoryStore keep its per-account index in the table's history
+# columns instead of a dict.
+class TableHistoryIndex:
+    def __init__(self, table: BalanceTable):
+        self.table = table
+    
+    def get(self, account_number, default=None):
+        entry = self.table.history(account_number)
+        return default if entry is None else entry
+    
+    def __setitem__(self, account_number, entry):
+        offset, count = entry
+        self.table.set_history(account_number, offset, count)
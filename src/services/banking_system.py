@@ -1,100 +1,166 @@
-import json
-import os
+import math
 import re
-from typing import List, Optional
-from src.core.data_structures import HashMap, LinkedQueue, MaxHeap, BalanceBST
+import threading
+from contextlib import nullcontext
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+from src.core.data_structures import (HashMap, BalanceIndex, CustomerAccountIndex, TransactionPage,
+                                      TransactionRecord, TransactionScheduler)
 from src.core.models import Customer, BankAccount
 from src.core.constants import *
+from src.services.auth import PasswordService
+from src.services.events import EventBus, CustomerRegistered, AccountCreated, BalanceChanged
+from src.services.ledger import Ledger
+from src.services.transaction_index import TransactionIndex, Timestamp
+from src.services.metrics import Metrics
+from src.services.storage import (StorageBackend, JsonStorage, AccountCache, customer_record,
+                                  account_record, transaction_change, customer_from_record,
+                                  account_from_record)
+
+# Amounts must be positive and finite: NaN fails every comparison, so it
+# would slip past a plain `amount <= 0` check and poison the balances.
+def valid_amount(amount: float) -> bool:
+    return math.isfinite(amount) and amount > 0
+
+class BatchResult(NamedTuple):
+    committed: bool
+    results: List[str]
 
 class BankingSystem:
-    def __init__(self):
+    def __init__(self, storage: Optional[StorageBackend] = None, background_load: bool = False,
+                 progress: Optional[Callable[[int, int], None]] = None,
+                 metrics: Optional[Metrics] = None, passwords: Optional[PasswordService] = None):
+        self.storage = storage or JsonStorage()
+        self.passwords = passwords or PasswordService()
         self.customers = HashMap()
-        self.accounts = HashMap()
+        self.customer_accounts = CustomerAccountIndex()
+        if self.storage.lazy_accounts:
+            self.accounts = AccountCache(self.storage)
+        else:
+            self.accounts = HashMap()
         self.current_customer: Optional[Customer] = None
-        self.data_file = DATA_FILE_PATH
-        self.transaction_queue = LinkedQueue()
-        self.priority_heap = MaxHeap()
-        self.balance_bst = BalanceBST()
-        self.load_data()
-    
-    def load_data(self):
-        if os.path.exists(self.data_file):
-            with open(self.data_file, 'r') as f:
-                data = json.load(f)
-                for customer_data in data.get(DATA_CUSTOMERS_KEY, []):
-                    customer = Customer(
-                        customer_data[DATA_CUSTOMER_ID_KEY],
-                        customer_data[DATA_NAME_KEY],
-                        customer_data[DATA_PASSWORD_HASH_KEY],
-                        is_hashed=True
-                    )
-                    self.customers.add(customer.customer_id, customer)
-                
-                for account_data in data.get(DATA_ACCOUNTS_KEY, []):
-                    account = BankAccount(
-                        account_data[DATA_ACCOUNT_NUMBER_KEY],
-                        account_data[DATA_CUSTOMER_ID_KEY]
-                    )
-                    account.balance = account_data[DATA_BALANCE_KEY]
-                    self.accounts.add(account.account_number, account)
-                    customer = self.customers.get(account.customer_id)
-                    if customer:
-                        customer.accounts.add(account.account_number, account)
-                    self.balance_bst.insert(account)
+        self.scheduler = TransactionScheduler()
+        # Lazy backends answer balance queries from their own index.
+        self.balance_index = None if self.storage.lazy_accounts else BalanceIndex()
+        self.ledger: Optional[Ledger] = None
+        self.transaction_index: Optional[TransactionIndex] = None
+        # Set by ConcurrentExecutor to coalesce commits from worker threads,
+        # and to keep its operations out while a bulk update runs.
+        self.write_behind = None
+        self.exclusive = nullcontext
+        self._index_lock = threading.Lock()
+        self._registry_lock = threading.Lock()
+        # Set by a shard worker (see sharding.py) so that the ids it hands
+        # out are ones that map to its own shard.
+        self.shard_index = 0
+        self.shard_count = 1
+        # Events are published on whichever thread made the change.
+        self.events = EventBus()
+        self.loaded = threading.Event()
+        self._load_progress = threading.Condition()
+        # Attached before loading so load_data is measured too.
+        self.metrics = metrics
+        if metrics is not None:
+            metrics.attach(self)
+        if background_load:
+            threading.Thread(target=self.load_data, args=(progress,), daemon=True).start()
+        else:
+            self.load_data(progress)
+    
+    def load_data(self, progress: Optional[Callable[[int, int], None]] = None):
+        try:
+            for count, change in enumerate(self.storage.load(progress), 1):
+                self._apply_change(change)
+                if count % LOAD_NOTIFY_EVERY == 0:
+                    with self._load_progress:
+                        self._load_progress.notify_all()
+            
+            if self.balance_index is not None:
+                self.balance_index.build(self.accounts.values())
+            if self.storage.needs_compaction:
+                self.compact()
+        finally:
+            self.loaded.set()
+            with self._load_progress:
+                self._load_progress.notify_all()
+    
+    def wait_loaded(self, timeout: Optional[float] = None) -> bool:
+        return self.loaded.wait(timeout)
+    
+    # Lookups may run while a background load is still in progress; a miss
+    # is retried as records arrive and is only final once loading finished.
+    def _lookup(self, table, key):
+        value = table.get(key)
+        while value is None and not self.loaded.is_set():
+            with self._load_progress:
+                self._load_progress.wait(0.1)
+            value = table.get(key)
+        return value
+    
+    def _get_customer(self, customer_id):
+        return self._lookup(self.customers, customer_id)
+    
+    def _get_account(self, account_number):
+        return self._lookup(self.accounts, account_number)
+    
+    def _apply_change(self, change):
+        op = change[CHANGE_OP_KEY]
+        if op == CHANGE_CUSTOMER:
+            customer = self.customers.get(change[DATA_CUSTOMER_ID_KEY])
+            if customer:
+                # A later record for a known customer (e.g. a rehashed
+                # password) must keep the accounts already attached to it.
+                customer.name = change[DATA_NAME_KEY]
+                customer.password_hash = change[DATA_PASSWORD_HASH_KEY]
+            else:
+                customer = customer_from_record(change)
+                self.customers.add(customer.customer_id, customer)
+        elif op == CHANGE_ACCOUNT:
+            account = account_from_record(change)
+            self.storage.attach_account(account)
+            self.accounts.add(account.account_number, account)
+            self.customer_accounts.add(account.customer_id, account.account_number)
+        elif op == CHANGE_TRANSACTION:
+            account = self.accounts.get(change[DATA_ACCOUNT_NUMBER_KEY])
+            if account:
+                account.balance = change[DATA_BALANCE_KEY]
+                self.storage.replay_transaction(account, change)
     
     def save_data(self):
-        customers_data = []
-        for bucket in self.customers.table:
-            for item in bucket:
-                if item:
-                    customer = item[1]
-                    customers_data.append({
-                        DATA_CUSTOMER_ID_KEY: customer.customer_id,
-                        DATA_NAME_KEY: customer.name,
-                        DATA_PASSWORD_HASH_KEY: customer.password_hash
-                    })
-        
-        accounts_data = []
-        for bucket in self.accounts.table:
-            for item in bucket:
-                if item:
-                    account = item[1]
-                    transaction_list = []
-                    temp_queue = LinkedQueue()
-                    while not account.transaction_history.is_empty():
-                        trans = account.transaction_history.dequeue()
-                        transaction_list.append(trans)
-                        temp_queue.enqueue(trans)
-                    account.transaction_history = temp_queue
-                    
-                    accounts_data.append({
-                        DATA_ACCOUNT_NUMBER_KEY: account.account_number,
-                        DATA_CUSTOMER_ID_KEY: account.customer_id,
-                        DATA_BALANCE_KEY: account.balance,
-                        DATA_TRANSACTION_HISTORY_KEY: transaction_list
-                    })
-        
-        data = {
-            DATA_CUSTOMERS_KEY: customers_data,
-            DATA_ACCOUNTS_KEY: accounts_data
-        }
-        
-        with open(self.data_file, 'w') as f:
-            json.dump(data, f, indent=2)
+        self.storage.save(self)
+    
+    def compact(self):
+        self.storage.compact(self)
+    
+    def close(self):
+        self.storage.close()
+        self.passwords.close()
+    
+    def _commit(self, changes):
+        if self.write_behind is not None:
+            self.write_behind.submit(changes)
+        else:
+            self.storage.commit(self, changes)
+    
+    def _change(self, op, record):
+        record[CHANGE_OP_KEY] = op
+        return record
     
     def register_customer(self, name: str, password: str) -> str:
         if not self._validate_password(password):
             return INVALID_PASSWORD
         
-        customer_count = 0
-        for bucket in self.customers.table:
-            customer_count += len(bucket)
-        
-        customer_id = CUSTOMER_ID_FORMAT.format(customer_count + 1)
-        customer = Customer(customer_id, name, password)
-        self.customers.add(customer_id, customer)
-        self.save_data()
-        return REGISTER_SUCCESS.format(customer_id)
+        self.loaded.wait()
+        customer = Customer(None, name, self.passwords.hash(password), is_hashed=True)
+        with self._registry_lock:
+            customer.customer_id = self._next_id(CUSTOMER_ID_FORMAT, len(self.customers))
+            self.customers.add(customer.customer_id, customer)
+            self._commit([self._change(CHANGE_CUSTOMER, customer_record(customer))])
+        if self.events.active:
+            self.events.publish(CustomerRegistered(customer.customer_id, name))
+        return REGISTER_SUCCESS.format(customer.customer_id)
+    
+    def _next_id(self, id_format, count):
+        return id_format.format(count * self.shard_count + self.shard_index + 1)
     
     def _validate_password(self, password: str) -> bool:
         return len(password) >= MIN_PASSWORD_LENGTH and \
@@ -102,106 +168,363 @@ class BankingSystem:
                bool(re.search(r'\d', password))
     
     def login(self, customer_id: str, password: str) -> bool:
-        customer = self.customers.get(customer_id)
-        if customer and customer.verify_password(password):
+        customer = self.authenticate(customer_id, password)
+        if customer:
             self.current_customer = customer
             return True
         return False
     
-    def create_account(self) -> str:
-        if not self.current_customer:
+    def authenticate(self, customer_id: str, password: str) -> Optional[Customer]:
+        # Like login, but leaves current_customer alone so callers can keep
+        # their own per-session customer.
+        customer = self._get_customer(customer_id)
+        if customer and self.passwords.verify(customer, password):
+            if self.passwords.needs_rehash(customer.password_hash):
+                self._rehash_password(customer, password)
+            if self.storage.lazy_accounts:
+                for account_number in self.storage.customer_account_numbers(customer_id):
+                    self.customer_accounts.add(customer_id, account_number)
+            return customer
+        return None
+    
+    def _rehash_password(self, customer: Customer, password: str):
+        # Moves legacy SHA-256 hashes, or hashes made with an older cost, to
+        # the current hasher while the plain password is at hand.
+        customer.password_hash = self.passwords.hash(password)
+        self.passwords.cache.remember(customer.customer_id, customer.password_hash, password)
+        self._commit([self._change(CHANGE_CUSTOMER, customer_record(customer))])
+    
+    def customer_account_numbers(self, customer: Optional[Customer] = None) -> List[str]:
+        customer = customer or self.current_customer
+        if not customer:
+            return []
+        return list(self.customer_accounts.get(customer.customer_id))
+    
+    def create_account(self, customer: Optional[Customer] = None) -> str:
+        # An explicit customer lets callers that track their own sessions,
+        # such as concurrent tellers, act without touching current_customer.
+        customer = customer or self.current_customer
+        if not customer:
             return LOGIN_REQUIRED
         
-        account_count = 0
-        for bucket in self.accounts.table:
-            account_count += len(bucket)
-        
-        account_number = ACCOUNT_NUMBER_FORMAT.format(account_count + 1)
-        account = BankAccount(account_number, self.current_customer.customer_id)
-        self.accounts.add(account_number, account)
-        self.current_customer.accounts.add(account_number, account)
-        self.balance_bst.insert(account)
-        self.save_data()
+        self.loaded.wait()
+        with self._registry_lock:
+            account_number = self._next_id(ACCOUNT_NUMBER_FORMAT, len(self.accounts))
+            account = BankAccount(account_number, customer.customer_id)
+            self.storage.attach_account(account)
+            self.accounts.add(account_number, account)
+            self.customer_accounts.add(customer.customer_id, account_number)
+            with self._index_lock:
+                if self.balance_index is not None:
+                    self.balance_index.insert(account)
+                if self.ledger is not None:
+                    self.ledger.add(account)
+            self._commit([self._change(CHANGE_ACCOUNT, account_record(account))])
+        if self.events.active:
+            self.events.publish(AccountCreated(account_number, customer.customer_id))
         return ACCOUNT_CREATED.format(account_number)
     
-    def process_transaction(self, transaction):
-        if transaction.get('priority', False):
-            self.priority_heap.insert(transaction)
+    def _money(self, amount: float) -> float:
+        # Rounds to the storage's minor units, if it keeps balances in them.
+        units = self.storage.minor_units
+        return amount if units is None else round(amount * units) / units
+    
+    def _valid_amount(self, amount: float) -> bool:
+        # Less than one minor unit would round away to nothing.
+        return valid_amount(amount) and self._money(amount) > 0
+    
+    def _adjust_balance(self, account, delta):
+        account.balance = self._money(account.balance + self._money(delta))
+        with self._index_lock:
+            if self.balance_index is not None:
+                self.balance_index.update(account)
+            if self.ledger is not None:
+                self.ledger.update(account)
+    
+    def _add_transaction(self, account, transaction_type, amount, description, counterparty=None):
+        trans = account.add_transaction(transaction_type, self._money(amount), description, counterparty)
+        if self.transaction_index is not None:
+            self.transaction_index.add(account.account_number, account.transaction_history)
+        return trans
+    
+    def _publish_balance(self, account, trans, counterparty: Optional[str] = None):
+        if self.events.active:
+            self.events.publish(BalanceChanged(account.account_number, account.customer_id,
+                                               trans.type, trans.amount, account.balance, counterparty))
+    
+    def enable_ledger(self, dtype: str = LEDGER_FLOAT) -> Ledger:
+        self.loaded.wait()
+        self.ledger = Ledger(self, dtype)
+        return self.ledger
+    
+    def enable_transaction_index(self) -> TransactionIndex:
+        # Reads every account's history once; transactions recorded while
+        # it is being built may be missed, so enable it before serving.
+        self.loaded.wait()
+        if self.transaction_index is None:
+            index = TransactionIndex()
+            index.build(self.accounts.values())
+            self.transaction_index = index
+        return self.transaction_index
+    
+    def search_transactions(self, start: Timestamp = None, end: Timestamp = None,
+                            types: Optional[Iterable[str]] = None,
+                            account_numbers: Optional[Iterable[str]] = None,
+                            min_amount: Optional[float] = None, max_amount: Optional[float] = None,
+                            newest_first: bool = False) -> Iterator[Tuple[str, TransactionRecord]]:
+        # Transactions across all accounts, e.g. every withdrawal over X
+        # between two times; see TransactionIndex.search.
+        index = self.enable_transaction_index()
+        return index.search(start, end, types, account_numbers, min_amount, max_amount, newest_first)
+    
+    def enable_metrics(self) -> Metrics:
+        if self.metrics is None:
+            self.metrics = Metrics()
+            self.metrics.attach(self)
+        return self.metrics
+    
+    def disable_metrics(self):
+        if self.metrics is not None:
+            self.metrics.detach()
+            self.metrics = None
+    
+    def apply_bulk_balances(self, updates: Iterable[Tuple[str, float]],
+                            transaction_type: str, description: str) -> int:
+        # Changes many balances at once, e.g. from a Ledger pass. Each update
+        # is (account_number, amount), added to the balance as it is now, and
+        # gets one history entry; everything is persisted in a single commit.
+        # Accounts that no longer exist, or that a debit would overdraw, are
+        # skipped. Under a ConcurrentExecutor no other operation runs
+        # meanwhile, so it must not be called from one of its workers.
+        # Returns the number of accounts changed.
+        self.loaded.wait()
+        changes = []
+        accounts = []
+        with self.exclusive():
+            for account_number, amount in updates:
+                account = self.accounts.get(account_number)
+                if account is None or account.balance + amount < 0:
+                    continue
+                account.balance = self._money(account.balance + self._money(amount))
+                trans = self._add_transaction(account, transaction_type, amount, description)
+                changes.append(transaction_change(account, trans))
+                accounts.append(account)
+            if not changes:
+                return 0
+            with self._index_lock:
+                if self.ledger is not None:
+                    for account in accounts:
+                        self.ledger.update(account)
+                if self.balance_index is not None:
+                    if len(accounts) > len(self.balance_index) // 8:
+                        self.balance_index.build(self.accounts.values())
+                    else:
+                        for account in accounts:
+                            self.balance_index.update(account)
+            self._commit(changes)
+        if self.events.active:
+            for account, change in zip(accounts, changes):
+                trans = change[CHANGE_TRANSACTION]
+                self.events.publish(BalanceChanged(account.account_number, account.customer_id,
+                                                   trans['type'], trans['amount'], change[DATA_BALANCE_KEY]))
+        return len(changes)
+    
+    def post_transfer(self, account_number: str, amount: float, counterparty: str,
+                      transfer_id: Optional[str] = None):
+        # One side of a transfer whose other account is in another shard; a
+        # debit when amount is negative, with the balance already checked by
+        # the caller. transfer_id goes into the journal record so a
+        # recovering shard can tell that this side was applied.
+        self.loaded.wait()
+        account = self.accounts.get(account_number)
+        self._adjust_balance(account, amount)
+        if amount < 0:
+            trans = self._add_transaction(account, TRANSACTION_TYPES['TRANSFER_OUT'], amount,
+                                          TRANSFER_TO_FORMAT, counterparty)
         else:
-            self.transaction_queue.enqueue(transaction)
+            trans = self._add_transaction(account, TRANSACTION_TYPES['TRANSFER_IN'], amount,
+                                          TRANSFER_FROM_FORMAT, counterparty)
+        change = transaction_change(account, trans)
+        if transfer_id is not None:
+            change[CHANGE_TRANSFER_ID_KEY] = transfer_id
+        self._commit([change])
+        self._publish_balance(account, trans, counterparty)
+    
+    def process_transaction(self, transaction):
+        self.scheduler.push(transaction)
+    
+    def execute_transactions(self, limit: Optional[int] = None):
+        # With a limit, runs only the next `limit` transfers in schedule order.
+        self.loaded.wait()
+        transactions = self.scheduler.pop_batch(limit) if limit else self._drain_transactions()
+        for transaction in transactions:
+            self._apply_transaction(transaction)
     
-    def execute_transactions(self):
+    def _drain_transactions(self):
         while True:
-            max_transaction = self.priority_heap.extract_max()
-            if not max_transaction:
+            transaction = self.scheduler.pop()
+            if transaction is None:
                 break
-            self._apply_transaction(max_transaction)
-        
-        while not self.transaction_queue.is_empty():
-            transaction = self.transaction_queue.dequeue()
-            self._apply_transaction(transaction)
+            yield transaction
     
-    def _apply_transaction(self, transaction):
+    def _apply_transaction(self, transaction, changes: Optional[list] = None,
+                           events: Optional[list] = None):
+        # With changes, the caller commits them; with events, it publishes
+        # the (account, transaction, counterparty) collected there once the
+        # commit has succeeded.
         from_acc = self.accounts.get(transaction['from_account'])
         to_acc = self.accounts.get(transaction['to_account'])
         if from_acc and to_acc:
             if from_acc.balance >= transaction['amount']:
-                from_acc.balance -= transaction['amount']
-                to_acc.balance += transaction['amount']
-                from_acc.add_transaction(
+                self._adjust_balance(from_acc, -transaction['amount'])
+                self._adjust_balance(to_acc, transaction['amount'])
+                out_trans = self._add_transaction(
+                    from_acc,
                     TRANSACTION_TYPES['TRANSFER_OUT'],
                     -transaction['amount'],
-                    TRANSFER_TO_FORMAT.format(to_acc.account_number)
+                    TRANSFER_TO_FORMAT,
+                    to_acc.account_number
                 )
-                to_acc.add_transaction(
+                in_trans = self._add_transaction(
+                    to_acc,
                     TRANSACTION_TYPES['TRANSFER_IN'],
                     transaction['amount'],
-                    TRANSFER_FROM_FORMAT.format(from_acc.account_number)
+                    TRANSFER_FROM_FORMAT,
+                    from_acc.account_number
                 )
-                self.save_data()
+                transaction_changes = [
+                    transaction_change(from_acc, out_trans),
+                    transaction_change(to_acc, in_trans)
+                ]
+                if changes is None:
+                    self._commit(transaction_changes)
+                else:
+                    changes.extend(transaction_changes)
+                published = [(from_acc, out_trans, to_acc.account_number),
+                             (to_acc, in_trans, from_acc.account_number)]
+                if events is None:
+                    for event in published:
+                        self._publish_balance(*event)
+                else:
+                    events.extend(published)
+    
+    def submit_batch(self, transfers: Iterable[Tuple[str, str, float]]) -> BatchResult:
+        self.loaded.wait()
+        self.execute_transactions()
+        
+        transfers = list(transfers)
+        results: List[Optional[str]] = [None] * len(transfers)
+        failed = False
+        for index, (from_account, to_account, amount) in enumerate(transfers):
+            if not self.accounts.get(from_account) or not self.accounts.get(to_account):
+                results[index] = ACCOUNT_NOT_FOUND
+                failed = True
+            elif not self._valid_amount(amount):
+                results[index] = INVALID_AMOUNT
+                failed = True
+            else:
+                amount = self._money(amount)
+                self.process_transaction({
+                    'from_account': from_account,
+                    'to_account': to_account,
+                    'amount': amount,
+                    'priority': amount > PRIORITY_TRANSFER_AMOUNT,
+                    'batch_index': index
+                })
+        
+        # Dry run in execution order so that funds received earlier in the
+        # batch can cover later debits, exactly as they will when applied.
+        ordered = list(self._drain_transactions())
+        balances = {}
+        for transaction in ordered:
+            from_account = transaction['from_account']
+            to_account = transaction['to_account']
+            amount = transaction['amount']
+            from_balance = balances.get(from_account)
+            if from_balance is None:
+                from_balance = self.accounts.get(from_account).balance
+            if from_balance < amount:
+                results[transaction['batch_index']] = INSUFFICIENT_BALANCE
+                failed = True
+                continue
+            balances[from_account] = from_balance - amount
+            to_balance = balances.get(to_account)
+            if to_balance is None:
+                to_balance = self.accounts.get(to_account).balance
+            balances[to_account] = to_balance + amount
+            results[transaction['batch_index']] = TRANSFER_SUCCESS.format(amount)
+        
+        if failed:
+            for transaction in ordered:
+                index = transaction['batch_index']
+                if results[index] != INSUFFICIENT_BALANCE:
+                    results[index] = BATCH_ABORTED
+            return BatchResult(False, results)
+        
+        # Subscribers only hear about the batch once it is stored.
+        changes = []
+        events = []
+        for transaction in ordered:
+            self._apply_transaction(transaction, changes, events)
+        if changes:
+            self._commit(changes)
+        for event in events:
+            self._publish_balance(*event)
+        return BatchResult(True, results)
     
-    def deposit(self, account_number: str, amount: float) -> str:
-        if not self.current_customer:
+    def deposit(self, account_number: str, amount: float, customer: Optional[Customer] = None) -> str:
+        customer = customer or self.current_customer
+        if not customer:
             return LOGIN_REQUIRED
         
-        account = self.accounts.get(account_number)
+        account = self._get_account(account_number)
         if not account:
             return ACCOUNT_NOT_FOUND
         
-        if account.customer_id != self.current_customer.customer_id:
+        if account.customer_id != customer.customer_id:
             return UNAUTHORIZED_ACCESS
         
-        if amount <= 0:
+        if not self._valid_amount(amount):
             return INVALID_AMOUNT
+        amount = self._money(amount)
         
-        account.balance += amount
-        account.add_transaction(TRANSACTION_TYPES['DEPOSIT'], amount, CASH_DEPOSIT)
-        self.save_data()
+        self.loaded.wait()
+        self._adjust_balance(account, amount)
+        trans = self._add_transaction(account, TRANSACTION_TYPES['DEPOSIT'], amount, CASH_DEPOSIT)
+        self._commit([transaction_change(account, trans)])
+        self._publish_balance(account, trans)
         return DEPOSIT_SUCCESS.format(account.balance)
     
-    def withdraw(self, account_number: str, amount: float) -> str:
-        if not self.current_customer:
+    def withdraw(self, account_number: str, amount: float, customer: Optional[Customer] = None) -> str:
+        customer = customer or self.current_customer
+        if not customer:
             return LOGIN_REQUIRED
         
-        account = self.accounts.get(account_number)
+        account = self._get_account(account_number)
         if not account:
             return ACCOUNT_NOT_FOUND
         
-        if account.customer_id != self.current_customer.customer_id:
+        if account.customer_id != customer.customer_id:
             return UNAUTHORIZED_ACCESS
         
-        if amount <= 0:
+        if not self._valid_amount(amount):
             return INVALID_AMOUNT
+        amount = self._money(amount)
         
+        self.loaded.wait()
         if account.balance < amount:
             return INSUFFICIENT_BALANCE
         
-        account.balance -= amount
-        account.add_transaction(TRANSACTION_TYPES['WITHDRAW'], -amount, CASH_WITHDRAWAL)
-        self.save_data()
+        self._adjust_balance(account, -amount)
+        trans = self._add_transaction(account, TRANSACTION_TYPES['WITHDRAW'], -amount, CASH_WITHDRAWAL)
+        self._commit([transaction_change(account, trans)])
+        self._publish_balance(account, trans)
         return WITHDRAW_SUCCESS.format(account.balance)
     
     def transfer(self, from_account: str, to_account: str, amount: float) -> str:
+        if not self._valid_amount(amount):
+            return INVALID_AMOUNT
+        amount = self._money(amount)
         transaction = {
             'from_account': from_account,
             'to_account': to_account,
@@ -212,43 +535,89 @@ class BankingSystem:
         self.execute_transactions()
         return TRANSFER_SUCCESS.format(amount)
     
-    def get_account_balance(self, account_number: str) -> str:
-        if not self.current_customer:
+    def get_account_balance(self, account_number: str, customer: Optional[Customer] = None) -> str:
+        customer = customer or self.current_customer
+        if not customer:
             return LOGIN_REQUIRED
         
-        account = self.accounts.get(account_number)
+        account = self._get_account(account_number)
         if not account:
             return ACCOUNT_NOT_FOUND
         
-        if account.customer_id != self.current_customer.customer_id:
+        if account.customer_id != customer.customer_id:
             return UNAUTHORIZED_ACCESS
         
         return BALANCE_FORMAT.format(account.balance)
     
-    def get_transaction_history(self, account_number: str) -> str:
-        if not self.current_customer:
+    def get_transaction_history(self, account_number: str, customer: Optional[Customer] = None) -> str:
+        customer = customer or self.current_customer
+        if not customer:
             return LOGIN_REQUIRED
         
-        account = self.accounts.get(account_number)
+        account = self._get_account(account_number)
+        if not account:
+            return ACCOUNT_NOT_FOUND
+        
+        if account.customer_id != customer.customer_id:
+            return UNAUTHORIZED_ACCESS
+        
+        lines = [TRANSACTION_HISTORY_TITLE]
+        for trans in account.transaction_history:
+            lines.append(TRANSACTION_FORMAT.format(
+                trans.timestamp,
+                trans.type,
+                trans.amount,
+                trans.description
+            ))
+        return "\n".join(lines) + "\n"
+    
+    def get_transaction_page(self, account_number: str, offset: int = 0, cursor: Optional[int] = None,
+                             limit: int = TRANSACTION_PAGE_SIZE,
+                             newest_first: bool = True,
+                             customer: Optional[Customer] = None) -> Union[TransactionPage, str]:
+        customer = customer or self.current_customer
+        if not customer:
+            return LOGIN_REQUIRED
+        
+        account = self._get_account(account_number)
         if not account:
             return ACCOUNT_NOT_FOUND
         
-        if account.customer_id != self.current_customer.customer_id:
+        if account.customer_id != customer.customer_id:
             return UNAUTHORIZED_ACCESS
         
-        history = TRANSACTION_HISTORY_TITLE + "\n"
-        temp_queue = LinkedQueue()
-        while not account.transaction_history.is_empty():
-            trans = account.transaction_history.dequeue()
-            history += TRANSACTION_FORMAT.format(
-                trans['timestamp'],
-                trans['type'],
-                trans['amount'],
-                trans['description']
-            ) + "\n"
-            temp_queue.enqueue(trans)
-        account.transaction_history = temp_queue
-        return history
+        return account.transaction_history.page(offset, cursor, limit, newest_first)
+    
+    def iter_accounts(self, start: int = 0) -> Iterator[Tuple[int, BankAccount]]:
+        # (position, account) in the order accounts were numbered, from
+        # position start, so a long scan can stop and pick up where it left
+        # off. Accounts of lazy backends are not kept in the account cache.
+        self.loaded.wait()
+        for position in range(start, len(self.accounts)):
+            account_number = self._next_id(ACCOUNT_NUMBER_FORMAT, position)
+            if self.storage.lazy_accounts:
+                account = self.accounts.peek(account_number)
+            else:
+                account = self.accounts.get(account_number)
+            if account is not None:
+                yield position, account
     
     def search_accounts_by_balance(self, low: float, high: float) -> List[BankAccount]:
-        return self.balance_bst.search_range(low, high) 
\ No newline at end of file
+        self.loaded.wait()
+        if self.storage.lazy_accounts:
+            return [self.accounts.get(account_number)
+                    for account_number in self.storage.account_numbers_by_balance(low, high)]
+        return self.balance_index.search_range(low, high)
+    
+    def top_accounts_by_balance(self, k: int) -> List[BankAccount]:
+        self.loaded.wait()
+        if self.storage.lazy_accounts:
+            return [self.accounts.get(account_number)
+                    for account_number in self.storage.top_account_numbers_by_balance(k)]
+        return self.balance_index.top_k(k)
+    
+    def count_accounts_by_balance(self, low: float, high: float) -> int:
+        self.loaded.wait()
+        if self.storage.lazy_accounts:
+            return self.storage.count_accounts_by_balance(low, high)
+        return self.balance_index.count_range(low, high) 
\ No newline at end of file
@@ -0,0 +1,249 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from typing import List, Optional
+from src.core.constants import *
+from src.core.models import Customer
+
+class AccountLocks:
+    def __init__(self):
+        self._locks = {}
+        self._guard = threading.Lock()
+    
+    def lock_for(self, account_number: str) -> threading.Lock:
+        lock = self._locks.get(account_number)
+        if lock is None:
+            with self._guard:
+                lock = self._locks.setdefault(account_number, threading.Lock())
+        return lock
+    
+    @contextmanager
+    def hold(self, *account_numbers: str):
+        # Always acquiring in sorted order means two transfers over the same
+        # pair of accounts can never wait on each other in a cycle.
+        locks = [self.lock_for(number) for number in sorted(set(account_numbers))]
+        for lock in locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+# Operations hold the gate shared while they mutate accounts; a commit holds
+# it exclusively so the storage backend always sees a state with no transfer
+# half-applied. Waiting writers block new readers so commits cannot starve.
+class SharedExclusiveLock:
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+    
+    @contextmanager
+    def shared(self):
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+    
+    @contextmanager
+    def exclusive(self):
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+def changed_accounts(changes: list) -> List[str]:
+    return [change[DATA_ACCOUNT_NUMBER_KEY] for change in changes if DATA_ACCOUNT_NUMBER_KEY in change]
+
+# Collects the changes committed by worker threads and hands them to the
+# storage backend in one commit per interval (group commit). Each submit
+# returns a ticket that can be waited on for durability. On lazy backends
+# the accounts a submit changes stay pinned in the account cache until the
+# commit carrying them has been stored.
+class CommitCoalescer:
+    def __init__(self, bank, gate: SharedExclusiveLock, interval: float = COMMIT_COALESCE_INTERVAL):
+        self.bank = bank
+        self.gate = gate
+        self.interval = interval
+        self.pins = bank.storage.lazy_accounts
+        self.error: Optional[BaseException] = None
+        self._pending = []
+        self._submitted = 0
+        self._committed = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._local = threading.local()
+        self._thread = threading.Thread(target=self._run, name="bank-commit", daemon=True)
+        self._thread.start()
+    
+    def submit(self, changes: list) -> int:
+        if self.pins:
+            self.bank.accounts.pin(changed_accounts(changes))
+        with self._cond:
+            self._pending.append(changes)
+            self._submitted += 1
+            ticket = self._submitted
+            self._cond.notify_all()
+        self._local.ticket = ticket
+        return ticket
+    
+    def take_ticket(self) -> int:
+        ticket = getattr(self._local, 'ticket', 0)
+        self._local.ticket = 0
+        return ticket
+    
+    def wait(self, ticket: int):
+        with self._cond:
+            while self._committed < ticket and self.error is None:
+                self._cond.wait()
+            if self.error is not None:
+                raise self.error
+    
+    def flush(self):
+        with self._cond:
+            ticket = self._submitted
+        self.wait(ticket)
+    
+    def close(self):
+        self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+    
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if self._closed and not self._pending:
+                    return
+            if self.interval:
+                time.sleep(self.interval)
+            with self.gate.exclusive():
+                with self._cond:
+                    batch, self._pending = self._pending, []
+                    ticket = self._submitted
+                try:
+                    self.bank.storage.commit(self.bank, [change for changes in batch for change in changes])
+                except BaseException as exc:
+                    with self._cond:
+                        self.error = exc
+                        self._cond.notify_all()
+                    return
+            if self.pins:
+                self.bank.accounts.unpin([number for changes in batch for number in changed_accounts(changes)])
+            with self._cond:
+                self._committed = ticket
+                self._cond.notify_all()
+
+# Runs deposits, withdrawals and transfers on a thread pool. Each operation
+# locks only the accounts it touches, so operations on disjoint accounts run
+# in parallel, and persistence goes through a CommitCoalescer.
+class ConcurrentExecutor:
+    def __init__(self, bank, workers: int = CONCURRENT_WORKERS, durable: bool = True,
+                 coalesce_interval: float = COMMIT_COALESCE_INTERVAL):
+        bank.wait_loaded()
+        self.bank = bank
+        self.durable = durable
+        self.locks = AccountLocks()
+        self.gate = SharedExclusiveLock()
+        self.coalescer = CommitCoalescer(bank, self.gate, coalesce_interval)
+        self.pool = ThreadPoolExecutor(workers, thread_name_prefix="bank-worker")
+        self._queue_lock = threading.Lock()
+        bank.write_behind = self.coalescer
+        bank.exclusive = self.gate.exclusive
+    
+    def transfer(self, from_account: str, to_account: str, amount: float) -> Future:
+        return self.pool.submit(self._run, (from_account, to_account),
+                                self._transfer, from_account, to_account, amount)
+    
+    def deposit(self, account_number: str, amount: float, customer: Customer) -> Future:
+        return self.pool.submit(self._run, (account_number,),
+                                self.bank.deposit, account_number, amount, customer)
+    
+    def withdraw(self, account_number: str, amount: float, customer: Customer) -> Future:
+        return self.pool.submit(self._run, (account_number,),
+                                self.bank.withdraw, account_number, amount, customer)
+    
+    def call(self, operation, *args) -> Future:
+        # For operations that touch no existing balance, such as registering
+        # a customer or opening an account.
+        return self.pool.submit(self._run, (), operation, *args)
+    
+    def submit_transaction(self, transaction: dict):
+        with self._queue_lock:
+            self.bank.process_transaction(transaction)
+    
+    def run_pending(self, limit: Optional[int] = None) -> List[Future]:
+        # Dispatches queued transfers (or the next `limit`) in the bank's
+        # schedule order; transfers on disjoint accounts may then complete in
+        # any order.
+        with self._queue_lock:
+            if limit:
+                transactions = self.bank.scheduler.pop_batch(limit)
+            else:
+                transactions = list(self.bank._drain_transactions())
+        return [self.transfer(t['from_account'], t['to_account'], t['amount']) for t in transactions]
+    
+    def flush(self):
+        self.coalescer.flush()
+    
+    def shutdown(self):
+        self.pool.shutdown(wait=True)
+        self.coalescer.close()
+        self.bank.write_behind = None
+        self.bank.exclusive = nullcontext
+    
+    def _run(self, account_numbers, operation, *args):
+        self.coalescer.take_ticket()
+        with self.locks.hold(*account_numbers):
+            # Pinned from before the first change until the commit's own
+            # pins take over, so the accounts cannot be evicted in between.
+            if self.coalescer.pins:
+                self.bank.accounts.pin(account_numbers)
+            try:
+                with self.gate.shared():
+                    result = operation(*args)
+            finally:
+                if self.coalescer.pins:
+                    self.bank.accounts.unpin(account_numbers)
+        ticket = self.coalescer.take_ticket()
+        if self.durable and ticket:
+            self.coalescer.wait(ticket)
+        return result
+    
+    def _transfer(self, from_account, to_account, amount):
+        from_acc = self.bank.accounts.get(from_account)
+        to_acc = self.bank.accounts.get(to_account)
+        if not from_acc or not to_acc:
+            return ACCOUNT_NOT_FOUND
+        if not self.bank._valid_amount(amount):
+            return INVALID_AMOUNT
+        amount = self.bank._money(amount)
+        if from_acc.balance < amount:
+            return INSUFFICIENT_BALANCE
+        self.bank._apply_transaction({
+            'from_account': from_account,
+            'to_account': to_account,
+            'amount': amount
+        })
+        return TRANSFER_SUCCESS.format(amount)
@@ -0,0 +1,178 @@
+import asyncio
+import threading
+from collections import deque
+from typing import Callable, NamedTuple, Optional, Tuple, Type
+from src.core.constants import *
+
+class CustomerRegistered(NamedTuple):
+    customer_id: str
+    name: str
+
+class AccountCreated(NamedTuple):
+    account_number: str
+    customer_id: str
+
+class BalanceChanged(NamedTuple):
+    account_number: str
+    customer_id: str
+    type: str
+    amount: float
+    balance: float
+    counterparty: Optional[str] = None
+
+class Subscription:
+    def __init__(self, bus: 'EventBus', deliver: Callable, event_types: Optional[Tuple[Type, ...]]):
+        self.bus = bus
+        self.deliver = deliver
+        self.event_types = event_types
+    
+    def close(self):
+        self.bus._remove(self)
+
+# Bounded buffer for a subscriber on its own thread. When it is full the
+# publisher blocks (OVERFLOW_BLOCK, which slows the bank down to the
+# consumer's pace) or an event is dropped and counted.
+class EventQueue(Subscription):
+    def __init__(self, bus, event_types, maxsize: int, overflow: str):
+        super().__init__(bus, self._put, event_types)
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.dropped = 0
+        self.closed = False
+        self._events = deque()
+        self._cond = threading.Condition()
+    
+    def _put(self, event):
+        with self._cond:
+            while len(self._events) >= self.maxsize and self.overflow == OVERFLOW_BLOCK and not self.closed:
+                self._cond.wait()
+            if self.closed:
+                return
+            if len(self._events) >= self.maxsize:
+                self.dropped += 1
+                if self.overflow == OVERFLOW_DROP_NEWEST:
+                    return
+                self._events.popleft()
+            self._events.append(event)
+            self._cond.notify_all()
+    
+    def get(self, timeout: Optional[float] = None):
+        # Returns None on timeout or once the queue is closed and drained.
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._events or self.closed, timeout):
+                return None
+            if not self._events:
+                return None
+            event = self._events.popleft()
+            self._cond.notify_all()
+            return event
+    
+    def __iter__(self):
+        while True:
+            event = self.get()
+            if event is None:
+                return
+            yield event
+    
+    def __len__(self):
+        return len(self._events)
+    
+    def close(self):
+        super().close()
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+# Delivers events to coroutines on an asyncio loop. Publishers run on other
+# threads, so the bound is a semaphore they take before handing an event to
+# the loop; an event published on the loop's own thread is never blocked on,
+# since that would stall the loop that has to drain it.
+class AsyncEventQueue(Subscription):
+    def __init__(self, bus, event_types, maxsize: int, overflow: str,
+                 loop: Optional[asyncio.AbstractEventLoop] = None):
+        super().__init__(bus, self._put, event_types)
+        self.loop = loop or asyncio.get_running_loop()
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.dropped = 0
+        self.closed = False
+        self._queue = asyncio.Queue()
+        self._slots = threading.Semaphore(maxsize)
+    
+    def _put(self, event):
+        try:
+            on_loop = asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self._queue.put_nowait((event, False))
+            return
+        if not self._slots.acquire(blocking=self.overflow == OVERFLOW_BLOCK):
+            # Events already handed to the loop cannot be recalled, so both
+            # drop policies drop the newest event here.
+            self.dropped += 1
+            return
+        self.loop.call_soon_threadsafe(self._queue.put_nowait, (event, True))
+    
+    async def get(self):
+        # Returns None once the queue is closed.
+        event, holds_slot = await self._queue.get()
+        if holds_slot:
+            self._slots.release()
+        return event
+    
+    def __aiter__(self):
+        return self
+    
+    async def __anext__(self):
+        event = await self.get()
+        if event is None:
+            raise StopAsyncIteration
+        return event
+    
+    def close(self):
+        super().close()
+        self.closed = True
+        self.loop.call_soon_threadsafe(self._queue.put_nowait, (None, False))
+        # Frees publishers still waiting for a slot.
+        self._slots.release(self.maxsize)
+
+# Publish/subscribe hub owned by BankingSystem. The subscriber tuple is
+# replaced rather than mutated, so publish reads it without a lock, and
+# publishing with no subscribers costs one attribute check.
+class EventBus:
+    def __init__(self):
+        self.subscriptions: Tuple[Subscription, ...] = ()
+        self._lock = threading.Lock()
+    
+    @property
+    def active(self) -> bool:
+        return bool(self.subscriptions)
+    
+    def subscribe(self, callback: Callable, event_types: Optional[Tuple[Type, ...]] = None) -> Subscription:
+        # Synchronous subscribers run on the publishing thread, inside the
+        # operation, so they must be quick.
+        return self._add(Subscription(self, callback, event_types))
+    
+    def subscribe_queue(self, maxsize: int = EVENT_BUFFER_SIZE, overflow: str = OVERFLOW_BLOCK,
+                        event_types: Optional[Tuple[Type, ...]] = None) -> EventQueue:
+        return self._add(EventQueue(self, event_types, maxsize, overflow))
+    
+    def subscribe_async(self, maxsize: int = EVENT_BUFFER_SIZE, overflow: str = OVERFLOW_BLOCK,
+                        event_types: Optional[Tuple[Type, ...]] = None,
+                        loop: Optional[asyncio.AbstractEventLoop] = None) -> AsyncEventQueue:
+        return self._add(AsyncEventQueue(self, event_types, maxsize, overflow, loop))
+    
+    def publish(self, event):
+        for subscription in self.subscriptions:
+            if subscription.event_types is None or type(event) in subscription.event_types:
+                subscription.deliver(event)
+    
+    def _add(self, subscription):
+        with self._lock:
+            self.subscriptions = self.subscriptions + (subscription,)
+        return subscription
+    
+    def _remove(self, subscription):
+        with self._lock:
+            self.subscriptions = tuple(s for s in self.subscriptions if s is not subscription)
@@ -0,0 +1,196 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Tuple
+from src.core.constants import *
+from src.core.data_structures import TransactionHistory
+
+# (offset of the newest record, record count) for an account with no history.
+NO_HISTORY = (-1, 0)
+
+def history_path(data_file: str) -> str:
+    return os.path.splitext(data_file)[0] + HISTORY_FILE_SUFFIX
+
+def record_fields(trans: dict) -> tuple:
+    return trans['type'], trans['amount'], trans['description'], trans['timestamp']
+
+# Append-only segment file holding every account's transactions, one JSON
+# line per record: [account_number, previous_offset, type, amount,
+# description, timestamp]. Each record points back at the account's previous
+# one, so the index only needs the newest offset and a count per account; the
+# index is saved with the snapshot and journal, not in this file. A history is
+# read the first time its account's history is touched, and at most
+# `capacity` histories stay resident.
+class HistoryStore:
+    def __init__(self, path: str, capacity: int = HISTORY_CACHE_SIZE):
+        self.path = path
+        self.capacity = capacity
+        self.index: Dict[str, Tuple[int, int]] = {}
+        # account number -> account whose resident_history is loaded, oldest first.
+        self.resident = OrderedDict()
+        self.loads = 0
+        # Records written again on load (inline histories from an older
+        # snapshot, or records the journal has but this file lost); the
+        # snapshot should be rewritten so they are not written a third time.
+        self.rewritten = 0
+        self._lock = threading.Lock()
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        self.size = os.fstat(self._fd).st_size
+    
+    def attach(self, account):
+        number = account.account_number
+        history = account.resident_history
+        with self._lock:
+            count = self.index.get(number, NO_HISTORY)[1]
+            if history is not None and len(history) > count:
+                self._append(number, [history.record(i)._asdict() for i in range(count, len(history))])
+                self.rewritten += len(history) - count
+            account.history_source = self
+            account.resident_history = None
+    
+    def append(self, account_number: str, records: Iterable[dict]):
+        with self._lock:
+            self._append(account_number, records)
+    
+    def commit(self, changes: List[dict]):
+        # Writes the record of every transaction change in one write and
+        # stamps each change with its offset, so replaying the journal can
+        # rebuild the index.
+        with self._lock:
+            lines = []
+            offset = self.size
+            for change in changes:
+                if change[CHANGE_OP_KEY] != CHANGE_TRANSACTION:
+                    continue
+                number = change[DATA_ACCOUNT_NUMBER_KEY]
+                trans = change[CHANGE_TRANSACTION]
+                head, count = self.index.get(number, NO_HISTORY)
+                line = self._line(number, head, trans)
+                change[DATA_HISTORY_OFFSET_KEY] = offset
+                self.index[number] = (offset, count + 1)
+                self._catch_up(number, count + 1, trans)
+                lines.append(line)
+                offset += len(line)
+            self._write(b''.join(lines))
+    
+    def replay(self, account, change: dict):
+        # A journaled record is only trusted if the bytes at its offset are
+        # the record itself; otherwise (an older journal, or a segment tail
+        # lost in a crash) it is written again.
+        number = account.account_number
+        trans = change[CHANGE_TRANSACTION]
+        offset = change.get(DATA_HISTORY_OFFSET_KEY)
+        with self._lock:
+            head, count = self.index.get(number, NO_HISTORY)
+            if offset is not None and offset <= head:
+                # Offsets only grow, so the index, when it is persisted
+                # ahead of the journal, already holds this record.
+                return
+            line = self._line(number, head, trans)
+            if offset is None or os.pread(self._fd, len(line), offset) != line:
+                offset = self.size
+                self._write(line)
+                self.rewritten += 1
+            self.index[number] = (offset, count + 1)
+            self._catch_up(number, count + 1, trans)
+    
+    def load(self, account) -> TransactionHistory:
+        number = account.account_number
+        while True:
+            with self._lock:
+                if account.resident_history is not None:
+                    self._touch(number)
+                    return account.resident_history
+                head, count = self.index.get(number, NO_HISTORY)
+            history = TransactionHistory()
+            for record in self._read(head, count):
+                history.append_record(*record[2:])
+            with self._lock:
+                # Retried if a record was committed while reading.
+                if account.resident_history is None and self.index.get(number, NO_HISTORY)[1] == count:
+                    account.resident_history = history
+                    self.loads += 1
+                    self.resident[number] = account
+                    self._evict()
+                    return history
+    
+    def touch(self, account):
+        with self._lock:
+            self._touch(account.account_number)
+    
+    def entry(self, account_number: str) -> Tuple[int, int]:
+        return self.index.get(account_number, NO_HISTORY)
+    
+    def sync(self):
+        os.fsync(self._fd)
+    
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+    
+    def _touch(self, number):
+        if number in self.resident:
+            self.resident.move_to_end(number)
+    
+    def _evict(self):
+        # Only histories whose every record is in the file can be dropped;
+        # ones still waiting for a write-behind commit go to the back.
+        skipped = 0
+        while len(self.resident) > self.capacity and skipped < len(self.resident):
+            number, account = self.resident.popitem(last=False)
+            history = account.resident_history
+            if history is None or len(history) == self.index.get(number, NO_HISTORY)[1]:
+                account.resident_history = None
+            else:
+                self.resident[number] = account
+                skipped += 1
+    
+    def _catch_up(self, number, count, trans):
+        # A history evicted and reloaded between an append and its commit
+        # misses that record; every other resident history already has it.
+        account = self.resident.get(number)
+        if account is not None and account.resident_history is not None and len(account.resident_history) < count:
+            account.resident_history.append_record(*record_fields(trans))
+    
+    def _append(self, number, records):
+        head, count = self.index.get(number, NO_HISTORY)
+        lines = []
+        offset = self.size
+        for trans in records:
+            line = self._line(number, head, trans)
+            lines.append(line)
+            head = offset
+            count += 1
+            offset += len(line)
+        self._write(b''.join(lines))
+        self.index[number] = (head, count)
+    
+    def _line(self, number, prev, trans):
+        return (json.dumps([number, prev, *record_fields(trans)], ensure_ascii=False,
+                           separators=(',', ':')) + '\n').encode('utf-8')
+    
+    def _write(self, data):
+        view = memoryview(data)
+        while view:
+            written = os.write(self._fd, view)
+            view = view[written:]
+        self.size += len(data)
+    
+    def _read(self, offset, count):
+        records = []
+        for _ in range(count):
+            chunk = os.pread(self._fd, HISTORY_READ_SIZE, offset)
+            end = chunk.find(b'\n')
+            while end < 0:
+                more = os.pread(self._fd, HISTORY_READ_SIZE, offset + len(chunk))
+                if not more:
+                    raise ValueError("Truncated history record at offset %d" % offset)
+                chunk += more
+                end = chunk.find(b'\n')
+            record = json.loads(chunk[:end])
+            records.append(record)
+            offset = record[1]
+        records.reverse()
+        return records
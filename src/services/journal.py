@@ -0,0 +1,93 @@
+import json
+import os
+from src.core.constants import JOURNAL_SEQ_KEY, JOURNAL_CHANGES_KEY, JOURNAL_ROTATED_SUFFIX
+
+# Append-only log of mutations, one JSON line per record. Sequence numbers
+# let replay skip records that a snapshot already contains. While a
+# snapshot is being written the records it covers sit in a rotated file
+# next to the journal, and new records go to a fresh one.
+class Journal:
+    def __init__(self, path: str, fsync_every: int = 1):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.seq = 0
+        self.records = 0
+        self._unsynced = 0
+        self._file = None
+        self.rotated_path = path + JOURNAL_ROTATED_SUFFIX
+    
+    def replay(self, after_seq: int = 0):
+        self.seq = max(self.seq, after_seq)
+        for path in (self.rotated_path, self.path):
+            yield from self._replay_file(path, after_seq)
+    
+    def _replay_file(self, path, after_seq):
+        if not os.path.exists(path):
+            return
+        good_offset = 0
+        with open(path, 'rb') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A torn tail from a crash mid-append; the record was
+                    # never acknowledged, so drop it.
+                    break
+                good_offset += len(line)
+                self.records += 1
+                if record[JOURNAL_SEQ_KEY] <= after_seq:
+                    continue
+                self.seq = record[JOURNAL_SEQ_KEY]
+                yield record[JOURNAL_CHANGES_KEY]
+        if good_offset < os.path.getsize(path):
+            with open(path, 'r+b') as f:
+                f.truncate(good_offset)
+    
+    def append(self, changes: list) -> int:
+        self.seq += 1
+        line = json.dumps({JOURNAL_SEQ_KEY: self.seq, JOURNAL_CHANGES_KEY: changes},
+                          separators=(',', ':'))
+        f = self._open()
+        f.write(line + '\n')
+        f.flush()
+        self.records += 1
+        self._unsynced += 1
+        if self.fsync_every and self._unsynced >= self.fsync_every:
+            self.sync()
+        # ASCII-only JSON, so characters are bytes.
+        return len(line) + 1
+    
+    def sync(self):
+        if self._file is not None and self._unsynced:
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+    
+    def rotate(self):
+        # Moves the records so far aside; they are dropped once the snapshot
+        # covering them is written. If an earlier rotation was never dropped
+        # (its snapshot failed) the records are added to it.
+        self.close()
+        if os.path.exists(self.path):
+            if os.path.exists(self.rotated_path):
+                with open(self.path, 'rb') as src, open(self.rotated_path, 'ab') as dst:
+                    dst.write(src.read())
+                    os.fsync(dst.fileno())
+                os.remove(self.path)
+            else:
+                os.replace(self.path, self.rotated_path)
+        self.records = 0
+    
+    def drop_rotated(self):
+        if os.path.exists(self.rotated_path):
+            os.remove(self.rotated_path)
+    
+    def close(self):
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+    
+    def _open(self):
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        return self._file
@@ -0,0 +1,127 @@
+import csv
+from typing import Dict, List
+from src.core.constants import *
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Columnar copy of every account balance for month-end style bulk work.
+# BankingSystem keeps it in sync on each balance change; bulk mutations are
+# computed as vectorized passes and handed to the bank as deltas, so every
+# affected account still gets its own history entry and changes made since
+# the pass read the column are kept.
+class Ledger:
+    def __init__(self, bank, dtype: str = LEDGER_FLOAT):
+        if np is None:
+            raise ImportError(NUMPY_REQUIRED)
+        self.bank = bank
+        self.dtype = dtype
+        # int64 balances are kept in minor units (1/100 of a rial).
+        self.scale = LEDGER_MINOR_UNITS if dtype == LEDGER_INT else 1
+        self.account_numbers: List[str] = []
+        self.positions: Dict[str, int] = {}
+        self.customer_ids: List[str] = []
+        self.customer_positions: Dict[str, int] = {}
+        self.balances = np.zeros(0, dtype=dtype)
+        self.customers = np.zeros(0, dtype=np.int64)
+        self.size = 0
+        self.rebuild()
+    
+    def rebuild(self):
+        accounts = list(self.bank.accounts.values())
+        self.account_numbers = [account.account_number for account in accounts]
+        self.positions = {number: row for row, number in enumerate(self.account_numbers)}
+        self.customer_ids = []
+        self.customer_positions = {}
+        self.size = len(accounts)
+        self.balances = np.zeros(max(self.size, 16), dtype=self.dtype)
+        self.customers = np.zeros(max(self.size, 16), dtype=np.int64)
+        self.balances[:self.size] = [self._to_column(account.balance) for account in accounts]
+        self.customers[:self.size] = [self._customer_code(account.customer_id) for account in accounts]
+    
+    def add(self, account):
+        if account.account_number in self.positions:
+            self.update(account)
+            return
+        if self.size == len(self.balances):
+            self.balances = np.resize(self.balances, self.size * 2)
+            self.customers = np.resize(self.customers, self.size * 2)
+        row = self.size
+        self.account_numbers.append(account.account_number)
+        self.positions[account.account_number] = row
+        self.balances[row] = self._to_column(account.balance)
+        self.customers[row] = self._customer_code(account.customer_id)
+        self.size += 1
+    
+    def update(self, account):
+        row = self.positions.get(account.account_number)
+        if row is None:
+            self.add(account)
+        else:
+            self.balances[row] = self._to_column(account.balance)
+    
+    def column(self):
+        return self.balances[:self.size]
+    
+    def total(self) -> float:
+        return float(self.column().sum()) / self.scale
+    
+    def customer_totals(self) -> Dict[str, float]:
+        sums = np.bincount(self.customers[:self.size], weights=self.column(),
+                           minlength=len(self.customer_ids))
+        return {customer_id: float(total) / self.scale
+                for customer_id, total in zip(self.customer_ids, sums)}
+    
+    def histogram(self, bins=10):
+        counts, edges = np.histogram(self.column(), bins=bins)
+        return counts, edges / self.scale
+    
+    def filter_range(self, low: float, high: float) -> List[str]:
+        column = self.column()
+        rows = np.flatnonzero((column >= self._to_column(low)) & (column <= self._to_column(high)))
+        return [self.account_numbers[row] for row in rows]
+    
+    def apply_rate(self, rate: float, description: str = MONTHLY_INTEREST) -> int:
+        column = self.column()
+        deltas = column * rate
+        if self.dtype == LEDGER_INT:
+            deltas = np.rint(deltas).astype(np.int64)
+        transaction_type = TRANSACTION_TYPES['INTEREST'] if rate >= 0 else TRANSACTION_TYPES['FEE']
+        return self._apply(deltas, transaction_type, description)
+    
+    def apply_fee(self, amount: float, description: str = MONTHLY_FEE) -> int:
+        # Accounts that cannot cover the fee are left untouched.
+        column = self.column()
+        fee = self._to_column(amount)
+        deltas = np.where(column >= fee, -fee, 0).astype(self.dtype)
+        return self._apply(deltas, TRANSACTION_TYPES['FEE'], description)
+    
+    def export(self, path: str):
+        column = self.column()
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow([DATA_ACCOUNT_NUMBER_KEY, DATA_CUSTOMER_ID_KEY, DATA_BALANCE_KEY])
+            for row, account_number in enumerate(self.account_numbers):
+                writer.writerow([account_number,
+                                 self.customer_ids[self.customers[row]],
+                                 column[row] / self.scale])
+    
+    def _apply(self, deltas, transaction_type: str, description: str) -> int:
+        # The bank writes the new balances back into the column.
+        rows = np.flatnonzero(deltas)
+        updates = [(self.account_numbers[row], float(deltas[row]) / self.scale) for row in rows]
+        return self.bank.apply_bulk_balances(updates, transaction_type, description)
+    
+    def _to_column(self, balance: float):
+        if self.dtype == LEDGER_INT:
+            return round(balance * self.scale)
+        return balance
+    
+    def _customer_code(self, customer_id: str) -> int:
+        code = self.customer_positions.get(customer_id)
+        if code is None:
+            code = self.customer_positions[customer_id] = len(self.customer_ids)
+            self.customer_ids.append(customer_id)
+        return code
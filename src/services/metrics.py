@@ -0,0 +1,165 @@
+import os
+import time
+from bisect import bisect_left
+from typing import Dict, Optional, Sequence
+from src.core.constants import *
+
+# Operations wrapped on the bank instance by Metrics.attach.
+BANK_OPERATIONS = ('load_data', 'save_data', 'login', 'deposit', 'withdraw', 'transfer',
+                   'execute_transactions')
+
+class Histogram:
+    # Fixed buckets, so observe is one bisect and two additions. Updates are
+    # not locked; under heavy contention a few observations may be lost,
+    # which is the price of leaving this on in production.
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+    
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+    
+    def quantile(self, q: float) -> Optional[float]:
+        # Upper bound of the bucket holding the q-th observation.
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+    
+    def cumulative(self):
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            yield bound, seen
+        yield float('inf'), self.count
+
+# Instruments a BankingSystem by wrapping methods on the instance. Nothing is
+# wrapped until attach() is called, and detach() removes the wrappers again,
+# so a bank without metrics runs exactly the code it ran before.
+class Metrics:
+    def __init__(self):
+        self.latency: Dict[str, Histogram] = {}
+        self.write_bytes: Dict[str, Histogram] = {}
+        self.errors: Dict[str, int] = {}
+        self.bank = None
+        self._patched = []
+    
+    def attach(self, bank):
+        self.bank = bank
+        for name in BANK_OPERATIONS:
+            self._wrap(bank, name, name, bank.storage if name == 'save_data' else None)
+        self._wrap(bank.storage, 'commit', 'commit', bank.storage)
+        self._wrap(bank.customers, 'get', 'customers_get')
+        self._wrap(bank.accounts, 'get', 'accounts_get')
+    
+    def detach(self):
+        for target, name in self._patched:
+            delattr(target, name)
+        self._patched = []
+        self.bank = None
+    
+    def _wrap(self, target, name, label, storage=None):
+        function = getattr(target, name)
+        latency = self.latency.setdefault(label, Histogram(METRICS_LATENCY_BUCKETS))
+        self.errors.setdefault(label, 0)
+        clock = time.perf_counter
+        if storage is None:
+            def wrapper(*args, **kwargs):
+                start = clock()
+                try:
+                    return function(*args, **kwargs)
+                except BaseException:
+                    self.errors[label] += 1
+                    raise
+                finally:
+                    latency.observe(clock() - start)
+        else:
+            sizes = self.write_bytes.setdefault(label, Histogram(METRICS_BYTES_BUCKETS))
+            def wrapper(*args, **kwargs):
+                written = storage.bytes_written
+                start = clock()
+                try:
+                    return function(*args, **kwargs)
+                except BaseException:
+                    self.errors[label] += 1
+                    raise
+                finally:
+                    latency.observe(clock() - start)
+                    sizes.observe(storage.bytes_written - written)
+        setattr(target, name, wrapper)
+        self._patched.append((target, name))
+    
+    def gauges(self) -> Dict[str, float]:
+        # Computed on demand; nothing on the hot path keeps these up to date.
+        bank = self.bank
+        if bank is None:
+            return {}
+        values = {
+            'priority_heap_depth': bank.scheduler.depth(SCHEDULER_PRIORITY),
+            'transaction_queue_depth': bank.scheduler.depth(SCHEDULER_NORMAL)
+        }
+        for map_name in ('customers', 'accounts'):
+            table = getattr(bank, map_name)
+            if not hasattr(table, 'chain_lengths'):
+                continue
+            lengths = table.chain_lengths()
+            used = [length for length in lengths if length]
+            values[map_name + '_entries'] = len(table)
+            values[map_name + '_buckets'] = len(lengths)
+            values[map_name + '_load_factor'] = len(table) / len(lengths) if lengths else 0.0
+            values[map_name + '_max_chain'] = max(lengths, default=0)
+            values[map_name + '_mean_chain'] = sum(used) / len(used) if used else 0.0
+        return values
+    
+    def snapshot(self) -> dict:
+        operations = {}
+        for label, histogram in self.latency.items():
+            operations[label] = {
+                'count': histogram.count,
+                'errors': self.errors[label],
+                'seconds_total': histogram.total,
+                'p50': histogram.quantile(0.5),
+                'p99': histogram.quantile(0.99)
+            }
+        written = {label: {'count': histogram.count, 'bytes_total': histogram.total}
+                   for label, histogram in self.write_bytes.items()}
+        return {'operations': operations, 'write_bytes': written, 'gauges': self.gauges()}
+    
+    def prometheus(self) -> str:
+        lines = ['# TYPE bank_operation_seconds histogram']
+        for label, histogram in self.latency.items():
+            lines.extend(self._histogram_lines('bank_operation_seconds', label, histogram))
+        lines.append('# TYPE bank_operation_errors_total counter')
+        for label, errors in self.errors.items():
+            lines.append('bank_operation_errors_total{op="%s"} %d' % (label, errors))
+        lines.append('# TYPE bank_write_bytes histogram')
+        for label, histogram in self.write_bytes.items():
+            lines.extend(self._histogram_lines('bank_write_bytes', label, histogram))
+        for name, value in self.gauges().items():
+            lines.append('# TYPE bank_%s gauge' % name)
+            lines.append('bank_%s %s' % (name, value))
+        return '\n'.join(lines) + '\n'
+    
+    def write_prometheus(self, path: str = METRICS_FILE_PATH):
+        # Written to a temporary file and renamed, so a scraper never reads
+        # half a dump.
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w') as f:
+            f.write(self.prometheus())
+        os.replace(temp_path, path)
+    
+    def _histogram_lines(self, metric, label, histogram):
+        for bound, count in histogram.cumulative():
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            yield '%s_bucket{op="%s",le="%s"} %d' % (metric, label, le, count)
+        yield '%s_sum{op="%s"} %r' % (metric, label, histogram.total)
+        yield '%s_count{op="%s"} %d' % (metric, label, histogram.count)
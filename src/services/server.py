@@ -0,0 +1,249 @@
+import argparse
+import asyncio
+import json
+import logging
+import signal
+from typing import Optional
+from src.core.constants import *
+from src.core.models import Customer
+from src.services.auth import PasswordService
+from src.services.banking_system import BankingSystem, valid_amount
+from src.services.concurrent_executor import ConcurrentExecutor
+from src.services.storage import JsonStorage, MappedStorage, SQLiteStorage
+
+# Messages the engine returns instead of raising; the server reports them as
+# errors so clients do not have to compare strings.
+ERRORS = frozenset([
+    INVALID_PASSWORD, LOGIN_ERROR, ACCOUNT_NOT_FOUND, UNAUTHORIZED_ACCESS,
+    INSUFFICIENT_BALANCE, INVALID_AMOUNT, LOGIN_REQUIRED, BATCH_ABORTED,
+    UNKNOWN_OPERATION, INVALID_REQUEST, INTERNAL_ERROR
+])
+
+logger = logging.getLogger(__name__)
+
+# Each connection gets its own session, so any number of customers can be
+# logged in at once without touching bank.current_customer.
+class Session:
+    def __init__(self):
+        self.customer: Optional[Customer] = None
+
+# Line protocol over TCP or a Unix socket: one JSON request per line,
+# {"id": ..., "op": ..., "args": {...}}, answered in order by
+# {"id": ..., "result": ...} or {"id": ..., "error": ...}. Clients may
+# pipeline; responses are flushed once the connection has nothing queued.
+class BankServer:
+    def __init__(self, bank: BankingSystem, workers: int = SERVER_WORKERS,
+                 pipeline_depth: int = SERVER_PIPELINE_DEPTH):
+        self.bank = bank
+        self.pipeline_depth = pipeline_depth
+        # Mutations and their commits run on the executor's threads, never on
+        # the event loop.
+        self.executor = ConcurrentExecutor(bank, workers)
+        self.server = None
+        self.operations = {
+            'register': self.op_register,
+            'login': self.op_login,
+            'logout': self.op_logout,
+            'accounts': self.op_accounts,
+            'create_account': self.op_create_account,
+            'deposit': self.op_deposit,
+            'withdraw': self.op_withdraw,
+            'transfer': self.op_transfer,
+            'balance': self.op_balance,
+            'history_page': self.op_history_page
+        }
+    
+    async def start(self, host: str = SERVER_HOST, port: int = SERVER_PORT, unix_path: Optional[str] = None):
+        if unix_path:
+            self.server = await asyncio.start_unix_server(
+                self.handle_connection, unix_path, limit=SERVER_MAX_LINE, backlog=SERVER_BACKLOG)
+        else:
+            self.server = await asyncio.start_server(
+                self.handle_connection, host, port, limit=SERVER_MAX_LINE, backlog=SERVER_BACKLOG)
+        return self.server
+    
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        await asyncio.to_thread(self.executor.shutdown)
+    
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        session = Session()
+        queue = asyncio.Queue(self.pipeline_depth)
+        read_task = asyncio.create_task(self._read_requests(reader, queue))
+        try:
+            while True:
+                line = await queue.get()
+                if line is None:
+                    break
+                writer.write(await self.handle_line(session, line))
+                if queue.empty():
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            read_task.cancel()
+            writer.close()
+    
+    async def _read_requests(self, reader, queue):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                await queue.put(line)
+        except (ConnectionError, ValueError):
+            pass
+        await queue.put(None)
+    
+    async def handle_line(self, session: Session, line: bytes) -> bytes:
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get('id')
+            operation = self.operations.get(request.get('op'))
+            if operation is None:
+                result = UNKNOWN_OPERATION
+            else:
+                result = await operation(session, **request.get('args', {}))
+        except (ValueError, TypeError, AttributeError):
+            result = INVALID_REQUEST
+        except Exception:
+            # Anything else is a bug or a storage failure; the client still
+            # gets an answer and the connection stays up.
+            # Only the id and operation are logged: args may hold a password.
+            logger.exception("Request %r (%s) failed", request_id, request.get('op'))
+            result = INTERNAL_ERROR
+        if isinstance(result, str) and result in ERRORS:
+            response = {'id': request_id, 'error': result}
+        else:
+            response = {'id': request_id, 'result': result}
+        return json.dumps(response, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n'
+    
+    async def _read(self, operation, *args, **kwargs):
+        # Lazy backends may go to disk for an account; in-memory reads are
+        # cheap enough to answer on the loop.
+        if self.bank.storage.lazy_accounts:
+            return await asyncio.to_thread(operation, *args, **kwargs)
+        return operation(*args, **kwargs)
+    
+    def _owned_balance(self, account_number, customer):
+        # The ownership check and the balance in one call, so that neither
+        # touches storage on the loop.
+        result = self.bank.get_account_balance(account_number, customer)
+        if result in ERRORS:
+            return result
+        return self.bank.accounts.get(account_number).balance
+    
+    async def op_register(self, session, name, password):
+        return await asyncio.wrap_future(self.executor.call(self.bank.register_customer, name, password))
+    
+    async def op_login(self, session, customer_id, password):
+        customer = await asyncio.to_thread(self.bank.authenticate, customer_id, password)
+        if customer is None:
+            return LOGIN_ERROR
+        session.customer = customer
+        return customer.customer_id
+    
+    async def op_logout(self, session):
+        session.customer = None
+        return True
+    
+    async def op_accounts(self, session):
+        if session.customer is None:
+            return LOGIN_REQUIRED
+        return self.bank.customer_account_numbers(session.customer)
+    
+    async def op_create_account(self, session):
+        if session.customer is None:
+            return LOGIN_REQUIRED
+        return await asyncio.wrap_future(self.executor.call(self.bank.create_account, session.customer))
+    
+    async def op_deposit(self, session, account_number, amount):
+        if session.customer is None:
+            return LOGIN_REQUIRED
+        amount = float(amount)
+        if not valid_amount(amount):
+            return INVALID_AMOUNT
+        return await asyncio.wrap_future(self.executor.deposit(account_number, amount, session.customer))
+    
+    async def op_withdraw(self, session, account_number, amount):
+        if session.customer is None:
+            return LOGIN_REQUIRED
+        amount = float(amount)
+        if not valid_amount(amount):
+            return INVALID_AMOUNT
+        return await asyncio.wrap_future(self.executor.withdraw(account_number, amount, session.customer))
+    
+    async def op_transfer(self, session, from_account, to_account, amount):
+        if session.customer is None:
+            return LOGIN_REQUIRED
+        amount = float(amount)
+        if not valid_amount(amount):
+            return INVALID_AMOUNT
+        # Only the owner of the source account may move money out of it.
+        owned = await self._read(self.bank.get_account_balance, from_account, session.customer)
+        if owned in ERRORS:
+            return owned
+        return await asyncio.wrap_future(self.executor.transfer(from_account, to_account, amount))
+    
+    async def op_balance(self, session, account_number):
+        if session.customer is None:
+            return LOGIN_REQUIRED
+        return await self._read(self._owned_balance, account_number, session.customer)
+    
+    async def op_history_page(self, session, account_number, offset=0, cursor=None,
+                              limit=TRANSACTION_PAGE_SIZE, newest_first=True):
+        if session.customer is None:
+            return LOGIN_REQUIRED
+        # Histories are read from disk the first time they are touched, on
+        # every backend.
+        page = await asyncio.to_thread(self.bank.get_transaction_page, account_number, offset, cursor,
+                                       min(int(limit), TRANSACTION_PAGE_SIZE), newest_first, session.customer)
+        if isinstance(page, str):
+            return page
+        return {
+            'records': [record._asdict() for record in page.records],
+            'next_cursor': page.next_cursor,
+            'total': page.total
+        }
+
+async def serve(bank: BankingSystem, host: str, port: int, unix_path: Optional[str], workers: int):
+    bank_server = BankServer(bank, workers)
+    server = await bank_server.start(host, port, unix_path)
+    for sock in server.sockets:
+        address = sock.getsockname()
+        print(address if isinstance(address, str) else "{}:{}".format(*address[:2]), flush=True)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
+    await bank_server.close()
+    bank.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the bank over a local socket")
+    parser.add_argument("--data", default=DATA_FILE_PATH)
+    parser.add_argument("--journal", default=None)
+    parser.add_argument("--sqlite", default=None, help="use SQLiteStorage with this database")
+    parser.add_argument("--balances", default=None, help="use MappedStorage with this balance table")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--unix", default=None, help="listen on a Unix socket instead of TCP")
+    parser.add_argument("--workers", type=int, default=SERVER_WORKERS)
+    args = parser.parse_args()
+    
+    if args.sqlite:
+        storage = SQLiteStorage(args.sqlite)
+    elif args.balances:
+        storage = MappedStorage(args.data, args.journal, args.balances)
+    else:
+        storage = JsonStorage(args.data, args.journal)
+    # Many clients can log in at once, so KDF work goes to a process pool.
+    bank = BankingSystem(storage, passwords=PasswordService(use_processes=True))
+    asyncio.run(serve(bank, args.host, args.port, args.unix, args.workers))
+
+if __name__ == "__main__":
+    main()
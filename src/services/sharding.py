@@ -0,0 +1,362 @@
+import multiprocessing
+import os
+import threading
+import uuid
+from concurrent.futures import Future
+from typing import Dict, List
+from src.core.constants import *
+from src.services.auth import PasswordService
+from src.services.banking_system import BankingSystem, valid_amount
+from src.services.journal import Journal
+from src.services.storage import JsonStorage
+
+def shard_of(key: str, shard_count: int) -> int:
+    # Shard i hands out ids i+1, i+1+n, i+1+2n, ..., so the numeric part of
+    # a customer id or account number tells any process which shard owns it
+    # without a lookup, and sequential ids spread evenly.
+    digits = ''.join(c for c in key if c.isdigit())
+    return (int(digits) - 1) % shard_count if digits else 0
+
+def shard_path(path: str, index: int) -> str:
+    root, ext = os.path.splitext(path)
+    return root + SHARD_FILE_FORMAT.format(index) + ext
+
+def transfer_log_path(data_file: str) -> str:
+    return os.path.splitext(data_file)[0] + TRANSFER_LOG_SUFFIX
+
+# The operations a shard process runs on its own BankingSystem. Accounts
+# live in the shard of the customer that opened them, so ownership checks
+# stay local. For cross-shard transfers it is a two-phase commit
+# participant: prepare checks the account and, for the paying side, holds
+# the amount so withdrawals and other transfers cannot spend it; commit or
+# abort then settles or releases the hold. Every step is committed to the
+# shard's storage, which keeps the state of each transfer (prepared, or
+# applied) in its snapshot until the router says to forget it, so after a
+# restart holds are back and a side sent again is not applied twice.
+class ShardWorker:
+    def __init__(self, bank: BankingSystem):
+        self.bank = bank
+        # transfer id -> (account number, amount) voted for but not decided.
+        self.prepared: Dict[str, tuple] = {}
+        # account number -> amount held by prepared debits.
+        self.held: Dict[str, float] = {}
+        for transfer_id, record in bank.storage.transfers.items():
+            if record[TRANSFER_STATE_KEY] == TRANSFER_PREPARED:
+                self._hold(transfer_id, record[DATA_ACCOUNT_NUMBER_KEY], record['amount'])
+    
+    def register_customer(self, name, password):
+        return self.bank.register_customer(name, password)
+    
+    def authenticate(self, customer_id, password):
+        return self.bank.authenticate(customer_id, password) is not None
+    
+    def create_account(self, customer_id):
+        return self.bank.create_account(self.bank.customers.get(customer_id))
+    
+    def deposit(self, account_number, amount, customer_id):
+        return self.bank.deposit(account_number, amount, self.bank.customers.get(customer_id))
+    
+    def withdraw(self, account_number, amount, customer_id):
+        account = self.bank.accounts.get(account_number)
+        if account and account.customer_id == customer_id and 0 < amount and self._available(account) < amount:
+            return INSUFFICIENT_BALANCE
+        return self.bank.withdraw(account_number, amount, self.bank.customers.get(customer_id))
+    
+    def get_account_balance(self, account_number, customer_id):
+        return self.bank.get_account_balance(account_number, self.bank.customers.get(customer_id))
+    
+    def get_transaction_history(self, account_number, customer_id):
+        return self.bank.get_transaction_history(account_number, self.bank.customers.get(customer_id))
+    
+    def transfer(self, from_account, to_account, amount):
+        error = self._check_debit(from_account, amount)
+        if error is None and not self.bank.accounts.get(to_account):
+            error = ACCOUNT_NOT_FOUND
+        return error or self.bank.transfer(from_account, to_account, amount)
+    
+    def prepare(self, transfer_id, account_number, amount):
+        # Returns None to vote commit, or the reason to abort.
+        if amount < 0:
+            error = self._check_debit(account_number, -amount)
+        else:
+            error = None if self.bank.accounts.get(account_number) else ACCOUNT_NOT_FOUND
+        if error:
+            return error
+        self._log(transfer_id, TRANSFER_PREPARED, account_number, amount)
+        self._hold(transfer_id, account_number, amount)
+        return None
+    
+    def commit(self, transfer_id, account_number, amount, counterparty):
+        record = self.bank.storage.transfers.get(transfer_id)
+        if record is not None and record[TRANSFER_STATE_KEY] == TRANSFER_APPLIED:
+            # Sent again by a recovering router; this side already landed.
+            return
+        if transfer_id in self.prepared:
+            self._release(transfer_id)
+        # Marks the transfer applied in the same commit as the balance.
+        self.bank.post_transfer(account_number, amount, counterparty, transfer_id)
+    
+    def abort(self, transfer_id):
+        if transfer_id in self.prepared:
+            self._release(transfer_id)
+        if transfer_id in self.bank.storage.transfers:
+            self._log(transfer_id, TRANSFER_ABORTED)
+    
+    def forget(self, transfer_id):
+        # The router has logged the transfer as done on both sides.
+        if transfer_id in self.bank.storage.transfers:
+            self._log(transfer_id, TRANSFER_DONE)
+    
+    def transfer_states(self):
+        return {transfer_id: record[TRANSFER_STATE_KEY]
+                for transfer_id, record in self.bank.storage.transfers.items()}
+    
+    def _log(self, transfer_id, state, account_number=None, amount=None):
+        change = {CHANGE_OP_KEY: CHANGE_TRANSFER, CHANGE_TRANSFER_ID_KEY: transfer_id, TRANSFER_STATE_KEY: state}
+        if account_number is not None:
+            change[DATA_ACCOUNT_NUMBER_KEY] = account_number
+            change['amount'] = amount
+        self.bank.storage.commit(self.bank, [change])
+    
+    def _hold(self, transfer_id, account_number, amount):
+        self.prepared[transfer_id] = (account_number, amount)
+        if amount < 0:
+            self.held[account_number] = self.held.get(account_number, 0) - amount
+    
+    def _release(self, transfer_id):
+        account_number, amount = self.prepared.pop(transfer_id)
+        if amount < 0:
+            held = self.held[account_number] + amount
+            if held > 0:
+                self.held[account_number] = held
+            else:
+                del self.held[account_number]
+    
+    def _available(self, account):
+        return account.balance - self.held.get(account.account_number, 0)
+    
+    def _check_debit(self, account_number, amount):
+        account = self.bank.accounts.get(account_number)
+        if not account:
+            return ACCOUNT_NOT_FOUND
+        if not self.bank._valid_amount(amount):
+            return INVALID_AMOUNT
+        if self._available(account) < amount:
+            return INSUFFICIENT_BALANCE
+        return None
+
+def run_shard(connection, index, shard_count, data_file, journal_file, fsync_every, compact_every):
+    # Entry point of a shard process: loads the shard, then answers
+    # (request id, operation, args) messages one at a time until None.
+    # Password hashing stays in this process, which is already one of the
+    # cores the shards are spread over.
+    bank = BankingSystem(JsonStorage(data_file, journal_file, fsync_every, compact_every),
+                         passwords=PasswordService(use_processes=False))
+    bank.shard_index = index
+    bank.shard_count = shard_count
+    worker = ShardWorker(bank)
+    connection.send(None)
+    try:
+        while True:
+            request = connection.recv()
+            if request is None:
+                break
+            request_id, operation, args = request
+            try:
+                reply = (True, getattr(worker, operation)(*args))
+            except Exception as error:
+                reply = (False, repr(error))
+            connection.send((request_id, reply))
+    finally:
+        bank.close()
+        connection.close()
+
+# Router-side handle of one shard process. Requests from any number of
+# threads share the pipe; a reader thread matches replies to futures.
+class ShardClient:
+    def __init__(self, context, index: int, shard_count: int, data_file: str, journal_file: str,
+                 fsync_every: int, compact_every: int):
+        self.index = index
+        self.connection, child = context.Pipe()
+        self.process = context.Process(target=run_shard, name="bank-shard-%d" % index,
+                                       args=(child, index, shard_count, data_file, journal_file,
+                                             fsync_every, compact_every))
+        self.process.start()
+        child.close()
+        self._futures: Dict[int, Future] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._reader = threading.Thread(target=self._read, name="bank-shard-%d-reader" % index, daemon=True)
+    
+    def wait_ready(self):
+        self.connection.recv()
+        self._reader.start()
+    
+    def call(self, operation: str, *args) -> Future:
+        future = Future()
+        with self._lock:
+            self._next_id += 1
+            self._futures[self._next_id] = future
+            self.connection.send((self._next_id, operation, args))
+        return future
+    
+    def close(self):
+        with self._lock:
+            self.connection.send(None)
+        self.process.join()
+        self._reader.join()
+        self.connection.close()
+    
+    def _read(self):
+        while True:
+            try:
+                request_id, (ok, value) = self.connection.recv()
+            except (EOFError, OSError):
+                with self._lock:
+                    futures, self._futures = self._futures, {}
+                for future in futures.values():
+                    future.set_exception(ConnectionError("Shard %d exited" % self.index))
+                return
+            with self._lock:
+                future = self._futures.pop(request_id)
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(RuntimeError(value))
+
+# Spreads customers and their accounts over shard processes, each with its
+# own BankingSystem, snapshot and journal (bank_data.shard0.json, ...), so
+# operations on different shards run on different cores. Operations go to
+# the shard that owns the account; a transfer between shards is a two-phase
+# commit coordinated here. The decision to commit is logged before either
+# shard is told, and on startup every logged transfer not marked done is
+# sent again, which shards that already applied it ignore. A transfer with
+# no logged decision was never applied anywhere, so on startup sides still
+# prepared for one are aborted. Shards remember a transfer until told to
+# forget it, which happens only after it is logged as done.
+class ShardedBank:
+    def __init__(self, shard_count: int = SHARD_COUNT, data_file: str = DATA_FILE_PATH,
+                 journal_file: str = JOURNAL_FILE_PATH,
+                 fsync_every: int = JOURNAL_FSYNC_EVERY,
+                 compact_every: int = JOURNAL_COMPACT_EVERY):
+        shard_count = shard_count or os.cpu_count() or 1
+        # spawn, for the same reason as PasswordService's pool.
+        context = multiprocessing.get_context('spawn')
+        self.shards: List[ShardClient] = [
+            ShardClient(context, index, shard_count, shard_path(data_file, index),
+                        shard_path(journal_file, index), fsync_every, compact_every)
+            for index in range(shard_count)
+        ]
+        for shard in self.shards:
+            shard.wait_ready()
+        self.transfers = Journal(transfer_log_path(data_file), fsync_every)
+        self._log_lock = threading.Lock()
+        self._next_shard = 0
+        self._recover()
+    
+    def shard_for(self, key: str) -> ShardClient:
+        return self.shards[shard_of(key, len(self.shards))]
+    
+    def register_customer(self, name: str, password: str) -> str:
+        with self._log_lock:
+            shard = self.shards[self._next_shard]
+            self._next_shard = (self._next_shard + 1) % len(self.shards)
+        return shard.call('register_customer', name, password).result()
+    
+    def authenticate(self, customer_id: str, password: str) -> bool:
+        return self.shard_for(customer_id).call('authenticate', customer_id, password).result()
+    
+    def create_account(self, customer_id: str) -> str:
+        return self.shard_for(customer_id).call('create_account', customer_id).result()
+    
+    def deposit(self, account_number: str, amount: float, customer_id: str) -> str:
+        return self.shard_for(account_number).call('deposit', account_number, amount, customer_id).result()
+    
+    def withdraw(self, account_number: str, amount: float, customer_id: str) -> str:
+        return self.shard_for(account_number).call('withdraw', account_number, amount, customer_id).result()
+    
+    def get_account_balance(self, account_number: str, customer_id: str) -> str:
+        return self.shard_for(account_number).call('get_account_balance', account_number, customer_id).result()
+    
+    def get_transaction_history(self, account_number: str, customer_id: str) -> str:
+        return self.shard_for(account_number).call('get_transaction_history', account_number,
+                                                   customer_id).result()
+    
+    def transfer(self, from_account: str, to_account: str, amount: float) -> str:
+        source = self.shard_for(from_account)
+        target = self.shard_for(to_account)
+        if source is target:
+            return source.call('transfer', from_account, to_account, amount).result()
+        if not valid_amount(amount):
+            return INVALID_AMOUNT
+        
+        transfer_id = uuid.uuid4().hex
+        votes = [source.call('prepare', transfer_id, from_account, -amount),
+                 target.call('prepare', transfer_id, to_account, amount)]
+        errors = []
+        failure = None
+        for vote in votes:
+            try:
+                errors.append(vote.result())
+            except Exception as error:
+                errors.append(None)
+                failure = failure or error
+        if failure or any(errors):
+            # Releases the holds of shards that voted yes; a shard that
+            # failed is cleaned up by _recover on the next start.
+            for shard, vote, error in zip((source, target), votes, errors):
+                if error is None and vote.exception() is None:
+                    shard.call('abort', transfer_id)
+            if failure:
+                raise failure
+            return next(error for error in errors if error)
+        
+        record = {
+            CHANGE_TRANSFER_ID_KEY: transfer_id,
+            TRANSFER_STATE_KEY: TRANSFER_COMMIT,
+            'from_account': from_account,
+            'to_account': to_account,
+            'amount': amount
+        }
+        with self._log_lock:
+            self.transfers.append([record])
+        self._finish(record)
+        return TRANSFER_SUCCESS.format(amount)
+    
+    def close(self):
+        for shard in self.shards:
+            shard.close()
+        self.transfers.close()
+    
+    def _finish(self, record):
+        transfer_id = record[CHANGE_TRANSFER_ID_KEY]
+        from_account = record['from_account']
+        to_account = record['to_account']
+        amount = record['amount']
+        sides = [self.shard_for(from_account).call('commit', transfer_id, from_account, -amount, to_account),
+                 self.shard_for(to_account).call('commit', transfer_id, to_account, amount, from_account)]
+        for side in sides:
+            side.result()
+        with self._log_lock:
+            self.transfers.append([{CHANGE_TRANSFER_ID_KEY: transfer_id, TRANSFER_STATE_KEY: TRANSFER_DONE}])
+        for shard in {self.shard_for(from_account), self.shard_for(to_account)}:
+            shard.call('forget', transfer_id)
+    
+    def _recover(self):
+        pending = {}
+        for records in self.transfers.replay():
+            for record in records:
+                if record[TRANSFER_STATE_KEY] == TRANSFER_COMMIT:
+                    pending[record[CHANGE_TRANSFER_ID_KEY]] = record
+                else:
+                    pending.pop(record[CHANGE_TRANSFER_ID_KEY], None)
+        for record in pending.values():
+            self._finish(record)
+        # What shards still remember is either prepared with no decision,
+        # so aborted, or finished before a forget was delivered.
+        for shard in self.shards:
+            for transfer_id, state in shard.call('transfer_states').result().items():
+                shard.call('forget' if state == TRANSFER_APPLIED else 'abort', transfer_id).result()
+        # Every decision is carried out, so the log can start again.
+        self.transfers.rotate()
+        self.transfers.drop_rotated()
@@ -0,0 +1,193 @@
+import json
+import os
+import re
+import stat
+import threading
+import uuid
+from typing import Callable, Dict, Optional
+from src.core.constants import *
+from src.services.journal import Journal
+
+SNAPSHOT_KINDS = (DATA_CUSTOMERS_KEY, DATA_ACCOUNTS_KEY)
+
+def chunks_path(data_file: str) -> str:
+    return os.path.splitext(data_file)[0] + SNAPSHOT_CHUNKS_SUFFIX
+
+def chunk_of(key: str) -> int:
+    # Customer ids and account numbers are numbered, so neighbouring ids,
+    # which tend to change together, share a chunk.
+    digits = re.sub(r'\D', '', key)
+    return int(digits or 0) // SNAPSHOT_CHUNK_SIZE
+
+def write_atomic(path: str, data: bytes) -> int:
+    # A reader, or a restart after a crash, sees the old file or the new
+    # one, never a partial write. The new file keeps the old one's mode, or
+    # is created 0666 less the umask, as open() would create it.
+    directory = os.path.dirname(path) or '.'
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        mode = None
+    temp_path = os.path.join(directory, '.%s.%s' % (os.path.basename(path), uuid.uuid4().hex))
+    fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+    try:
+        if mode is not None:
+            os.fchmod(fd, mode)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    dir_fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+    return len(data)
+
+# Writes the snapshot as a small manifest (the data file) naming one JSON
+# file per chunk of customers or accounts. Commits hand over the committed
+# record of every customer and account they change; a snapshot swaps that
+# set out, rewrites only the chunks it touches and then replaces the
+# manifest. It works from committed records rather than the live bank, so
+# it runs on a background thread without holding up operations, and the
+# view it writes is exactly the one the journal had at the swap.
+class SnapshotWriter:
+    def __init__(self, data_file: str, journal: Optional[Journal] = None,
+                 before_manifest: Optional[Callable[[], None]] = None,
+                 extra: Optional[Callable[[], dict]] = None):
+        self.data_file = data_file
+        self.directory = chunks_path(data_file)
+        self.journal = journal
+        self.before_manifest = before_manifest
+        # Returns further manifest entries; called under the commit lock so
+        # they match the journal position the snapshot records.
+        self.extra = extra
+        # Held by commits while they record changes and append to the
+        # journal, so a swap sees both at the same point.
+        self.lock = threading.Lock()
+        self.dirty: Dict[str, Dict[str, dict]] = {kind: {} for kind in SNAPSHOT_KINDS}
+        # kind -> chunk id (as a string, as in the manifest) -> file name.
+        self.chunks: Dict[str, Dict[str, str]] = {kind: {} for kind in SNAPSHOT_KINDS}
+        self.generation = 0
+        self.bytes_written = 0
+        self.snapshots = 0
+        self.error: Optional[BaseException] = None
+        self._write_lock = threading.Lock()
+        self._cond = threading.Condition()
+        self._requested = False
+        self._thread: Optional[threading.Thread] = None
+    
+    def chunk_file(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+    
+    def restore(self, chunks: Dict[str, Dict[str, str]]):
+        # Called with the manifest's chunk table while loading.
+        for kind in SNAPSHOT_KINDS:
+            self.chunks[kind] = dict(chunks.get(kind, {}))
+        names = [name for table in self.chunks.values() for name in table.values()]
+        self.generation = max((int(name.rsplit('-g', 1)[1].split('.')[0]) for name in names), default=0)
+    
+    def mark(self, kind: str, key: str, record: dict):
+        # Caller holds self.lock.
+        self.dirty[kind][key] = record
+    
+    def pending(self, kind: str, key: str) -> Optional[dict]:
+        return self.dirty[kind].get(key)
+    
+    def request(self):
+        # Starts a background snapshot, or queues one behind the snapshot
+        # being written. The thread is not a daemon, so the interpreter
+        # waits for a snapshot in flight before exiting.
+        with self._cond:
+            self._requested = True
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="snapshot-writer")
+                self._thread.start()
+    
+    def wait(self):
+        with self._cond:
+            self._cond.wait_for(lambda: self._thread is None)
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+    
+    def write(self, collect: Optional[Callable[[], Dict[str, Dict[str, dict]]]] = None):
+        # Writes a snapshot now. With collect, the records it returns
+        # (called under the commit lock) replace the whole snapshot instead
+        # of the pending changes being merged into the current chunks.
+        with self._write_lock:
+            with self.lock:
+                full = collect is not None
+                pending = collect() if full else self.dirty
+                self.dirty = {kind: {} for kind in SNAPSHOT_KINDS}
+                if not full and not any(pending.values()):
+                    return
+                seq = self.journal.seq if self.journal else 0
+                extra = self.extra() if self.extra else {}
+                if self.journal:
+                    self.journal.rotate()
+            try:
+                self._write(pending, full, seq, extra)
+            except BaseException:
+                # Keeps the records for the next attempt; later changes win.
+                with self.lock:
+                    for kind in SNAPSHOT_KINDS:
+                        pending[kind].update(self.dirty[kind])
+                    self.dirty = pending
+                raise
+    
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._requested:
+                    self._thread = None
+                    self._cond.notify_all()
+                    return
+                self._requested = False
+            try:
+                self.write()
+            except Exception as error:
+                self.error = error
+    
+    def _write(self, pending, full, seq, extra):
+        os.makedirs(self.directory, exist_ok=True)
+        self.generation += 1
+        chunks = {kind: ({} if full else dict(self.chunks[kind])) for kind in SNAPSHOT_KINDS}
+        for kind in SNAPSHOT_KINDS:
+            groups: Dict[int, Dict[str, dict]] = {}
+            for key, record in pending[kind].items():
+                groups.setdefault(chunk_of(key), {})[key] = record
+            for chunk, updates in sorted(groups.items()):
+                records = {} if full else self._read_chunk(kind, chunks[kind].get(str(chunk)))
+                records.update(updates)
+                name = '%s-%06d-g%d.json' % (kind, chunk, self.generation)
+                data = json.dumps({kind: list(records.values())}, ensure_ascii=False).encode('utf-8')
+                self.bytes_written += write_atomic(self.chunk_file(name), data)
+                chunks[kind][str(chunk)] = name
+        if self.before_manifest:
+            self.before_manifest()
+        manifest = {DATA_CHUNKS_KEY: chunks, **extra}
+        if self.journal:
+            manifest[DATA_JOURNAL_SEQ_KEY] = seq
+        self.bytes_written += write_atomic(self.data_file, json.dumps(manifest, indent=2).encode('utf-8'))
+        live = {name for table in chunks.values() for name in table.values()}
+        for table in self.chunks.values():
+            for name in table.values():
+                if name not in live:
+                    os.remove(self.chunk_file(name))
+        self.chunks = chunks
+        self.snapshots += 1
+        if self.journal:
+            self.journal.drop_rotated()
+    
+    def _read_chunk(self, kind, name):
+        if name is None:
+            return {}
+        with open(self.chunk_file(name), 'rb') as f:
+            records = json.load(f)[kind]
+        key = DATA_CUSTOMER_ID_KEY if kind == DATA_CUSTOMERS_KEY else DATA_ACCOUNT_NUMBER_KEY
+        return {record[key]: record for record in records}
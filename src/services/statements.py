@@ -0,0 +1,170 @@
+import csv
+import io
+import json
+import multiprocessing
+import os
+from bisect import bisect_left, bisect_right
+from collections import deque
+from datetime import timedelta
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Iterable, Iterator, List, Optional, Tuple
+from src.core.constants import *
+from src.core.data_structures import TransactionHistory, TransactionRecord
+from src.core.models import BankAccount
+from src.services.snapshots import write_atomic
+from src.services.transaction_index import Timestamp, to_micros
+
+def checkpoint_path(path: str) -> str:
+    return path + STATEMENT_CHECKPOINT_SUFFIX
+
+def statement_columns(account: BankAccount, low: Optional[int], high: Optional[int]) -> tuple:
+    # The account's history for the period as plain column slices, cheap to
+    # pickle. The closing balance takes back whatever came after the period.
+    history = account.transaction_history
+    timestamps = history.timestamps
+    first = 0 if low is None else bisect_left(timestamps, low)
+    last = len(timestamps) if high is None else bisect_right(timestamps, high)
+    closing = account.balance - sum(history.amounts[last:])
+    opening = closing - sum(history.amounts[first:last])
+    return (account.account_number, account.customer_id, opening, closing,
+            history.types[first:last], history.amounts[first:last], timestamps[first:last],
+            history.templates[first:last], history.refs[first:last])
+
+def format_statements(fmt: str, type_names: List[str], template_names: List[str],
+                      statements: List[tuple]) -> bytes:
+    # Runs in a pool process, which has not seen the types and templates the
+    # bank interned, so their names come with every chunk. Records are built
+    # as TransactionHistory.record does, straight from the columns.
+    out = io.StringIO()
+    writer = csv.writer(out)
+    epoch = TransactionHistory.EPOCH
+    for account_number, customer_id, opening, closing, types, amounts, timestamps, templates, refs in statements:
+        records = [TransactionRecord(type_names[code], amount,
+                                     template_names[template] if ref is None else template_names[template].format(ref),
+                                     (epoch + timedelta(microseconds=timestamp)).isoformat())
+                   for code, amount, timestamp, template, ref in zip(types, amounts, timestamps, templates, refs)]
+        if fmt == STATEMENT_CSV:
+            balance = opening
+            for record in records:
+                balance += record.amount
+                writer.writerow([account_number, customer_id, *record, balance])
+        else:
+            out.write(json.dumps({
+                DATA_ACCOUNT_NUMBER_KEY: account_number,
+                DATA_CUSTOMER_ID_KEY: customer_id,
+                STATEMENT_OPENING_KEY: opening,
+                STATEMENT_CLOSING_KEY: closing,
+                STATEMENT_TRANSACTIONS_KEY: [record._asdict() for record in records]
+            }, ensure_ascii=False))
+            out.write('\n')
+    return out.getvalue().encode('utf-8')
+
+# Writes a statement for every account between start and end (inclusive)
+# to one CSV file (a row per transaction, with the running balance) or one
+# JSON-lines file (an object per account with its opening and closing
+# balance). Accounts are streamed from the bank in numbering order and
+# formatted in chunks by a process pool; only a few chunks per worker are
+# in flight, so memory does not grow with the number of accounts. Chunks
+# are written in order and each is followed by a checkpoint of the next
+# account position and the file size, so an interrupted export started
+# again with the same settings truncates the partial chunk and carries on.
+class StatementExporter:
+    def __init__(self, path: str, fmt: str = STATEMENT_CSV, start: Timestamp = None, end: Timestamp = None,
+                 workers: int = STATEMENT_WORKERS, chunk_size: int = STATEMENT_CHUNK_SIZE,
+                 use_processes: bool = True):
+        self.path = path
+        self.fmt = fmt
+        self.start = to_micros(start)
+        self.end = to_micros(end)
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.use_processes = use_processes
+        self.statements = 0
+        self.resumed_from = 0
+        self._pool = None
+    
+    def export(self, bank) -> int:
+        # bank only needs iter_accounts(start), as on BankingSystem. Returns
+        # the number of statements written by this call.
+        checkpoint = self._load_checkpoint()
+        position, offset = (checkpoint['position'], checkpoint['offset']) if checkpoint else (0, 0)
+        self.resumed_from = position
+        self.statements = 0
+        if self.use_processes:
+            # spawn, for the same reason as PasswordService.
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+        pending = deque()
+        try:
+            with open(self.path, 'r+b' if checkpoint else 'wb') as f:
+                f.seek(offset)
+                f.truncate()
+                if not checkpoint and self.fmt == STATEMENT_CSV:
+                    f.write(self._header())
+                for next_position, statements in self._chunks(bank.iter_accounts(position)):
+                    pending.append((next_position, len(statements), self._submit(statements)))
+                    if len(pending) >= self.workers * STATEMENT_IN_FLIGHT:
+                        self._write_chunk(f, pending.popleft())
+                while pending:
+                    self._write_chunk(f, pending.popleft())
+        finally:
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+                self._pool = None
+        if os.path.exists(checkpoint_path(self.path)):
+            os.remove(checkpoint_path(self.path))
+        return self.statements
+    
+    def _chunks(self, accounts: Iterable[Tuple[int, BankAccount]]) -> Iterator[Tuple[int, List[tuple]]]:
+        statements = []
+        position = -1
+        for position, account in accounts:
+            statements.append(statement_columns(account, self.start, self.end))
+            if len(statements) == self.chunk_size:
+                yield position + 1, statements
+                statements = []
+        if statements:
+            yield position + 1, statements
+    
+    def _submit(self, statements) -> Future:
+        args = (self.fmt, TransactionHistory.type_names, TransactionHistory.template_names, statements)
+        if self._pool is not None:
+            return self._pool.submit(format_statements, *args)
+        future = Future()
+        future.set_result(format_statements(*args))
+        return future
+    
+    def _write_chunk(self, f, chunk):
+        next_position, count, future = chunk
+        f.write(future.result())
+        f.flush()
+        os.fsync(f.fileno())
+        self.statements += count
+        self._save_checkpoint(next_position, f.tell())
+    
+    def _header(self) -> bytes:
+        out = io.StringIO()
+        csv.writer(out).writerow([DATA_ACCOUNT_NUMBER_KEY, DATA_CUSTOMER_ID_KEY, *TransactionRecord._fields,
+                                  DATA_BALANCE_KEY])
+        return out.getvalue().encode('utf-8')
+    
+    def _settings(self) -> dict:
+        return {'format': self.fmt, 'start': self.start, 'end': self.end, 'chunk_size': self.chunk_size}
+    
+    def _save_checkpoint(self, position: int, offset: int):
+        write_atomic(checkpoint_path(self.path),
+                     json.dumps({'position': position, 'offset': offset, **self._settings()}).encode('utf-8'))
+    
+    def _load_checkpoint(self) -> Optional[dict]:
+        # A checkpoint from an export with other settings, or one whose
+        # output has since been replaced, is ignored and the export starts
+        # over.
+        try:
+            with open(checkpoint_path(self.path), 'rb') as f:
+                checkpoint = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if any(checkpoint.get(key) != value for key, value in self._settings().items()):
+            return None
+        if not os.path.exists(self.path) or os.path.getsize(self.path) < checkpoint['offset']:
+            return None
+        return checkpoint
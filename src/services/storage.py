@@ -0,0 +1,788 @@
+import codecs
+import heapq
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from itertools import islice
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from src.core.constants import *
+from src.core.data_structures import TransactionHistory, TransactionRecord
+from src.core.models import Customer, BankAccount
+from src.services.balance_table import RECORD, BalanceTable, TableHistoryIndex, balance_path
+from src.services.history_store import HistoryStore, history_path
+from src.services.journal import Journal
+from src.services.snapshots import SNAPSHOT_KINDS, SnapshotWriter
+
+def customer_record(customer: Customer) -> dict:
+    return {
+        DATA_CUSTOMER_ID_KEY: customer.customer_id,
+        DATA_NAME_KEY: customer.name,
+        DATA_PASSWORD_HASH_KEY: customer.password_hash
+    }
+
+def account_record(account: BankAccount) -> dict:
+    return {
+        DATA_ACCOUNT_NUMBER_KEY: account.account_number,
+        DATA_CUSTOMER_ID_KEY: account.customer_id,
+        DATA_BALANCE_KEY: account.balance
+    }
+
+def transaction_change(account: BankAccount, transaction: TransactionRecord) -> dict:
+    return {
+        CHANGE_OP_KEY: CHANGE_TRANSACTION,
+        DATA_ACCOUNT_NUMBER_KEY: account.account_number,
+        DATA_BALANCE_KEY: account.balance,
+        CHANGE_TRANSACTION: transaction._asdict()
+    }
+
+def customer_from_record(record: dict) -> Customer:
+    return Customer(
+        record[DATA_CUSTOMER_ID_KEY],
+        record[DATA_NAME_KEY],
+        record[DATA_PASSWORD_HASH_KEY],
+        is_hashed=True
+    )
+
+def account_from_record(record: dict) -> BankAccount:
+    account = BankAccount(
+        record[DATA_ACCOUNT_NUMBER_KEY],
+        record[DATA_CUSTOMER_ID_KEY]
+    )
+    account.balance = record[DATA_BALANCE_KEY]
+    for trans in record.get(DATA_TRANSACTION_HISTORY_KEY, ()):
+        append_transaction(account, trans)
+    return account
+
+def append_transaction(account: BankAccount, trans: dict):
+    account.transaction_history.append_record(
+        trans['type'], trans['amount'], trans['description'], trans['timestamp']
+    )
+
+def iter_json_snapshot(path: str, progress: Optional[Callable[[int, int], None]] = None,
+                       chunk_size: int = JSON_STREAM_CHUNK_SIZE) -> Iterator[Tuple[str, object]]:
+    # Streams the top-level object of a snapshot file. Elements of array
+    # values are yielded one at a time as (key, element); any other value is
+    # yielded once as (key, value). Only one chunk plus the record being
+    # decoded is held in memory.
+    decoder = json.JSONDecoder()
+    total = os.path.getsize(path)
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    with open(path, 'rb') as f:
+        buf = ''
+        pos = 0
+        read = 0
+        eof = False
+        
+        def fill():
+            nonlocal buf, pos, read, eof
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+                return False
+            read += len(chunk)
+            buf = buf[pos:] + utf8.decode(chunk)
+            pos = 0
+            if progress:
+                progress(read, total)
+            return True
+        
+        def skip_ws():
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos] in ' \t\r\n':
+                    pos += 1
+                if pos < len(buf) or not fill():
+                    return
+        
+        def expect(chars):
+            nonlocal pos
+            skip_ws()
+            if pos >= len(buf) or buf[pos] not in chars:
+                raise ValueError("Malformed snapshot file: expected one of %r" % chars)
+            pos += 1
+            return buf[pos - 1]
+        
+        def decode():
+            nonlocal pos
+            skip_ws()
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    if eof or not fill():
+                        raise
+                    continue
+                # A number may be cut off at the chunk boundary.
+                if end == len(buf) and not eof and fill():
+                    continue
+                pos = end
+                return value
+        
+        expect('{')
+        skip_ws()
+        if buf[pos:pos + 1] == '}':
+            return
+        while True:
+            key = decode()
+            expect(':')
+            skip_ws()
+            if buf[pos:pos + 1] == '[':
+                pos += 1
+                skip_ws()
+                if buf[pos:pos + 1] == ']':
+                    pos += 1
+                else:
+                    while True:
+                        yield key, decode()
+                        if expect(',]') == ']':
+                            break
+            else:
+                yield key, decode()
+            if expect(',}') == '}':
+                return
+
+class StorageBackend:
+    # When True, load() yields customers only and accounts are fetched on
+    # demand through load_account().
+    lazy_accounts = False
+    # Running total of bytes written by save() and commit(), where the
+    # backend can tell.
+    bytes_written = 0
+    # Set by load() when what it read should be rewritten in the current
+    # format; BankingSystem compacts once loading finishes.
+    needs_compaction = False
+    # Set when balances are stored as whole minor units; BankingSystem then
+    # rounds every amount and balance to them, so a reload gives back the
+    # balance it had in memory.
+    minor_units: Optional[int] = None
+    
+    def load(self, progress: Optional[Callable[[int, int], None]] = None) -> Iterator[dict]:
+        raise NotImplementedError
+    
+    def save(self, bank):
+        raise NotImplementedError
+    
+    def commit(self, bank, changes: List[dict]):
+        self.save(bank)
+    
+    def compact(self, bank):
+        self.save(bank)
+    
+    def attach_account(self, account: BankAccount):
+        # Called for every account the bank loads or creates.
+        pass
+    
+    def replay_transaction(self, account: BankAccount, change: dict):
+        append_transaction(account, change[CHANGE_TRANSACTION])
+    
+    def load_account(self, account_number: str) -> Optional[BankAccount]:
+        return None
+    
+    def iter_accounts(self) -> Iterator[BankAccount]:
+        return iter(())
+    
+    def account_count(self) -> int:
+        return 0
+    
+    def customer_account_numbers(self, customer_id: str) -> List[str]:
+        return []
+    
+    def account_numbers_by_balance(self, low: float, high: float) -> List[str]:
+        return []
+    
+    def top_account_numbers_by_balance(self, k: int) -> List[str]:
+        return []
+    
+    def count_accounts_by_balance(self, low: float, high: float) -> int:
+        return 0
+    
+    def close(self):
+        pass
+
+# Transaction histories live in a HistoryStore next to the snapshot (see
+# history_store.py), and the snapshot is a manifest of chunk files kept up
+# to date by a SnapshotWriter (see snapshots.py). With a journal every commit
+# is durable in the journal and snapshots, written in the background, only
+# bound its length; without one each commit writes the chunks it changed
+# before returning, as the single-file snapshot used to be rewritten.
+class JsonStorage(StorageBackend):
+    # MappedStorage keeps accounts in its own table instead.
+    snapshot_accounts = True
+    
+    def __init__(self, data_file: str = DATA_FILE_PATH, journal_file: Optional[str] = None,
+                 fsync_every: int = JOURNAL_FSYNC_EVERY,
+                 compact_every: int = JOURNAL_COMPACT_EVERY,
+                 history_file: Optional[str] = None,
+                 history_cache_size: int = HISTORY_CACHE_SIZE):
+        self.data_file = data_file
+        self.journal = Journal(journal_file, fsync_every) if journal_file else None
+        self.compact_every = compact_every
+        self.history = HistoryStore(history_file or history_path(data_file), history_cache_size)
+        self.snapshots = SnapshotWriter(data_file, self.journal, self._before_manifest, self._manifest_extra)
+        # Cross-shard transfer sides this shard took part in and has not been
+        # told to forget (see ShardWorker): transfer id -> record with the
+        # state and, while prepared, the account and amount. Kept in step
+        # with the journal under the commit lock and saved in the manifest,
+        # so a snapshot cannot drop it along with the journal.
+        self.transfers: Dict[str, dict] = {}
+        self.commit_bytes = 0
+        # Set when the data file is a single-file snapshot from before
+        # chunking; the first snapshot must then be a full one.
+        self.single_file = False
+    
+    @property
+    def bytes_written(self):
+        return self.commit_bytes + self.snapshots.bytes_written
+    
+    @property
+    def needs_compaction(self):
+        return self.history.rewritten > 0 or self.single_file
+    
+    def load(self, progress=None):
+        journal_seq = 0
+        if os.path.exists(self.data_file):
+            for key, value in iter_json_snapshot(self.data_file, progress):
+                if key == DATA_CHUNKS_KEY:
+                    self.snapshots.restore(value)
+                    yield from self._load_chunks(progress)
+                elif key in SNAPSHOT_KINDS:
+                    self.single_file = True
+                    yield self._snapshot_record(key, value)
+                elif key == DATA_JOURNAL_SEQ_KEY:
+                    journal_seq = value
+                elif key == DATA_TRANSFERS_KEY:
+                    self.transfers = value
+        
+        if self.journal:
+            for changes in self.journal.replay(journal_seq):
+                for change in changes:
+                    self._track_transfer(change)
+                yield from changes
+    
+    def _load_chunks(self, progress):
+        paths = [self.snapshots.chunk_file(chunks[chunk])
+                 for chunks in (self.snapshots.chunks[kind] for kind in SNAPSHOT_KINDS)
+                 for chunk in sorted(chunks, key=int)]
+        total = sum(os.path.getsize(path) for path in paths)
+        done = 0
+        for path in paths:
+            chunk_progress = None
+            if progress:
+                chunk_progress = lambda read, _, base=done: progress(base + read, total)
+            for key, value in iter_json_snapshot(path, chunk_progress):
+                yield self._snapshot_record(key, value)
+            done += os.path.getsize(path)
+    
+    def _snapshot_record(self, key, record):
+        if key == DATA_CUSTOMERS_KEY:
+            record[CHANGE_OP_KEY] = CHANGE_CUSTOMER
+            return record
+        return self._snapshot_account(record)
+    
+    def _snapshot_account(self, record):
+        if DATA_HISTORY_COUNT_KEY in record:
+            self.history.index[record[DATA_ACCOUNT_NUMBER_KEY]] = (
+                record.pop(DATA_HISTORY_OFFSET_KEY), record.pop(DATA_HISTORY_COUNT_KEY)
+            )
+        record[CHANGE_OP_KEY] = CHANGE_ACCOUNT
+        return record
+    
+    def _account_record(self, account):
+        record = account_record(account)
+        self._add_history_entry(record)
+        return record
+    
+    def _add_history_entry(self, record):
+        offset, count = self.history.entry(record[DATA_ACCOUNT_NUMBER_KEY])
+        if count:
+            record[DATA_HISTORY_OFFSET_KEY] = offset
+            record[DATA_HISTORY_COUNT_KEY] = count
+    
+    def _snapshot_records(self, bank):
+        accounts = {}
+        if self.snapshot_accounts:
+            accounts = {account.account_number: self._account_record(account)
+                        for account in bank.accounts.values()}
+        return {
+            DATA_CUSTOMERS_KEY: {customer.customer_id: customer_record(customer)
+                                 for customer in bank.customers.values()},
+            DATA_ACCOUNTS_KEY: accounts
+        }
+    
+    def _track(self, bank, change):
+        # Keeps the latest committed record of everything a commit changed
+        # for the next snapshot. Caller holds the snapshot lock.
+        self._track_transfer(change)
+        op = change[CHANGE_OP_KEY]
+        if op == CHANGE_TRANSFER:
+            return
+        if op == CHANGE_CUSTOMER:
+            self.snapshots.mark(DATA_CUSTOMERS_KEY, change[DATA_CUSTOMER_ID_KEY], {
+                DATA_CUSTOMER_ID_KEY: change[DATA_CUSTOMER_ID_KEY],
+                DATA_NAME_KEY: change[DATA_NAME_KEY],
+                DATA_PASSWORD_HASH_KEY: change[DATA_PASSWORD_HASH_KEY]
+            })
+            return
+        if not self.snapshot_accounts:
+            return
+        number = change[DATA_ACCOUNT_NUMBER_KEY]
+        record = self.snapshots.pending(DATA_ACCOUNTS_KEY, number)
+        if record is None:
+            if op == CHANGE_ACCOUNT:
+                customer_id = change[DATA_CUSTOMER_ID_KEY]
+            else:
+                customer_id = bank.accounts.get(number).customer_id
+            record = {DATA_ACCOUNT_NUMBER_KEY: number, DATA_CUSTOMER_ID_KEY: customer_id}
+            self.snapshots.mark(DATA_ACCOUNTS_KEY, number, record)
+        record[DATA_BALANCE_KEY] = change[DATA_BALANCE_KEY]
+        self._add_history_entry(record)
+    
+    def _track_transfer(self, change):
+        op = change[CHANGE_OP_KEY]
+        if op == CHANGE_TRANSACTION and CHANGE_TRANSFER_ID_KEY in change:
+            self.transfers[change[CHANGE_TRANSFER_ID_KEY]] = {TRANSFER_STATE_KEY: TRANSFER_APPLIED}
+        elif op == CHANGE_TRANSFER:
+            if change[TRANSFER_STATE_KEY] == TRANSFER_PREPARED:
+                self.transfers[change[CHANGE_TRANSFER_ID_KEY]] = {
+                    TRANSFER_STATE_KEY: TRANSFER_PREPARED,
+                    DATA_ACCOUNT_NUMBER_KEY: change[DATA_ACCOUNT_NUMBER_KEY],
+                    'amount': change['amount']
+                }
+            else:
+                self.transfers.pop(change[CHANGE_TRANSFER_ID_KEY], None)
+    
+    def _manifest_extra(self):
+        return {DATA_TRANSFERS_KEY: dict(self.transfers)} if self.transfers else {}
+    
+    def save(self, bank):
+        # A full snapshot, written before returning.
+        self.snapshots.write(lambda: self._snapshot_records(bank))
+    
+    def _before_manifest(self):
+        # The manifest is trusted without the journal's check, so every
+        # record it points at must be on disk first.
+        self.history.sync()
+    
+    def commit(self, bank, changes):
+        with self.snapshots.lock:
+            size = self.history.size
+            self.history.commit(changes)
+            self.commit_bytes += self.history.size - size
+            for change in changes:
+                self._track(bank, change)
+            if self.journal:
+                self.commit_bytes += self.journal.append(changes)
+        if not self.journal:
+            self.snapshots.write()
+        elif self.compact_every and self.journal.records >= self.compact_every:
+            self.snapshots.request()
+    
+    def compact(self, bank):
+        self.save(bank)
+        self.history.rewritten = 0
+        self.single_file = False
+    
+    def flush(self):
+        # Waits for a background snapshot in flight.
+        self.snapshots.wait()
+    
+    def attach_account(self, account):
+        self.history.attach(account)
+    
+    def replay_transaction(self, account, change):
+        self.history.replay(account, change)
+    
+    def close(self):
+        self.snapshots.wait()
+        if self.journal:
+            self.journal.close()
+        self.history.close()
+
+# JsonStorage with the accounts kept in a memory-mapped BalanceTable instead
+# of the snapshot. A commit rewrites a few bytes per changed account, cold
+# start maps the table instead of parsing every account, and accounts are
+# loaded on demand as with SQLiteStorage. Other processes can read balances
+# from the same pages through BalanceTable(path, readonly=True).
+class MappedStorage(JsonStorage):
+    lazy_accounts = True
+    snapshot_accounts = False
+    minor_units = LEDGER_MINOR_UNITS
+    
+    def __init__(self, data_file: str = DATA_FILE_PATH, journal_file: Optional[str] = None,
+                 balance_file: Optional[str] = None,
+                 msync_every: int = BALANCE_MSYNC_EVERY,
+                 fsync_every: int = JOURNAL_FSYNC_EVERY,
+                 compact_every: int = JOURNAL_COMPACT_EVERY,
+                 history_file: Optional[str] = None,
+                 history_cache_size: int = HISTORY_CACHE_SIZE):
+        super().__init__(data_file, journal_file, fsync_every, compact_every, history_file, history_cache_size)
+        self.table = BalanceTable(balance_file or balance_path(data_file), msync_every=msync_every)
+        self.history.index = TableHistoryIndex(self.table)
+        # Accounts read from a snapshot written before the table existed;
+        # the next snapshot leaves them out.
+        self.converted = 0
+    
+    @property
+    def needs_compaction(self):
+        return self.history.rewritten > 0 or self.converted > 0
+    
+    def load(self, progress=None):
+        for change in super().load(progress):
+            if change[CHANGE_OP_KEY] == CHANGE_TRANSACTION:
+                # The journal is the durable copy; the table may not have
+                # been msynced before a crash.
+                self.table.set_balance(change[DATA_ACCOUNT_NUMBER_KEY], change[DATA_BALANCE_KEY])
+            yield change
+    
+    def _snapshot_account(self, record):
+        self.converted += 1
+        return super()._snapshot_account(record)
+    
+    def _before_manifest(self):
+        self.table.sync()
+        super()._before_manifest()
+    
+    def commit(self, bank, changes):
+        for change in changes:
+            if change[CHANGE_OP_KEY] == CHANGE_TRANSACTION:
+                self.table.set_balance(change[DATA_ACCOUNT_NUMBER_KEY], change[DATA_BALANCE_KEY])
+                self.commit_bytes += RECORD.size
+        if self.journal:
+            self.table.committed()
+        else:
+            # Without a journal the table is the only durable copy of the
+            # balances, and the snapshot written by the commit has no
+            # account records to make it msync.
+            self.table.sync()
+        super().commit(bank, changes)
+    
+    def compact(self, bank):
+        super().compact(bank)
+        self.converted = 0
+    
+    def attach_account(self, account):
+        # New accounts get their row straight away, so account_count() and
+        # the next account number do not wait for a write-behind commit.
+        self.table.put(account.account_number, account.customer_id, account.balance)
+        super().attach_account(account)
+    
+    def load_account(self, account_number):
+        record = self.table.read(account_number)
+        if record is None:
+            return None
+        return self._account(account_number, record[0], record[1])
+    
+    def iter_accounts(self):
+        for account_number, customer_id, balance in self.table.scan():
+            yield self._account(account_number, customer_id, balance)
+    
+    def account_count(self):
+        return self.table.accounts
+    
+    def customer_account_numbers(self, customer_id):
+        return self.table.customer_account_numbers(customer_id)
+    
+    def account_numbers_by_balance(self, low, high):
+        matches = [(balance, number) for number, _, balance in self.table.scan() if low <= balance <= high]
+        return [number for _, number in sorted(matches)]
+    
+    def top_account_numbers_by_balance(self, k):
+        top = heapq.nlargest(k, self.table.scan(), key=lambda row: row[2])
+        return [number for number, _, _ in top]
+    
+    def count_accounts_by_balance(self, low, high):
+        return sum(1 for _, _, balance in self.table.scan() if low <= balance <= high)
+    
+    def close(self):
+        super().close()
+        self.table.close()
+    
+    def _account(self, account_number, customer_id, balance):
+        account = BankAccount(account_number, customer_id)
+        account.balance = balance
+        self.history.attach(account)
+        return account
+
+class SQLiteStorage(StorageBackend):
+    lazy_accounts = True
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS customers (
+            customer_id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            password_hash TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS accounts (
+            account_number TEXT PRIMARY KEY,
+            customer_id TEXT NOT NULL REFERENCES customers(customer_id),
+            balance REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS accounts_by_customer ON accounts(customer_id);
+        CREATE INDEX IF NOT EXISTS accounts_by_balance ON accounts(balance);
+        CREATE TABLE IF NOT EXISTS transactions (
+            id INTEGER PRIMARY KEY,
+            account_number TEXT NOT NULL REFERENCES accounts(account_number),
+            type TEXT NOT NULL,
+            amount REAL NOT NULL,
+            description TEXT NOT NULL,
+            timestamp TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS transactions_by_account ON transactions(account_number, id);
+    """
+    
+    # Statements are kept as constants so sqlite3's statement cache reuses
+    # the prepared form on every call.
+    INSERT_CUSTOMER = "INSERT OR REPLACE INTO customers VALUES (?, ?, ?)"
+    INSERT_ACCOUNT = "INSERT OR REPLACE INTO accounts VALUES (?, ?, ?)"
+    UPDATE_BALANCE = "UPDATE accounts SET balance = ? WHERE account_number = ?"
+    INSERT_TRANSACTION = ("INSERT INTO transactions (account_number, type, amount, description, timestamp) "
+                          "VALUES (?, ?, ?, ?, ?)")
+    DELETE_HISTORY = "DELETE FROM transactions WHERE account_number = ?"
+    SELECT_CUSTOMERS = "SELECT customer_id, name, password_hash FROM customers"
+    SELECT_ACCOUNT = "SELECT account_number, customer_id, balance FROM accounts WHERE account_number = ?"
+    SELECT_ACCOUNTS = "SELECT account_number, customer_id, balance FROM accounts"
+    SELECT_HISTORY = ("SELECT type, amount, description, timestamp FROM transactions "
+                      "WHERE account_number = ? ORDER BY id")
+    SELECT_CUSTOMER_ACCOUNTS = "SELECT account_number FROM accounts WHERE customer_id = ? ORDER BY account_number"
+    SELECT_BY_BALANCE = "SELECT account_number FROM accounts WHERE balance BETWEEN ? AND ? ORDER BY balance"
+    SELECT_TOP_BY_BALANCE = "SELECT account_number FROM accounts ORDER BY balance DESC LIMIT ?"
+    COUNT_BY_BALANCE = "SELECT COUNT(*) FROM accounts WHERE balance BETWEEN ? AND ?"
+    COUNT_ACCOUNTS = "SELECT COUNT(*) FROM accounts"
+    
+    def __init__(self, db_file: str = SQLITE_FILE_PATH):
+        self.db_file = db_file
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+        self.history = SQLiteHistory(self)
+        self._account_count = self.conn.execute(self.COUNT_ACCOUNTS).fetchone()[0]
+    
+    def load(self, progress=None):
+        for customer_id, name, password_hash in self.conn.execute(self.SELECT_CUSTOMERS):
+            yield {
+                CHANGE_OP_KEY: CHANGE_CUSTOMER,
+                DATA_CUSTOMER_ID_KEY: customer_id,
+                DATA_NAME_KEY: name,
+                DATA_PASSWORD_HASH_KEY: password_hash
+            }
+    
+    def save(self, bank):
+        with self.conn:
+            self.conn.executemany(self.INSERT_CUSTOMER, (
+                (c.customer_id, c.name, c.password_hash) for c in bank.customers.values()
+            ))
+            for account in bank.accounts.values():
+                self._insert_account(account)
+                if account.resident_history is None:
+                    # Never loaded, so the rows in the table are current.
+                    continue
+                self.conn.execute(self.DELETE_HISTORY, (account.account_number,))
+                self.conn.executemany(self.INSERT_TRANSACTION, (
+                    (account.account_number,) + tuple(trans) for trans in account.transaction_history
+                ))
+        # Accounts attached but not yet committed keep their numbers.
+        self._account_count = max(self._account_count, self.conn.execute(self.COUNT_ACCOUNTS).fetchone()[0])
+    
+    def commit(self, bank, changes):
+        with self.conn:
+            for change in changes:
+                op = change[CHANGE_OP_KEY]
+                if op == CHANGE_CUSTOMER:
+                    self.conn.execute(self.INSERT_CUSTOMER, (
+                        change[DATA_CUSTOMER_ID_KEY],
+                        change[DATA_NAME_KEY],
+                        change[DATA_PASSWORD_HASH_KEY]
+                    ))
+                elif op == CHANGE_ACCOUNT:
+                    self.conn.execute(self.INSERT_ACCOUNT, (
+                        change[DATA_ACCOUNT_NUMBER_KEY],
+                        change[DATA_CUSTOMER_ID_KEY],
+                        change[DATA_BALANCE_KEY]
+                    ))
+                elif op == CHANGE_TRANSACTION:
+                    trans = change[CHANGE_TRANSACTION]
+                    self.conn.execute(self.UPDATE_BALANCE, (
+                        change[DATA_BALANCE_KEY],
+                        change[DATA_ACCOUNT_NUMBER_KEY]
+                    ))
+                    self.conn.execute(self.INSERT_TRANSACTION, (
+                        change[DATA_ACCOUNT_NUMBER_KEY], trans['type'], trans['amount'],
+                        trans['description'], trans['timestamp']
+                    ))
+    
+    def attach_account(self, account):
+        # Only called for new accounts, as load() yields no accounts. The
+        # number is counted straight away, so the next account number does
+        # not wait for a write-behind commit.
+        self._account_count += 1
+    
+    def load_account(self, account_number):
+        row = self.conn.execute(self.SELECT_ACCOUNT, (account_number,)).fetchone()
+        if row is None:
+            return None
+        account = self._account_from_row(row)
+        account.history_source = self.history
+        account.resident_history = None
+        return account
+    
+    def iter_accounts(self):
+        for row in self.conn.execute(self.SELECT_ACCOUNTS):
+            yield self.load_account(row[0])
+    
+    def account_count(self):
+        return self._account_count
+    
+    def customer_account_numbers(self, customer_id):
+        return [row[0] for row in self.conn.execute(self.SELECT_CUSTOMER_ACCOUNTS, (customer_id,))]
+    
+    def account_numbers_by_balance(self, low, high):
+        return [row[0] for row in self.conn.execute(self.SELECT_BY_BALANCE, (low, high))]
+    
+    def top_account_numbers_by_balance(self, k):
+        return [row[0] for row in self.conn.execute(self.SELECT_TOP_BY_BALANCE, (k,))]
+    
+    def count_accounts_by_balance(self, low, high):
+        return self.conn.execute(self.COUNT_BY_BALANCE, (low, high)).fetchone()[0]
+    
+    def close(self):
+        self.conn.close()
+    
+    def _insert_account(self, account):
+        self.conn.execute(self.INSERT_ACCOUNT, (
+            account.account_number, account.customer_id, account.balance
+        ))
+    
+    def _account_from_row(self, row):
+        account = BankAccount(row[0], row[1])
+        account.balance = row[2]
+        return account
+
+# Reads an account's rows the first time its history is touched. The
+# account cache already bounds how many accounts, and so histories, stay
+# resident.
+class SQLiteHistory:
+    def __init__(self, storage: SQLiteStorage):
+        self.storage = storage
+        self._lock = threading.Lock()
+    
+    def load(self, account):
+        with self._lock:
+            if account.resident_history is None:
+                history = TransactionHistory()
+                for row in self.storage.conn.execute(self.storage.SELECT_HISTORY, (account.account_number,)):
+                    history.append_record(*row)
+                account.resident_history = history
+            return account.resident_history
+    
+    def touch(self, account):
+        pass
+
+# LRU-bounded view of the accounts held by a lazy storage backend. It offers
+# the same interface as HashMap so BankingSystem can use it as self.accounts.
+# Without write-behind every mutation is committed to storage immediately.
+# With it (see ConcurrentExecutor), accounts are pinned from the start of an
+# operation until its commit has reached storage: evicting one earlier would
+# let the next get reload an older copy. Worker threads share the cache, so
+# it is guarded by a lock, and loads happen under it too, so an account is
+# never read from storage while a newer copy is being put in the cache.
+class AccountCache:
+    def __init__(self, storage: StorageBackend, capacity: int = ACCOUNT_CACHE_SIZE):
+        self.storage = storage
+        self.capacity = capacity
+        self.cache = OrderedDict()
+        self.pinned = {}
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        with self._lock:
+            account = self.cache.get(key)
+            if account is not None:
+                self.cache.move_to_end(key)
+                return account
+            account = self.storage.load_account(key)
+            if account is not None:
+                self._add(key, account)
+            return account
+    
+    def add(self, key, value):
+        with self._lock:
+            self._add(key, value)
+    
+    def remove(self, key):
+        with self._lock:
+            self.pinned.pop(key, None)
+            return self.cache.pop(key, None)
+    
+    def peek(self, key):
+        # Like get, but an account read from storage is not cached.
+        with self._lock:
+            account = self.cache.get(key)
+            return account if account is not None else self.storage.load_account(key)
+    
+    def pin(self, keys):
+        # Loads the accounts if needed and keeps them resident until unpinned
+        # as many times.
+        with self._lock:
+            for key in keys:
+                if key not in self.cache:
+                    account = self.storage.load_account(key)
+                    if account is None:
+                        continue
+                    self._add(key, account)
+                self.pinned[key] = self.pinned.get(key, 0) + 1
+    
+    def unpin(self, keys):
+        with self._lock:
+            for key in keys:
+                count = self.pinned.get(key)
+                if count is None:
+                    continue
+                if count > 1:
+                    self.pinned[key] = count - 1
+                else:
+                    del self.pinned[key]
+            self._evict()
+    
+    def _add(self, key, value):
+        self.cache[key] = value
+        self.cache.move_to_end(key)
+        self._evict()
+    
+    def _evict(self):
+        # Oldest unpinned accounts first; while everything is pinned the
+        # cache runs over capacity rather than drop unsaved state.
+        excess = len(self.cache) - self.capacity
+        if excess <= 0:
+            return
+        victims = list(islice((key for key in self.cache if key not in self.pinned), excess))
+        for key in victims:
+            del self.cache[key]
+    
+    def items(self):
+        # Walks storage without populating the cache, so a full scan does not
+        # evict the working set.
+        for account in self.storage.iter_accounts():
+            with self._lock:
+                resident = self.cache.get(account.account_number)
+            account = resident if resident is not None else account
+            yield account.account_number, account
+    
+    def keys(self):
+        for key, _ in self.items():
+            yield key
+    
+    def values(self):
+        for _, value in self.items():
+            yield value
+    
+    def __contains__(self, key):
+        return self.get(key) is not None
+    
+    def __iter__(self):
+        return self.keys()
+    
+    def __len__(self):
+        return self.storage.account_count()
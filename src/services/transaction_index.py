@@ -0,0 +1,138 @@
+import threading
+from array import array
+from datetime import datetime, timedelta
+from heapq import merge
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from src.core.data_structures import TransactionHistory, TransactionRecord
+
+Timestamp = Union[datetime, str, None]
+
+def to_micros(value: Timestamp) -> Optional[int]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return (value - TransactionHistory.EPOCH) // timedelta(microseconds=1)
+
+# Every account's transactions in one columnar store, for searches across
+# accounts. Records are numbered in the order they were added; by_time, and
+# a posting list per transaction type and per account, hold record numbers
+# ordered by timestamp, so a time window is two binary searches on any of
+# them. A search walks whichever list has the fewest records in the window
+# and filters the rest, so its cost follows the size of the answer rather
+# than of the whole history. BankingSystem adds each transaction as it is
+# recorded.
+class TransactionIndex:
+    def __init__(self):
+        self.records = TransactionHistory()
+        self.accounts = array('I')
+        self.account_numbers: List[str] = []
+        self.account_codes: Dict[str, int] = {}
+        self.by_time = array('I')
+        self.by_type: Dict[int, array] = {}
+        self.by_account: Dict[int, array] = {}
+        self._lock = threading.Lock()
+    
+    def build(self, accounts: Iterable):
+        with self._lock:
+            for account in accounts:
+                history = account.transaction_history
+                for position in range(len(history)):
+                    self._append(account.account_number, history, position)
+            timestamps = self.records.timestamps
+            self.by_time = array('I', sorted(range(len(timestamps)), key=timestamps.__getitem__))
+            self.by_type = {}
+            self.by_account = {}
+            for record in self.by_time:
+                self.by_type.setdefault(self.records.types[record], array('I')).append(record)
+                self.by_account.setdefault(self.accounts[record], array('I')).append(record)
+    
+    def add(self, account_number: str, history: TransactionHistory):
+        # Indexes the newest record of an account's history.
+        with self._lock:
+            record = self._append(account_number, history, len(history) - 1)
+            self._insert(self.by_time, record)
+            self._insert(self.by_type.setdefault(self.records.types[record], array('I')), record)
+            self._insert(self.by_account.setdefault(self.accounts[record], array('I')), record)
+    
+    def search(self, start: Timestamp = None, end: Timestamp = None,
+               types: Optional[Iterable[str]] = None,
+               account_numbers: Optional[Iterable[str]] = None,
+               min_amount: Optional[float] = None, max_amount: Optional[float] = None,
+               newest_first: bool = False) -> Iterator[Tuple[str, TransactionRecord]]:
+        # Yields (account number, record) for transactions from start to end
+        # inclusive. Amounts are compared by size, so a withdrawal of 500
+        # (stored as -500) matches min_amount=100.
+        low = to_micros(start)
+        high = to_micros(end)
+        type_codes = account_codes = None
+        sources = [[self.by_time]]
+        with self._lock:
+            if types is not None:
+                type_codes = {TransactionHistory.type_codes.get(name) for name in types}
+                sources.append([self.by_type[code] for code in type_codes if code in self.by_type])
+            if account_numbers is not None:
+                account_codes = {self.account_codes.get(number) for number in account_numbers}
+                sources.append([self.by_account[code] for code in account_codes if code in self.by_account])
+            windows = [[(ids, self._window(ids, low, high)) for ids in lists] for lists in sources]
+            best = min(windows, key=lambda lists: sum(hi - lo for _, (lo, hi) in lists))
+            # Copied so records added while the caller iterates do not shift it.
+            lists = [ids[lo:hi] for ids, (lo, hi) in best]
+        
+        timestamps = self.records.timestamps
+        if newest_first:
+            lists = [reversed(ids) for ids in lists]
+        records = lists[0] if len(lists) == 1 else merge(*lists, key=timestamps.__getitem__,
+                                                         reverse=newest_first)
+        for record in records:
+            if type_codes is not None and self.records.types[record] not in type_codes:
+                continue
+            if account_codes is not None and self.accounts[record] not in account_codes:
+                continue
+            amount = abs(self.records.amounts[record])
+            if (min_amount is not None and amount < min_amount) or (max_amount is not None and amount > max_amount):
+                continue
+            yield self.account_numbers[self.accounts[record]], self.records.record(record)
+    
+    def __len__(self):
+        return len(self.records)
+    
+    def _append(self, account_number, history, position):
+        code = self.account_codes.get(account_number)
+        if code is None:
+            code = self.account_codes[account_number] = len(self.account_numbers)
+            self.account_numbers.append(account_number)
+        records = self.records
+        records.types.append(history.types[position])
+        records.amounts.append(history.amounts[position])
+        records.timestamps.append(history.timestamps[position])
+        records.templates.append(history.templates[position])
+        records.refs.append(history.refs[position])
+        self.accounts.append(code)
+        return len(records) - 1
+    
+    def _insert(self, ids, record):
+        # Transactions on different threads can be recorded slightly out of
+        # timestamp order; those go in at their place near the end.
+        timestamp = self.records.timestamps[record]
+        if not ids or self.records.timestamps[ids[-1]] <= timestamp:
+            ids.append(record)
+        else:
+            ids.insert(self._bisect(ids, timestamp, True), record)
+    
+    def _window(self, ids, low, high):
+        lo = 0 if low is None else self._bisect(ids, low, False)
+        hi = len(ids) if high is None else self._bisect(ids, high, True)
+        return lo, max(lo, hi)
+    
+    def _bisect(self, ids, timestamp, right):
+        timestamps = self.records.timestamps
+        lo, hi = 0, len(ids)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            value = timestamps[ids[mid]]
+            if value < timestamp or (right and value == timestamp):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
@@ -1,6 +1,10 @@
+import threading
 import tkinter as tk
 from tkinter import ttk, messagebox
 from src.services.banking_system import BankingSystem
+from src.services.events import AccountCreated, BalanceChanged
+from src.ui.virtual_list import VirtualList
+from src.ui.worker import BackgroundWorker
 from src.core.constants import *
 
 class BankingApp:
@@ -8,7 +12,8 @@ class BankingApp:
         self.root = root
         self.root.title(APP_TITLE)
         self.root.geometry("800x600")
-        self.bank = BankingSystem()
+        self.load_fraction = 0.0
+        self.bank = BankingSystem(background_load=True, progress=self.on_load_progress)
         
         # Configure style
         style = ttk.Style()
@@ -16,8 +21,38 @@ class BankingApp:
         style.configure("TLabel", padding=6, font=('Helvetica', 10))
         style.configure("TEntry", padding=6)
         
+        # Survives clear_window so progress shows on every screen.
+        self.status_frame = ttk.Frame(self.root)
+        self.status_label = ttk.Label(self.status_frame)
+        self.status_bar = ttk.Progressbar(self.status_frame, mode="indeterminate", length=150)
+        self.worker = BackgroundWorker(self.root, self.set_busy)
+        self.action_buttons = []
+        
+        # Accounts whose rows need redrawing, filled by on_bank_event from
+        # whichever thread made the change and drained on the Tk thread. The
+        # balances are read on the worker as they are then, rather than as
+        # the event saw them, so events handled out of order cannot leave a
+        # stale row, and a lazy backend going to disk does not block Tk.
+        self.account_list = None
+        self.dashboard_customer_id = None
+        self.dirty_accounts = set()
+        self.dirty_lock = threading.Lock()
+        self.bank.events.subscribe(self.on_bank_event, (AccountCreated, BalanceChanged))
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        
         self.setup_welcome_screen()
     
+    def set_busy(self, busy):
+        if busy:
+            self.status_frame.pack(side="bottom", fill="x", padx=20, pady=5)
+            self.status_label.config(text=BUSY_MESSAGE)
+            self.status_label.pack(side="left")
+            self.status_bar.pack(side="right")
+            self.status_bar.start()
+        else:
+            self.status_bar.stop()
+            self.status_frame.pack_forget()
+    
     def setup_welcome_screen(self):
         self.clear_window()
         
@@ -31,6 +66,28 @@ class BankingApp:
                   command=self.show_login).pack(fill="x", pady=5)
         ttk.Button(welcome_frame, text=REGISTER_BUTTON, 
                   command=self.show_register).pack(fill="x", pady=5)
+        
+        if not self.bank.loaded.is_set():
+            loading_label = ttk.Label(welcome_frame)
+            loading_label.pack(pady=5)
+            loading_bar = ttk.Progressbar(welcome_frame, maximum=1.0)
+            loading_bar.pack(fill="x")
+            self.poll_loading(loading_label, loading_bar)
+    
+    def on_load_progress(self, read, total):
+        # Called from the loader thread; the Tk side polls this value.
+        self.load_fraction = read / total if total else 1.0
+    
+    def poll_loading(self, label, bar):
+        if not label.winfo_exists():
+            return
+        if self.bank.loaded.is_set():
+            label.destroy()
+            bar.destroy()
+            return
+        label.config(text=LOADING_FORMAT.format(self.load_fraction))
+        bar['value'] = self.load_fraction
+        self.root.after(100, self.poll_loading, label, bar)
     
     def show_login(self):
         self.clear_window()
@@ -50,15 +107,20 @@ class BankingApp:
         password_entry.pack(pady=5)
         
         def do_login():
-            customer_id = customer_id_entry.get()
-            password = password_entry.get()
-            if self.bank.login(customer_id, password):
+            self.worker.submit(self.bank.login, customer_id_entry.get(), password_entry.get(),
+                               on_done=on_login, widgets=(login_button,))
+        
+        def on_login(success):
+            if not login_frame.winfo_exists():
+                return
+            if success:
                 self.show_dashboard()
             else:
                 messagebox.showerror(ERROR_TITLE, LOGIN_ERROR)
         
-        ttk.Button(login_frame, text=LOGIN_BUTTON, 
-                  command=do_login).pack(fill="x", pady=10)
+        login_button = ttk.Button(login_frame, text=LOGIN_BUTTON, 
+                                  command=do_login)
+        login_button.pack(fill="x", pady=10)
         ttk.Button(login_frame, text=BACK_BUTTON, 
                   command=self.setup_welcome_screen).pack(fill="x")
     
@@ -80,14 +142,17 @@ class BankingApp:
         password_entry.pack(pady=5)
         
         def do_register():
-            name = name_entry.get()
-            password = password_entry.get()
-            result = self.bank.register_customer(name, password)
+            self.worker.submit(self.bank.register_customer, name_entry.get(), password_entry.get(),
+                               on_done=on_register, widgets=(register_button,))
+        
+        def on_register(result):
             messagebox.showinfo(SUCCESS_TITLE, result)
-            self.show_login()
+            if register_frame.winfo_exists():
+                self.show_login()
         
-        ttk.Button(register_frame, text=REGISTER_BUTTON, 
-                  command=do_register).pack(fill="x", pady=10)
+        register_button = ttk.Button(register_frame, text=REGISTER_BUTTON, 
+                                     command=do_register)
+        register_button.pack(fill="x", pady=10)
         ttk.Button(register_frame, text=BACK_BUTTON, 
                   command=self.setup_welcome_screen).pack(fill="x")
     
@@ -110,41 +175,76 @@ class BankingApp:
         accounts_frame = ttk.LabelFrame(content_frame, text="حساب‌های شما", padding="10")
         accounts_frame.pack(fill="x", pady=10)
         
-        account_numbers = []
-        for bucket in self.bank.current_customer.accounts.table:
-            for item in bucket:
-                if item:
-                    account_numbers.append(item[0])
+        # Built once per login; afterwards only rows whose accounts changed
+        # are redrawn.
+        account_list = VirtualList(accounts_frame, ("account", "balance"),
+                                   (ACCOUNT_COLUMN, BALANCE_COLUMN), DASHBOARD_ROWS)
+        account_list.pack(fill="x")
+        self.account_list = account_list
+        self.dashboard_customer_id = self.bank.current_customer.customer_id
         
-        for account_number in account_numbers:
-            account_frame = ttk.Frame(accounts_frame)
-            account_frame.pack(fill="x", pady=5)
-            
-            ttk.Label(account_frame, 
-                     text=ACCOUNT_INFO_FORMAT.format(account_number)).pack(side="left")
-            ttk.Label(account_frame, 
-                     text=BALANCE_INFO_FORMAT.format(
-                         self.bank.accounts.get(account_number).balance
-                     )).pack(side="right")
+        # Balances may come from disk with a lazy backend, so they are read
+        # on the worker.
+        def render_accounts(rows):
+            if account_list.winfo_exists():
+                account_list.set_rows(rows)
+                self.flush_account_changes(account_list)
+        
+        self.worker.submit(self.account_rows, self.bank.current_customer,
+                           on_done=render_accounts, key="dashboard")
         
         actions_frame = ttk.Frame(content_frame)
         actions_frame.pack(fill="x", pady=20)
         
-        ttk.Button(actions_frame, text=CREATE_ACCOUNT_BUTTON, 
-                  command=self.create_account).pack(fill="x", pady=5)
-        ttk.Button(actions_frame, text=DEPOSIT_BUTTON, 
-                  command=self.show_deposit).pack(fill="x", pady=5)
-        ttk.Button(actions_frame, text=WITHDRAW_BUTTON, 
-                  command=self.show_withdraw).pack(fill="x", pady=5)
-        ttk.Button(actions_frame, text=TRANSFER_BUTTON, 
-                  command=self.show_transfer).pack(fill="x", pady=5)
-        ttk.Button(actions_frame, text=TRANSACTION_HISTORY_BUTTON, 
-                  command=self.show_transaction_history).pack(fill="x", pady=5)
+        self.action_buttons = []
+        for text, command in ((CREATE_ACCOUNT_BUTTON, self.create_account),
+                              (DEPOSIT_BUTTON, self.show_deposit),
+                              (WITHDRAW_BUTTON, self.show_withdraw),
+                              (TRANSFER_BUTTON, self.show_transfer),
+                              (TRANSACTION_HISTORY_BUTTON, self.show_transaction_history)):
+            button = ttk.Button(actions_frame, text=text, command=command)
+            button.pack(fill="x", pady=5)
+            self.action_buttons.append(button)
+    
+    def account_rows(self, customer):
+        return self.balance_rows(sorted(self.bank.customer_account_numbers(customer)))
+    
+    def balance_rows(self, account_numbers):
+        rows = []
+        for account_number in account_numbers:
+            account = self.bank.accounts.get(account_number)
+            if account is not None:
+                rows.append((account_number, self.account_row(account_number, account.balance)))
+        return rows
+    
+    def account_row(self, account_number, balance):
+        return (account_number, BALANCE_CELL_FORMAT.format(balance))
+    
+    def on_bank_event(self, event):
+        if event.customer_id == self.dashboard_customer_id:
+            with self.dirty_lock:
+                self.dirty_accounts.add(event.account_number)
+    
+    def flush_account_changes(self, account_list):
+        if not account_list.winfo_exists():
+            return
+        with self.dirty_lock:
+            dirty, self.dirty_accounts = self.dirty_accounts, set()
+        
+        def update_rows(rows):
+            if account_list.winfo_exists():
+                for account_number, row in rows:
+                    account_list.update_row(account_number, row)
+        
+        if dirty:
+            self.worker.submit(self.balance_rows, dirty, on_done=update_rows)
+        self.root.after(GUI_POLL_INTERVAL, self.flush_account_changes, account_list)
     
     def create_account(self):
-        result = self.bank.create_account()
-        messagebox.showinfo(SUCCESS_TITLE, result)
-        self.show_dashboard()
+        def on_created(result):
+            messagebox.showinfo(SUCCESS_TITLE, result)
+        
+        self.worker.submit(self.bank.create_account, on_done=on_created, widgets=self.action_buttons)
     
     def show_deposit(self):
         self.show_transaction_dialog(DEPOSIT_BUTTON, self.do_deposit)
@@ -158,11 +258,7 @@ class BankingApp:
         dialog.geometry("300x200")
         
         ttk.Label(dialog, text=FROM_ACCOUNT_LABEL).pack(pady=5)
-        account_numbers = []
-        for bucket in self.bank.current_customer.accounts.table:
-            for item in bucket:
-                if item:
-                    account_numbers.append(item[0])
+        account_numbers = self.bank.customer_account_numbers()
         from_account = ttk.Combobox(dialog, values=account_numbers)
         from_account.pack(pady=5)
         
@@ -175,14 +271,18 @@ class BankingApp:
         amount.pack(pady=5)
         
         def do_transfer():
-            result = self.bank.transfer(from_account.get(), to_account.get(), 
-                                      float(amount.get()))
+            self.worker.submit(self.bank.transfer, from_account.get(), to_account.get(),
+                               float(amount.get()), on_done=on_transfer,
+                               widgets=[transfer_button] + self.action_buttons)
+        
+        def on_transfer(result):
             messagebox.showinfo(SUCCESS_TITLE, result)
-            dialog.destroy()
-            self.show_dashboard()
+            if dialog.winfo_exists():
+                dialog.destroy()
         
-        ttk.Button(dialog, text=TRANSFER_BUTTON, 
-                  command=do_transfer).pack(pady=10)
+        transfer_button = ttk.Button(dialog, text=TRANSFER_BUTTON, 
+                                     command=do_transfer)
+        transfer_button.pack(pady=10)
     
     def show_transaction_dialog(self, title, callback):
         dialog = tk.Toplevel(self.root)
@@ -190,11 +290,7 @@ class BankingApp:
         dialog.geometry("300x150")
         
         ttk.Label(dialog, text=ACCOUNT_LABEL).pack(pady=5)
-        account_numbers = []
-        for bucket in self.bank.current_customer.accounts.table:
-            for item in bucket:
-                if item:
-                    account_numbers.append(item[0])
+        account_numbers = self.bank.customer_account_numbers()
         account = ttk.Combobox(dialog, values=account_numbers)
         account.pack(pady=5)
         
@@ -203,13 +299,17 @@ class BankingApp:
         amount.pack(pady=5)
         
         def do_action():
-            result = callback(account.get(), float(amount.get()))
+            self.worker.submit(callback, account.get(), float(amount.get()), on_done=on_action,
+                               widgets=[action_button] + self.action_buttons)
+        
+        def on_action(result):
             messagebox.showinfo(title, result)
-            dialog.destroy()
-            self.show_dashboard()
+            if dialog.winfo_exists():
+                dialog.destroy()
         
-        ttk.Button(dialog, text=title, 
-                  command=do_action).pack(pady=10)
+        action_button = ttk.Button(dialog, text=title, 
+                                   command=do_action)
+        action_button.pack(pady=10)
     
     def do_deposit(self, account, amount):
         return self.bank.deposit(account, amount)
@@ -223,29 +323,81 @@ class BankingApp:
         dialog.geometry("600x400")
         
         ttk.Label(dialog, text=SELECT_ACCOUNT_LABEL).pack(pady=5)
-        account_numbers = []
-        for bucket in self.bank.current_customer.accounts.table:
-            for item in bucket:
-                if item:
-                    account_numbers.append(item[0])
+        account_numbers = self.bank.customer_account_numbers()
         account = ttk.Combobox(dialog, values=account_numbers)
         account.pack(pady=5)
         
-        history_text = tk.Text(dialog, height=15, width=60)
-        history_text.pack(pady=10, padx=10)
+        history_frame = ttk.Frame(dialog)
+        history_frame.pack(pady=10, padx=10)
+        history_text = tk.Text(history_frame, height=15, width=60)
+        history_scrollbar = ttk.Scrollbar(history_frame, command=history_text.yview)
+        history_text.pack(side="left")
+        history_scrollbar.pack(side="right", fill="y")
+        
+        # Pages are fetched newest first and appended as the user scrolls
+        # near the end of what has been loaded so far.
+        # The generation changes whenever a new account is shown, so a page
+        # still in flight for the previous one is dropped.
+        paging = {'account': None, 'cursor': None, 'done': True, 'generation': 0}
+        
+        def load_page():
+            generation = paging['generation']
+            self.worker.submit(self.bank.get_transaction_page, paging['account'], 0, paging['cursor'],
+                               on_done=lambda page: show_page(page, generation), key=history_text)
+        
+        def show_page(page, generation):
+            if generation != paging['generation'] or not history_text.winfo_exists():
+                return
+            if isinstance(page, str):
+                history_text.insert(tk.END, page + "\n")
+                paging['done'] = True
+                return
+            lines = [TRANSACTION_FORMAT.format(trans.timestamp, trans.type,
+                                               trans.amount, trans.description)
+                     for trans in page.records]
+            if lines:
+                history_text.insert(tk.END, "\n".join(lines) + "\n")
+            paging['cursor'] = page.next_cursor
+            paging['done'] = page.next_cursor is None
+        
+        def on_scroll(first, last):
+            history_scrollbar.set(first, last)
+            if not paging['done'] and float(last) >= 0.9:
+                paging['done'] = True
+                dialog.after_idle(load_page)
+        
+        history_text.config(yscrollcommand=on_scroll)
         
         def show_history():
-            history = self.bank.get_transaction_history(account.get())
             history_text.delete(1.0, tk.END)
-            history_text.insert(tk.END, history)
+            history_text.insert(tk.END, TRANSACTION_HISTORY_TITLE + "\n")
+            paging['account'] = account.get()
+            paging['cursor'] = None
+            paging['generation'] += 1
+            load_page()
         
         ttk.Button(dialog, text=SHOW_HISTORY_BUTTON, 
                   command=show_history).pack(pady=5)
     
     def logout(self):
-        self.bank.current_customer = None
+        # Jobs already queued still run as the customer who submitted them,
+        # so the customer is only cleared on the worker after them; their
+        # results are for screens that are gone and are dropped.
+        self.worker.forget()
+        self.worker.submit(self.clear_customer)
+        self.dashboard_customer_id = None
+        self.account_list = None
         self.setup_welcome_screen()
     
+    def clear_customer(self):
+        self.bank.current_customer = None
+    
+    def on_close(self):
+        self.worker.shutdown()
+        self.bank.close()
+        self.root.destroy()
+    
     def clear_window(self):
         for widget in self.root.winfo_children():
-            widget.destroy() 
\ No newline at end of file
+            if widget is not self.status_frame:
+                widget.destroy() 
\ No newline at end of file
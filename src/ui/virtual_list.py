@@ -0,0 +1,79 @@
+from tkinter import ttk
+from typing import Dict, Hashable, List, Sequence
+
+# A Treeview that only ever holds the rows currently on screen. The full
+# data lives in keys/values; scrolling moves a window over it and re-inserts
+# at most `height` items, so the cost of showing a list does not grow with
+# its length.
+class VirtualList(ttk.Frame):
+    def __init__(self, master, columns: Sequence[str], headings: Sequence[str], height: int = 15):
+        super().__init__(master)
+        self.height = height
+        self.keys: List[Hashable] = []
+        self.values: Dict[Hashable, tuple] = {}
+        self.offset = 0
+        self.tree = ttk.Treeview(self, columns=columns, show="headings", height=height,
+                                 selectmode="browse")
+        for column, heading in zip(columns, headings):
+            self.tree.heading(column, text=heading)
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.on_scrollbar)
+        self.tree.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.tree.bind(sequence, self.on_wheel)
+    
+    def set_rows(self, rows):
+        self.keys = [key for key, _ in rows]
+        self.values = dict(rows)
+        self.offset = 0
+        self.render()
+    
+    def update_row(self, key, values: tuple):
+        # Rows off screen only update the stored values.
+        if key not in self.values:
+            self.keys.append(key)
+            self.values[key] = values
+            if len(self.keys) - self.offset <= self.height:
+                self.render()
+            else:
+                self._update_scrollbar()
+            return
+        self.values[key] = values
+        if self.tree.exists(key):
+            self.tree.item(key, values=values)
+    
+    def selection(self):
+        return self.tree.selection()
+    
+    def scroll_to(self, offset: int):
+        offset = max(0, min(offset, len(self.keys) - self.height))
+        if offset != self.offset:
+            self.offset = offset
+            self.render()
+    
+    def render(self):
+        self.tree.delete(*self.tree.get_children())
+        for key in self.keys[self.offset:self.offset + self.height]:
+            self.tree.insert("", "end", iid=key, values=self.values[key])
+        self._update_scrollbar()
+    
+    def _update_scrollbar(self):
+        count = len(self.keys)
+        if count <= self.height:
+            self.scrollbar.set(0.0, 1.0)
+        else:
+            self.scrollbar.set(self.offset / count, (self.offset + self.height) / count)
+    
+    def on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(round(float(amount) * len(self.keys)))
+        elif action == "scroll":
+            step = self.height if unit == "pages" else 1
+            self.scroll_to(self.offset + int(amount) * step)
+    
+    def on_wheel(self, event):
+        if event.num == 4 or event.delta > 0:
+            self.scroll_to(self.offset - 3)
+        else:
+            self.scroll_to(self.offset + 3)
+        return "break"
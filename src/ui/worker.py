@@ -0,0 +1,94 @@
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import messagebox
+from typing import Callable, Hashable, Optional
+from src.core.constants import *
+
+def set_enabled(widgets, enabled: bool):
+    for widget in widgets:
+        if widget.winfo_exists():
+            widget.state(['!disabled'] if enabled else ['disabled'])
+
+# Runs BankingSystem calls on one background thread so Tk never waits on
+# persistence or password hashing. Results come back through a queue that
+# the Tk thread polls with root.after; Tk itself is only touched from the
+# Tk thread. A single thread keeps engine calls in the order they were
+# made. forget() drops the callbacks of jobs already submitted, for screens
+# that are gone; the jobs themselves still run.
+class BackgroundWorker:
+    def __init__(self, root, on_busy: Optional[Callable[[bool], None]] = None):
+        self.root = root
+        self.on_busy = on_busy
+        self.executor = ThreadPoolExecutor(1, thread_name_prefix="gui-worker")
+        self.results = queue.SimpleQueue()
+        self.in_flight = 0
+        # key -> the latest job waiting behind the one in flight, or None.
+        self.keyed = {}
+        self.generation = 0
+        self._polling = False
+    
+    def submit(self, function, *args, on_done: Optional[Callable] = None,
+               key: Optional[Hashable] = None, widgets=()):
+        # Jobs with a key are coalesced: while one is in flight, repeated
+        # submits replace each other and only the latest runs afterwards.
+        job = (function, args, on_done, key, widgets, self.generation)
+        if key is not None:
+            if key in self.keyed:
+                self.keyed[key] = job
+                return
+            self.keyed[key] = None
+        self._start(job)
+    
+    def _start(self, job):
+        function, args, on_done, key, widgets, generation = job
+        set_enabled(widgets, False)
+        self.in_flight += 1
+        if self.in_flight == 1 and self.on_busy:
+            self.on_busy(True)
+        future = self.executor.submit(function, *args)
+        future.add_done_callback(lambda done: self.results.put((job, done)))
+        if not self._polling:
+            self._polling = True
+            self.root.after(GUI_POLL_INTERVAL, self._poll)
+    
+    def _poll(self):
+        while True:
+            try:
+                job, future = self.results.get_nowait()
+            except queue.Empty:
+                break
+            self._finish(job, future)
+        if self.in_flight:
+            self.root.after(GUI_POLL_INTERVAL, self._poll)
+        else:
+            self._polling = False
+    
+    def _finish(self, job, future):
+        function, args, on_done, key, widgets, generation = job
+        self.in_flight -= 1
+        set_enabled(widgets, True)
+        if key is not None:
+            pending = self.keyed.pop(key)
+            if pending is not None:
+                self.keyed[key] = None
+                self._start(pending)
+        if not self.in_flight and self.on_busy:
+            self.on_busy(False)
+        if generation != self.generation:
+            return
+        error = future.exception()
+        if error is not None:
+            messagebox.showerror(ERROR_TITLE, str(error))
+        elif on_done is not None:
+            on_done(future.result())
+    
+    def forget(self):
+        self.generation += 1
+        for key in self.keyed:
+            self.keyed[key] = None
+    
+    def shutdown(self):
+        # Lets the jobs already running or queued finish, so their changes
+        # are committed before the bank is closed.
+        self.forget()
+        self.executor.shutdown(wait=True)
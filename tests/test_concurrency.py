@@ -0,0 +1,35 @@
+import pytest
+from src.core.constants import *
+from src.services.banking_system import BankingSystem
+from src.services.concurrent_executor import ConcurrentExecutor
+from benchmarks.concurrency_stress import open_storage, stress
+
+# A cache smaller than the accounts in play makes the lazy backends evict
+# accounts with changes still waiting for the coalesced commit.
+@pytest.mark.parametrize("kind", ["json", "mapped", "sqlite"])
+@pytest.mark.parametrize("durable", [True, False])
+def test_money_is_conserved(kind, durable):
+    expected, in_memory, on_disk, negative, _ = stress(kind, accounts=20, operations=1_500, workers=16,
+                                                       cache_capacity=4, durable=durable)
+    assert expected == in_memory == on_disk
+    assert negative == 0
+
+@pytest.mark.parametrize("kind", ["json", "mapped", "sqlite"])
+@pytest.mark.parametrize("durable", [True, False])
+def test_concurrent_create_account_gets_distinct_numbers(tmp_path, kind, durable):
+    bank = BankingSystem(open_storage(kind, str(tmp_path)))
+    bank.register_customer("owner", "password1")
+    customer = bank.customers.get(CUSTOMER_ID_FORMAT.format(1))
+    executor = ConcurrentExecutor(bank, workers=8, durable=durable)
+    results = [future.result() for future in [executor.call(bank.create_account, customer) for _ in range(20)]]
+    executor.shutdown()
+    numbers = [ACCOUNT_NUMBER_FORMAT.format(i) for i in range(1, 21)]
+    assert sorted(results) == sorted(ACCOUNT_CREATED.format(number) for number in numbers)
+    assert sorted(bank.customer_account_numbers(customer)) == numbers
+    bank.close()
+    
+    reloaded = BankingSystem(open_storage(kind, str(tmp_path)))
+    # Lazy backends load a customer's account list when they log in.
+    assert reloaded.login(customer.customer_id, "password1")
+    assert sorted(reloaded.customer_account_numbers()) == numbers
+    reloaded.close()
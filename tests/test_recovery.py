@@ -0,0 +1,85 @@
+import os
+import pytest
+from src.core.constants import *
+from src.services.banking_system import BankingSystem
+from src.services.snapshots import SnapshotWriter
+from src.services.storage import JsonStorage, MappedStorage
+
+PASSWORD = "password1"
+
+def open_bank(tmp_path, kind):
+    storage_class = MappedStorage if kind == "mapped" else JsonStorage
+    storage = storage_class(str(tmp_path / "bank_data.json"), str(tmp_path / "bank_data.journal"),
+                            fsync_every=1, compact_every=0)
+    bank = BankingSystem(storage)
+    bank.login(CUSTOMER_ID_FORMAT.format(1), PASSWORD)
+    return bank
+
+def new_bank(tmp_path, kind, accounts=3):
+    bank = open_bank(tmp_path, kind)
+    bank.register_customer("owner", PASSWORD)
+    bank.login(CUSTOMER_ID_FORMAT.format(1), PASSWORD)
+    for _ in range(accounts):
+        bank.create_account()
+    return bank
+
+def make_changes(bank, rounds):
+    numbers = bank.customer_account_numbers()
+    for i in range(rounds):
+        bank.deposit(numbers[i % len(numbers)], 100 + i)
+        bank.withdraw(numbers[i % len(numbers)], 10)
+        bank.transfer(numbers[i % len(numbers)], numbers[(i + 1) % len(numbers)], 5.25)
+
+def state(bank):
+    return {number: (bank.get_account_balance(number), bank.get_transaction_history(number))
+            for number in bank.customer_account_numbers()}
+
+# The banks below are left open, as after a crash: everything acknowledged
+# has to come back from the snapshot and the journal alone.
+@pytest.mark.parametrize("kind", ["json", "mapped"])
+def test_journal_replay_restores_every_commit(tmp_path, kind):
+    bank = new_bank(tmp_path, kind)
+    make_changes(bank, 20)
+    expected = state(bank)
+    
+    assert state(open_bank(tmp_path, kind)) == expected
+
+@pytest.mark.parametrize("kind", ["json", "mapped"])
+def test_journal_replay_drops_torn_tail(tmp_path, kind):
+    bank = new_bank(tmp_path, kind)
+    make_changes(bank, 5)
+    expected = state(bank)
+    with open(tmp_path / "bank_data.journal", "a") as f:
+        f.write('{"%s": 999, "%s": [{"op"' % (JOURNAL_SEQ_KEY, JOURNAL_CHANGES_KEY))
+    
+    reopened = open_bank(tmp_path, kind)
+    assert state(reopened) == expected
+    # The torn record is cut off, so later appends replay too.
+    make_changes(reopened, 3)
+    assert state(open_bank(tmp_path, kind)) == state(reopened)
+
+@pytest.mark.parametrize("kind", ["json", "mapped"])
+def test_failed_snapshot_keeps_rotated_journal(tmp_path, kind, monkeypatch):
+    bank = new_bank(tmp_path, kind)
+    make_changes(bank, 5)
+    bank.compact()
+    make_changes(bank, 5)
+    
+    def fail(*args):
+        raise OSError("disk full")
+    monkeypatch.setattr(SnapshotWriter, "_write", fail)
+    with pytest.raises(OSError):
+        bank.compact()
+    monkeypatch.undo()
+    assert os.path.exists(bank.storage.journal.rotated_path)
+    make_changes(bank, 5)
+    expected = state(bank)
+    
+    reopened = open_bank(tmp_path, kind)
+    assert state(reopened) == expected
+    
+    # A later snapshot covers the rotated records and drops them.
+    reopened.compact()
+    assert not os.path.exists(reopened.storage.journal.rotated_path)
+    make_changes(reopened, 5)
+    assert state(open_bank(tmp_path, kind)) == state(reopened)
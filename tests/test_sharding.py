@@ -0,0 +1,84 @@
+import uuid
+import pytest
+from src.core.constants import *
+from src.services.sharding import ShardedBank
+
+PASSWORD = "password1"
+
+def open_bank(tmp_path):
+    return ShardedBank(2, str(tmp_path / "bank_data.json"), str(tmp_path / "bank_data.journal"),
+                       fsync_every=1, compact_every=0)
+
+@pytest.fixture
+def accounts(tmp_path):
+    # One customer and account on each shard; the source holds 100.
+    bank = open_bank(tmp_path)
+    owners = []
+    for name in ("source", "target"):
+        customer_id = bank.register_customer(name, PASSWORD).rsplit(' ', 1)[1]
+        account_number = bank.create_account(customer_id).rsplit(' ', 1)[1]
+        owners.append((account_number, customer_id))
+    (source, source_owner), (target, target_owner) = owners
+    assert bank.shard_for(source) is not bank.shard_for(target)
+    bank.deposit(source, 100, source_owner)
+    bank.close()
+    return owners
+
+def prepare(bank, source, target, amount):
+    transfer_id = uuid.uuid4().hex
+    assert bank.shard_for(source).call('prepare', transfer_id, source, -amount).result() is None
+    assert bank.shard_for(target).call('prepare', transfer_id, target, amount).result() is None
+    return transfer_id
+
+def balances(bank, owners):
+    return [bank.get_account_balance(number, owner) for number, owner in owners]
+
+def transfer_states(bank):
+    return [shard.call('transfer_states').result() for shard in bank.shards]
+
+# Each test stops the router part way through a transfer, then checks what
+# a fresh ShardedBank makes of the logs left behind.
+def test_decided_transfer_is_finished_once(tmp_path, accounts):
+    (source, source_owner), (target, target_owner) = accounts
+    bank = open_bank(tmp_path)
+    transfer_id = prepare(bank, source, target, 30)
+    bank.transfers.append([{
+        CHANGE_TRANSFER_ID_KEY: transfer_id,
+        TRANSFER_STATE_KEY: TRANSFER_COMMIT,
+        'from_account': source,
+        'to_account': target,
+        'amount': 30
+    }])
+    bank.shard_for(source).call('commit', transfer_id, source, -30, target).result()
+    bank.close()
+    
+    bank = open_bank(tmp_path)
+    try:
+        assert balances(bank, accounts) == [BALANCE_FORMAT.format(70.0), BALANCE_FORMAT.format(30.0)]
+        assert transfer_states(bank) == [{}, {}]
+        assert bank.get_transaction_history(source, source_owner).count(TRANSFER_TO_FORMAT.format(target)) == 1
+        assert bank.get_transaction_history(target, target_owner).count(TRANSFER_FROM_FORMAT.format(source)) == 1
+    finally:
+        bank.close()
+    
+    # Recovery rotated the log, so a second restart has nothing to redo.
+    bank = open_bank(tmp_path)
+    try:
+        assert balances(bank, accounts) == [BALANCE_FORMAT.format(70.0), BALANCE_FORMAT.format(30.0)]
+    finally:
+        bank.close()
+
+def test_undecided_transfer_is_aborted(tmp_path, accounts):
+    (source, source_owner), (target, target_owner) = accounts
+    bank = open_bank(tmp_path)
+    prepare(bank, source, target, 30)
+    bank.close()
+    
+    bank = open_bank(tmp_path)
+    try:
+        assert balances(bank, accounts) == [BALANCE_FORMAT.format(100.0), BALANCE_FORMAT.format(0.0)]
+        assert transfer_states(bank) == [{}, {}]
+        # The hold on the source is released along with the prepare.
+        assert bank.withdraw(source, 100, source_owner) == WITHDRAW_SUCCESS.format(0.0)
+    finally:
+        bank.close()